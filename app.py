@@ -1,10 +1,27 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
 import os
 import csv
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+from storage import (
+    ATTENDANCE_COLUMNS,
+    DELETE_COLUMN,
+    EDITABLE_COLUMNS,
+    LUNCH_BREAK_HOURS,
+    RECORD_COLUMNS,
+    DayIndex,
+    EmployeeRegistry,
+    ExcelStorage,
+    MonthAggregates,
+    MonthCache,
+    RecordConflictError,
+    create_storage,
+    diff_month_edits,
+    import_attendance,
+    import_employees,
+    recompute_months,
+    write_excel_file,
+)
 
 # Cấu hình trang
 st.set_page_config(
@@ -16,14 +33,74 @@ st.set_page_config(
 # File lưu trữ dữ liệu
 DATA_FILE = "attendance_data.xlsx"  # Đổi sang Excel
 EMPLOYEE_FILE = "employees.csv"
+JOURNAL_FILE = "attendance_journal.csv"  # Nhật ký ghi thêm (append-only) cho mỗi lần chấm công
+DB_FILE = "attendance.db"
+CSV_DIR = "attendance_csv"
+
+# Backend lưu trữ: "excel" (mặc định, file Excel + CSV), "csv" hoặc "sqlite"
+STORAGE_BACKEND = os.environ.get("ATTENDANCE_STORAGE", "excel")
+# Chu kỳ tự làm mới bảng "Chấm công hôm nay" (giây)
+TODAY_REFRESH_SECONDS = 30
+# Số nhân viên tối đa trong ô chọn (gõ để tìm khi danh sách dài hơn)
+EMPLOYEE_OPTION_LIMIT = 200
+
+# Backend lưu trữ dùng chung giữa các phiên
+@st.cache_resource
+def get_storage():
+    return create_storage(
+        STORAGE_BACKEND,
+        data_file=DATA_FILE,
+        employee_file=EMPLOYEE_FILE,
+        journal_file=JOURNAL_FILE,
+        csv_dir=CSV_DIR,
+        db_file=DB_FILE
+    )
+
+# Bộ đệm chấm công theo tháng dùng chung giữa các phiên (5 phút), cập nhật trực tiếp khi ghi
+@st.cache_resource
+def get_month_cache():
+    return MonthCache(get_storage(), ttl=300)
+
+# Chấm công hôm nay dùng chung giữa các phiên: mỗi lần làm mới chỉ đọc các dòng mới của tháng trong bộ đệm
+@st.cache_resource
+def get_today_index():
+    return DayIndex(get_month_cache(), ATTENDANCE_COLUMNS)
+
+# Tổng hợp theo tháng dùng chung giữa các phiên: cập nhật sau mỗi lần ghi, Thống kê không phải quét mọi bản ghi
+@st.cache_resource
+def get_month_aggregates():
+    storage = get_storage()
+    return MonthAggregates(storage, storage.attendance_key)
+
+# Danh sách nhân viên có index dùng chung giữa các phiên: chỉ dựng lại khi file/bảng nhân viên đổi
+@st.cache_resource
+def get_employee_registry():
+    return EmployeeRegistry(get_storage())
+
+# Chọn nhân viên: lọc theo bộ phận, gõ mã hoặc tên (không cần dấu) để tìm; trả về Mã NV
+def employee_picker(label, key, current=None):
+    registry = get_employee_registry()
+    department = None
+    departments = registry.departments()
+    if departments:
+        department = st.selectbox("Bộ phận", ["Tất cả"] + departments, key=f"{key}_department")
+        department = None if department == "Tất cả" else department
+    query = st.text_input("Tìm nhân viên", key=f"{key}_search", placeholder="Nhập mã hoặc tên...")
+    options = registry.search(query, department, limit=EMPLOYEE_OPTION_LIMIT)
+    if not options:
+        st.caption("Không tìm thấy nhân viên phù hợp, hiển thị toàn bộ danh sách")
+        options = registry.search('', department, limit=EMPLOYEE_OPTION_LIMIT)
+    if current is not None and current not in options and registry.get(current) is not None:
+        options = [current] + options
+    index = options.index(current) if current in options else 0
+    return st.selectbox(label, options, index=index, format_func=registry.label, key=key)
+
+# Xuất DataFrame ra file Excel (write-only)
+def export_excel(df, filename):
+    write_excel_file(df, filename)
 
 # Khởi tạo file nếu chưa có
 def init_files():
-    if not os.path.exists(DATA_FILE):
-        # Tạo file Excel trống
-        df_empty = pd.DataFrame(columns=['Mã NV', 'Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'Ghi chú'])
-        df_empty.to_excel(DATA_FILE, sheet_name='Template', index=False)
-    
     if not os.path.exists(EMPLOYEE_FILE):
         with open(EMPLOYEE_FILE, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
@@ -32,119 +109,132 @@ def init_files():
             writer.writerow(['NV001', 'Nguyễn Văn A', 'IT', 'Developer'])
             writer.writerow(['NV002', 'Trần Thị B', 'HR', 'Nhân viên'])
             writer.writerow(['NV003', 'Lê Văn C', 'Marketing', 'Manager'])
+    
+    storage = get_storage()
+    # Lần đầu dùng SQLite: nhập dữ liệu có sẵn từ file Excel/CSV
+    if STORAGE_BACKEND == 'sqlite' and storage.is_empty():
+        excel_storage = ExcelStorage(DATA_FILE, EMPLOYEE_FILE, JOURNAL_FILE)
+        storage.import_dataframes(excel_storage.load_employees(), excel_storage.load_attendance())
 
 # Đọc danh sách nhân viên
 def load_employees():
-    if os.path.exists(EMPLOYEE_FILE):
-        df = pd.read_csv(EMPLOYEE_FILE, encoding='utf-8')
-        return df
-    return pd.DataFrame(columns=['Mã NV', 'Tên NV', 'Bộ phận', 'Chức vụ'])
+    return get_employee_registry().employees()
 
 # Đọc dữ liệu chấm công (từ tất cả các sheet)
 def load_attendance():
-    if os.path.exists(DATA_FILE):
-        try:
-            # Đọc tất cả các sheet
-            excel_file = pd.ExcelFile(DATA_FILE)
-            all_sheets = []
-            
-            for sheet_name in excel_file.sheet_names:
-                if sheet_name != 'Template':  # Bỏ qua sheet Template
-                    df = pd.read_excel(DATA_FILE, sheet_name=sheet_name)
-                    if len(df) > 0:
-                        all_sheets.append(df)
-            
-            if all_sheets:
-                return pd.concat(all_sheets, ignore_index=True)
-        except Exception as e:
-            st.error(f"Lỗi đọc file Excel: {e}")
-    
-    return pd.DataFrame(columns=['Mã NV', 'Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'Ghi chú'])
+    try:
+        return get_storage().load_attendance()
+    except Exception as e:
+        st.error(f"Lỗi đọc dữ liệu chấm công: {e}")
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
 
 # Đọc dữ liệu chấm công từ một sheet cụ thể
 def load_attendance_by_month(month_year):
     """Đọc dữ liệu từ sheet theo tháng (format: YYYY-MM)"""
-    if os.path.exists(DATA_FILE):
-        try:
-            df = pd.read_excel(DATA_FILE, sheet_name=month_year)
-            return df
-        except Exception:
-            # Sheet chưa tồn tại
-            return pd.DataFrame(columns=['Mã NV', 'Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'Ghi chú'])
-    return pd.DataFrame(columns=['Mã NV', 'Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'Ghi chú'])
-
-# Lưu bản ghi chấm công vào sheet theo tháng
+    return get_storage().load_attendance_by_month(month_year)
+
+# Lấy danh sách các tháng có dữ liệu
+def get_available_months():
+    """Lấy danh sách các tháng có sẵn"""
+    return get_storage().get_available_months()
+
+# Đọc chấm công của một ngày
+def load_attendance_by_date(date_str):
+    return get_storage().load_attendance_by_date(date_str)
+
+# Đọc chấm công theo bộ lọc Báo cáo (month_year/employee_name = None nghĩa là tất cả)
+def load_attendance_filtered(month_year=None, employee_name=None):
+    return get_storage().load_attendance_filtered(month_year, employee_name)
+
+# Danh sách tên nhân viên có chấm công (trong tháng nếu có)
+def get_attendance_employee_names(month_year=None):
+    return get_storage().get_employee_names(month_year)
+
+# Lưu bản ghi chấm công
 def save_attendance(employee_id, employee_name, date_str, time_in, time_out, total_hours, note):
-    """Lưu dữ liệu chấm công vào sheet theo tháng"""
-    # Xác định tên sheet theo tháng (format: YYYY-MM)
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-    sheet_name = date_obj.strftime("%Y-%m")  # Ví dụ: "2025-12"
-    
-    # Tạo bản ghi mới
-    new_record = pd.DataFrame([{
-        'Mã NV': employee_id,
-        'Tên NV': employee_name,
-        'Ngày': date_str,
-        'Giờ vào': time_in,
-        'Giờ ra': time_out,
-        'Tổng giờ': total_hours,
-        'Ghi chú': note
-    }])
-    
-    try:
-        # Đọc dữ liệu hiện tại từ sheet (nếu có)
-        existing_df = load_attendance_by_month(sheet_name)
-        
-        # Gộp dữ liệu mới với dữ liệu cũ
-        updated_df = pd.concat([existing_df, new_record], ignore_index=True)
-        
-        # Lưu lại vào Excel
-        if os.path.exists(DATA_FILE):
-            with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                updated_df.to_excel(writer, sheet_name=sheet_name, index=False)
-        else:
-            # Tạo file mới nếu chưa tồn tại
-            with pd.ExcelWriter(DATA_FILE, engine='openpyxl') as writer:
-                updated_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-    except Exception as e:
-        # Nếu file chưa tồn tại hoặc lỗi, tạo mới
-        with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='w') as writer:
-            new_record.to_excel(writer, sheet_name=sheet_name, index=False)
+    """Lưu dữ liệu chấm công (Excel: ghi thêm vào nhật ký, không ghi lại cả sheet)"""
+    # Kiểm tra định dạng ngày (sheet tháng được xác định theo YYYY-MM)
+    datetime.strptime(date_str, "%Y-%m-%d")
+    record = dict(zip(
+        ATTENDANCE_COLUMNS,
+        [employee_id, employee_name, date_str, time_in, time_out, total_hours, note]
+    ))
+    get_storage().save_attendance(record)
+    get_month_cache().apply_save(record)
+    get_month_aggregates().apply_save(record)
+
+# Báo bản ghi đã bị sửa/xóa ở phiên khác kể từ lúc đọc
+def show_conflict(e):
+    st.error(f"⚠️ Bản ghi đã bị thay đổi ở nơi khác ({e}). Vui lòng tải lại dữ liệu rồi thử lại.")
 
 # Xóa bản ghi chấm công
-def delete_attendance_record(sheet_name, index):
-    """Xóa một bản ghi chấm công"""
+def delete_attendance_record(sheet_name, record_id, version):
+    """Xóa một bản ghi chấm công (theo ID, chỉ khi chưa bị sửa kể từ lúc đọc)"""
     try:
-        df = load_attendance_by_month(sheet_name)
-        df = df.drop(index).reset_index(drop=True)
-        
-        with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        get_storage().delete_attendance_record(sheet_name, record_id, version)
+        get_month_cache().apply_delete(sheet_name, record_id)
+        get_today_index().apply_delete(sheet_name, record_id)
+        get_month_aggregates().apply_delete(sheet_name, record_id)
         return True
+    except RecordConflictError as e:
+        show_conflict(e)
+        return False
     except Exception as e:
         st.error(f"Lỗi khi xóa: {e}")
         return False
 
 # Cập nhật bản ghi chấm công
-def update_attendance_record(sheet_name, index, employee_id, employee_name, date_str, time_in, time_out, total_hours, note):
-    """Cập nhật một bản ghi chấm công"""
+def update_attendance_record(sheet_name, record_id, version, employee_id, employee_name, date_str, time_in, time_out, total_hours, note):
+    """Cập nhật một bản ghi chấm công (theo ID, chỉ khi chưa bị sửa kể từ lúc đọc)"""
     try:
-        df = load_attendance_by_month(sheet_name)
-        df.loc[index] = [employee_id, employee_name, date_str, time_in, time_out, total_hours, note]
-        
-        with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        record = dict(zip(
+            ATTENDANCE_COLUMNS,
+            [employee_id, employee_name, date_str, time_in, time_out, total_hours, note]
+        ))
+        get_storage().update_attendance_record(sheet_name, record_id, record, version)
+        get_month_cache().apply_update(sheet_name, record_id, record)
+        get_today_index().apply_update(sheet_name, record_id, record)
+        get_month_aggregates().apply_update(sheet_name, record_id, record)
         return True
+    except RecordConflictError as e:
+        show_conflict(e)
+        return False
     except Exception as e:
         st.error(f"Lỗi khi cập nhật: {e}")
         return False
 
+# Lưu các thay đổi trên bảng sửa nhiều dòng
+def apply_month_edits(sheet_name, original_df, edited_df):
+    """Chỉ ghi các dòng có ô thay đổi hoặc được đánh dấu xóa, bằng một lần ghi cho cả tháng.
+
+    Trả về (số dòng sửa, số dòng xóa) hoặc None nếu không ghi.
+    """
+    updates, deletes, errors = diff_month_edits(original_df, edited_df, ATTENDANCE_COLUMNS, LUNCH_BREAK_HOURS)
+    if len(errors) > 0:
+        st.error(f"❌ {len(errors)} dòng không hợp lệ, chưa lưu thay đổi nào")
+        st.dataframe(errors.drop(columns=[DELETE_COLUMN], errors='ignore'), use_container_width=True, hide_index=True)
+        return None
+    if not updates and not deletes:
+        st.info("Không có thay đổi nào")
+        return None
+    try:
+        get_storage().apply_attendance_changes(sheet_name, updates, deletes)
+        get_month_cache().apply_changes(sheet_name, updates, deletes)
+        get_today_index().apply_changes(sheet_name, updates, deletes)
+        get_month_aggregates().apply_changes(sheet_name, updates, deletes)
+        return len(updates), len(deletes)
+    except RecordConflictError as e:
+        show_conflict(e)
+        return None
+    except Exception as e:
+        st.error(f"Lỗi khi lưu thay đổi: {e}")
+        return None
+
 # Thêm nhân viên mới
 def add_employee(emp_id, emp_name, department, position):
-    with open(EMPLOYEE_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([emp_id, emp_name, department, position])
+    return get_storage().add_employee({
+        'Mã NV': emp_id, 'Tên NV': emp_name, 'Bộ phận': department, 'Chức vụ': position
+    })
 
 # Tính tổng giờ làm việc (trừ 1 giờ ăn trưa)
 def calculate_hours(time_in, time_out):
@@ -152,14 +242,98 @@ def calculate_hours(time_in, time_out):
         time_in_dt = datetime.strptime(time_in, "%H:%M")
         time_out_dt = datetime.strptime(time_out, "%H:%M")
         diff = time_out_dt - time_in_dt
+        # Giờ ra trước giờ vào: ca qua đêm, giờ ra thuộc ngày hôm sau
+        if diff.total_seconds() < 0:
+            diff += timedelta(days=1)
         hours = diff.total_seconds() / 3600
         # Trừ 1 giờ ăn trưa
-        hours = hours - 1.0
+        hours = hours - LUNCH_BREAK_HOURS
         # Đảm bảo không âm
         hours = max(0, hours)
         return round(hours, 2)
     return 0
 
+# Đọc giờ "HH:MM"; ô trống (ca chưa ra) thì dùng giá trị mặc định
+def parse_time(value, default):
+    if isinstance(value, str) and value.strip():
+        return datetime.strptime(value.strip(), "%H:%M").time()
+    return default
+
+# Ca đang mở (đã vào, chưa ra) của nhân viên: tìm trong ngày date_str rồi ngày hôm trước (ca qua đêm);
+# trả về dòng chấm công (Series) hoặc None
+def find_open_punch(employee_id, date_str):
+    day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    months = {}
+    for punch_date in (date_str, (day - timedelta(days=1)).strftime("%Y-%m-%d")):
+        if punch_date[:7] not in months:
+            months[punch_date[:7]] = load_attendance_by_month(punch_date[:7])
+        month_df = months[punch_date[:7]]
+        if len(month_df) == 0:
+            continue
+        time_out = month_df['Giờ ra'].fillna('').astype(str).str.strip()
+        is_open = (
+            (month_df['Mã NV'].astype(str) == str(employee_id))
+            & (month_df['Ngày'].astype(str) == punch_date)
+            & (time_out == '')
+        )
+        positions = is_open.to_numpy().nonzero()[0]
+        if len(positions) > 0:
+            return month_df.iloc[positions[-1]]
+    return None
+
+# Kiosk: vào ca = ghi thêm một bản ghi chưa có giờ ra
+def kiosk_clock_in(employee_id, employee_name):
+    now = datetime.now()
+    save_attendance(employee_id, employee_name, now.strftime("%Y-%m-%d"), now.strftime("%H:%M"), "", 0, "")
+    st.session_state.kiosk_message = f"🟢 {employee_name} vào ca lúc {now.strftime('%H:%M')}"
+
+# Kiosk: ra ca = cập nhật giờ ra và tổng giờ cho ca đang mở (bản ghi giữ Ngày vào ca, kể cả ca qua đêm)
+def kiosk_clock_out(employee_id, employee_name, record_id, version, date_str, time_in, note):
+    now = datetime.now()
+    time_out = now.strftime("%H:%M")
+    total_hours = calculate_hours(time_in, time_out)
+    if update_attendance_record(date_str[:7], record_id, version, employee_id, employee_name, date_str, time_in, time_out, total_hours, note):
+        st.session_state.kiosk_message = f"🔴 {employee_name} ra ca lúc {time_out} - Tổng: {total_hours} giờ"
+
+# Kiosk chấm công nhanh: chạy trong fragment nên bấm nút chỉ chạy lại phần này, không chạy lại cả trang
+@st.fragment
+def kiosk_panel():
+    registry = get_employee_registry()
+    if len(registry) == 0:
+        st.warning("⚠️ Chưa có nhân viên nào. Vui lòng thêm nhân viên ở tab 'Quản lý nhân viên'")
+        return
+    
+    emp_id = employee_picker("Chọn tên của bạn", "kiosk_employee")
+    emp_name = registry.get(emp_id)['Tên NV']
+    
+    today_str = date.today().strftime("%Y-%m-%d")
+    open_record = find_open_punch(emp_id, today_str)
+    if open_record is None:
+        st.button("🟢 Vào ca", type="primary", use_container_width=True,
+                  on_click=kiosk_clock_in, args=(emp_id, emp_name))
+    else:
+        note = str(open_record['Ghi chú']) if pd.notna(open_record['Ghi chú']) else ""
+        open_date = str(open_record['Ngày'])
+        since = open_record['Giờ vào'] if open_date == today_str else f"{open_record['Giờ vào']} ngày {open_date}"
+        st.info(f"Đang trong ca từ **{since}**")
+        st.button("🔴 Ra ca", type="primary", use_container_width=True,
+                  on_click=kiosk_clock_out,
+                  args=(emp_id, emp_name, open_record['ID'], int(open_record['Phiên bản']), open_date,
+                        open_record['Giờ vào'], note))
+    
+    if st.session_state.get('kiosk_message'):
+        st.success(st.session_state.kiosk_message)
+
+# Bảng chấm công hôm nay: fragment tự chạy lại sau mỗi TODAY_REFRESH_SECONDS giây (không chạy lại cả trang)
+@st.fragment(run_every=TODAY_REFRESH_SECONDS)
+def today_panel():
+    today_str = date.today().strftime("%Y-%m-%d")
+    today_attendance = get_today_index().load(today_str)
+    if len(today_attendance) > 0:
+        st.dataframe(today_attendance.drop(columns=RECORD_COLUMNS), use_container_width=True, hide_index=True)
+    else:
+        st.info("Chưa có bản ghi chấm công nào hôm nay")
+
 # Khởi tạo
 init_files()
 
@@ -167,11 +341,16 @@ init_files()
 st.title("⏰ Hệ thống chấm công nhân viên")
 st.markdown("---")
 
-# Tạo tabs
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📝 Chấm công", "✏️ Sửa/Xóa", "👥 Quản lý nhân viên", "📊 Báo cáo", "📈 Thống kê", "📁 Dữ liệu"])
+# Điều hướng: chỉ chạy phần của trang đang xem (st.tabs chạy cả 6 tab ở mỗi lần chạy lại)
+VIEWS = ["📝 Chấm công", "✏️ Sửa/Xóa", "👥 Quản lý nhân viên", "📊 Báo cáo", "📈 Thống kê", "📁 Dữ liệu", "🕒 Kiosk"]
+# Mở thẳng kiosk bằng ?kiosk=1 (máy chấm công đặt tại xưởng)
+active_view = st.radio(
+    "Chức năng", VIEWS, index=len(VIEWS) - 1 if st.query_params.get("kiosk") else 0,
+    horizontal=True, label_visibility="collapsed", key="active_view"
+)
 
 # Tab 1: Chấm công
-with tab1:
+if active_view == VIEWS[0]:
     st.header("Chấm công hàng ngày")
     
     col1, col2 = st.columns(2)
@@ -179,15 +358,13 @@ with tab1:
     with col1:
         st.subheader("Thông tin chấm công")
         
-        employees_df = load_employees()
-        if len(employees_df) > 0:
-            # Tạo danh sách hiển thị
-            employee_options = [f"{row['Mã NV']} - {row['Tên NV']}" for _, row in employees_df.iterrows()]
-            selected_employee = st.selectbox("Chọn nhân viên", employee_options)
+        registry = get_employee_registry()
+        if len(registry) > 0:
+            # Chọn nhân viên (tìm theo mã/tên, lọc theo bộ phận)
+            emp_id = employee_picker("Chọn nhân viên", "attendance_employee")
             
             # Lấy thông tin nhân viên
-            emp_id = selected_employee.split(' - ')[0]
-            emp_info = employees_df[employees_df['Mã NV'] == emp_id].iloc[0]
+            emp_info = registry.get(emp_id)
             
             st.info(f"**Bộ phận:** {emp_info['Bộ phận']} | **Chức vụ:** {emp_info['Chức vụ']}")
             
@@ -224,32 +401,44 @@ with tab1:
     
     with col2:
         st.subheader("Chấm công hôm nay")
-        # Lấy dữ liệu từ sheet tháng hiện tại
-        current_month = date.today().strftime("%Y-%m")
-        today_str = date.today().strftime("%Y-%m-%d")
-        
-        month_attendance = load_attendance_by_month(current_month)
-        if len(month_attendance) > 0:
-            today_attendance = month_attendance[month_attendance['Ngày'] == today_str]
-            if len(today_attendance) > 0:
-                st.dataframe(today_attendance, use_container_width=True, hide_index=True)
-            else:
-                st.info("Chưa có bản ghi chấm công nào hôm nay")
-        else:
-            st.info("Chưa có dữ liệu chấm công trong tháng này")
+        today_panel()
+    
+    # Nhập hàng loạt từ file xuất của máy chấm công
+    st.markdown("---")
+    with st.expander("📥 Nhập chấm công từ file (CSV/XLSX)"):
+        st.caption("Cột bắt buộc: Mã NV hoặc Tên NV, Ngày (YYYY-MM-DD hoặc DD/MM/YYYY), Giờ vào; "
+                   "tùy chọn: Giờ ra, Ghi chú. Tổng giờ được tính tự động.")
+        uploaded_file = st.file_uploader("Chọn file", type=["csv", "xlsx"], key="import_file")
+        if uploaded_file is not None and st.button("📥 Nhập dữ liệu", type="primary", key="import_button"):
+            progress_bar = st.progress(0.0, text="Đang đọc file...")
+            
+            def show_progress(fraction, rows_read):
+                progress_bar.progress(min(fraction or 0.0, 1.0), text=f"Đã đọc {rows_read} dòng")
+            
+            try:
+                result = import_attendance(get_storage(), uploaded_file, uploaded_file.name, load_employees(),
+                                           progress=show_progress)
+                for month_year in result['months']:
+                    get_month_cache().invalidate(month_year)
+                get_month_aggregates().reindex(result['months'])
+                progress_bar.progress(1.0, text="Hoàn tất")
+                st.success(f"✅ Đã nhập {result['imported']} bản ghi vào {len(result['months'])} tháng: " +
+                           ", ".join(f"{m} ({n})" for m, n in result['months'].items()))
+                invalid = result['invalid']
+                if len(invalid) > 0:
+                    st.warning(f"⚠️ {len(invalid)} dòng không hợp lệ đã bị bỏ qua")
+                    st.dataframe(invalid.head(100), use_container_width=True, hide_index=True)
+                    st.download_button("📥 Tải danh sách dòng lỗi", invalid.to_csv(index=False).encode('utf-8'),
+                                       file_name="import_errors.csv", mime="text/csv")
+            except Exception as e:
+                st.error(f"Lỗi nhập dữ liệu: {e}")
 
 # Tab 2: Sửa/Xóa dữ liệu
-with tab2:
+if active_view == VIEWS[1]:
     st.header("✏️ Sửa hoặc Xóa dữ liệu chấm công")
     
     # Lấy danh sách các sheet (tháng)
-    available_months = []
-    if os.path.exists(DATA_FILE):
-        try:
-            excel_file = pd.ExcelFile(DATA_FILE)
-            available_months = [sheet for sheet in excel_file.sheet_names if sheet != 'Template']
-        except Exception:
-            pass
+    available_months = get_available_months()
     
     if available_months:
         col1, col2 = st.columns([1, 3])
@@ -270,10 +459,27 @@ with tab2:
             st.markdown("---")
             st.subheader("📋 Danh sách chấm công")
             
-            # Tạo DataFrame với STT
-            display_df = df_month.copy()
+            # Tạo DataFrame với STT; sửa trực tiếp các ô Ngày, Giờ vào, Giờ ra, Ghi chú hoặc tick cột Xóa
+            display_df = df_month.drop(columns=RECORD_COLUMNS, errors='ignore').astype(object)
             display_df.insert(0, 'STT', range(1, len(display_df) + 1))
-            st.dataframe(display_df, use_container_width=True, hide_index=True)
+            display_df[DELETE_COLUMN] = False
+            with st.form(f"batch_edit_{selected_month}"):
+                edited_df = st.data_editor(
+                    display_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    num_rows="fixed",
+                    disabled=[c for c in display_df.columns if c not in EDITABLE_COLUMNS + [DELETE_COLUMN]],
+                    column_config={DELETE_COLUMN: st.column_config.CheckboxColumn("🗑️ Xóa")},
+                    key=f"batch_editor_{selected_month}"
+                )
+                st.caption("Tổng giờ được tính lại cho các dòng đã sửa. Chỉ các dòng thay đổi được ghi.")
+                batch_submitted = st.form_submit_button("💾 Lưu các thay đổi trên bảng", type="primary")
+            if batch_submitted:
+                result = apply_month_edits(selected_month, df_month, edited_df)
+                if result is not None:
+                    st.success(f"✅ Đã sửa {result[0]} và xóa {result[1]} bản ghi!")
+                    st.rerun()
             
             st.markdown("---")
             
@@ -303,7 +509,7 @@ with tab2:
                     """)
                     
                     if st.button("🗑️ Xác nhận xóa", type="secondary", use_container_width=True):
-                        if delete_attendance_record(selected_month, record_to_delete - 1):
+                        if delete_attendance_record(selected_month, record_info['ID'], int(record_info['Phiên bản'])):
                             st.success("✅ Đã xóa bản ghi!")
                             st.rerun()
             
@@ -325,30 +531,19 @@ with tab2:
                     st.markdown("**Thông tin hiện tại:**")
                     
                     # Form sửa
-                    employees_df = load_employees()
-                    if len(employees_df) > 0:
-                        # Tìm index của nhân viên hiện tại
-                        emp_list = [f"{row['Mã NV']} - {row['Tên NV']}" for _, row in employees_df.iterrows()]
-                        current_emp_str = f"{current_record['Mã NV']} - {current_record['Tên NV']}"
-                        current_emp_idx = emp_list.index(current_emp_str) if current_emp_str in emp_list else 0
-                        
-                        new_employee = st.selectbox(
-                            "Nhân viên", 
-                            emp_list,
-                            index=current_emp_idx,
-                            key="edit_emp"
-                        )
-                        
-                        new_emp_id = new_employee.split(' - ')[0]
-                        new_emp_name = employees_df[employees_df['Mã NV'] == new_emp_id].iloc[0]['Tên NV']
+                    registry = get_employee_registry()
+                    if len(registry) > 0:
+                        # Nhân viên hiện tại được chọn sẵn (tra theo mã, không quét danh sách)
+                        new_emp_id = employee_picker("Nhân viên", "edit_emp", current=str(current_record['Mã NV']))
+                        new_emp_name = registry.get(new_emp_id)['Tên NV']
                         
                         # Parse ngày hiện tại
                         current_date = datetime.strptime(str(current_record['Ngày']), "%Y-%m-%d").date()
                         new_date = st.date_input("Ngày", value=current_date, key="edit_date")
                         
                         # Parse giờ hiện tại
-                        current_time_in = datetime.strptime(current_record['Giờ vào'], "%H:%M").time()
-                        current_time_out = datetime.strptime(current_record['Giờ ra'], "%H:%M").time()
+                        current_time_in = parse_time(current_record['Giờ vào'], time(8, 0))
+                        current_time_out = parse_time(current_record['Giờ ra'], time(17, 0))
                         
                         new_time_in = st.time_input("Giờ vào", value=current_time_in, key="edit_time_in")
                         new_time_out = st.time_input("Giờ ra", value=current_time_out, key="edit_time_out")
@@ -365,7 +560,8 @@ with tab2:
                         if st.button("💾 Lưu thay đổi", type="primary", use_container_width=True):
                             if update_attendance_record(
                                 selected_month,
-                                record_to_edit - 1,
+                                current_record['ID'],
+                                int(current_record['Phiên bản']),
                                 new_emp_id,
                                 new_emp_name,
                                 new_date.strftime("%Y-%m-%d"),
@@ -382,7 +578,7 @@ with tab2:
         st.warning("⚠️ Chưa có dữ liệu chấm công. Hãy thêm dữ liệu ở tab 'Chấm công' trước.")
 
 # Tab 3: Quản lý nhân viên
-with tab3:
+if active_view == VIEWS[2]:
     st.header("Quản lý nhân viên")
     
     col1, col2 = st.columns([1, 2])
@@ -396,8 +592,7 @@ with tab3:
         
         if st.button("➕ Thêm nhân viên", type="primary", use_container_width=True):
             if new_emp_id and new_emp_name and new_department and new_position:
-                employees_df = load_employees()
-                if new_emp_id in employees_df['Mã NV'].values:
+                if get_employee_registry().get(new_emp_id) is not None:
                     st.error("❌ Mã nhân viên đã tồn tại!")
                 else:
                     add_employee(new_emp_id, new_emp_name, new_department, new_position)
@@ -414,23 +609,36 @@ with tab3:
             
             # Xuất file Excel
             if st.button("📥 Xuất danh sách (Excel)"):
-                employees_df.to_excel("danh_sach_nhan_vien.xlsx", index=False)
+                export_excel(employees_df, "danh_sach_nhan_vien.xlsx")
                 st.success("✅ Đã xuất file danh_sach_nhan_vien.xlsx")
         else:
             st.info("Chưa có nhân viên nào")
 
+    # Nhập hàng loạt (ví dụ khi mở thêm chi nhánh): kiểm tra trùng mã trong bộ nhớ, ghi một lần
+    st.markdown("---")
+    with st.expander("📥 Nhập danh sách nhân viên từ file (CSV/XLSX)"):
+        st.caption("Cột bắt buộc: Mã NV, Tên NV; tùy chọn: Bộ phận, Chức vụ. Mã đã có hoặc lặp lại trong file được bỏ qua.")
+        employee_file = st.file_uploader("Chọn file", type=["csv", "xlsx"], key="employee_import_file")
+        if employee_file is not None and st.button("📥 Nhập nhân viên", type="primary", key="employee_import_button"):
+            try:
+                result = import_employees(get_storage(), employee_file, employee_file.name,
+                                          get_employee_registry().keys())
+                st.success(f"✅ Đã thêm {result['inserted']} nhân viên | Trùng mã: {result['duplicates']} | "
+                           f"Không hợp lệ: {result['invalid']}")
+                rejected = result['rejected']
+                if len(rejected) > 0:
+                    st.dataframe(rejected.head(100), use_container_width=True, hide_index=True)
+                    st.download_button("📥 Tải danh sách dòng bị bỏ qua", rejected.to_csv(index=False).encode('utf-8'),
+                                       file_name="employee_import_errors.csv", mime="text/csv")
+            except Exception as e:
+                st.error(f"Lỗi nhập danh sách nhân viên: {e}")
+
 # Tab 4: Báo cáo
-with tab4:
+if active_view == VIEWS[3]:
     st.header("Báo cáo chấm công")
     
     # Lấy danh sách các sheet (tháng) có sẵn
-    available_months = []
-    if os.path.exists(DATA_FILE):
-        try:
-            excel_file = pd.ExcelFile(DATA_FILE)
-            available_months = [sheet for sheet in excel_file.sheet_names if sheet != 'Template']
-        except Exception:
-            pass
+    available_months = get_available_months()
     
     if available_months:
         # Bộ lọc
@@ -441,46 +649,44 @@ with tab4:
             month_options = ["Tất cả"] + sorted(available_months, reverse=True)
             selected_month = st.selectbox("Chọn tháng", month_options)
         
-        # Load dữ liệu theo lựa chọn
-        if selected_month == "Tất cả":
-            attendance_df = load_attendance()
-        else:
-            attendance_df = load_attendance_by_month(selected_month)
+        month_filter = None if selected_month == "Tất cả" else selected_month
         
         with col2:
             # Lọc theo nhân viên
-            if len(attendance_df) > 0:
-                emp_options = ["Tất cả"] + sorted(attendance_df['Tên NV'].unique().tolist())
+            emp_names = get_attendance_employee_names(month_filter)
+            if emp_names:
+                emp_options = ["Tất cả"] + emp_names
                 selected_emp = st.selectbox("Chọn nhân viên", emp_options)
             else:
                 selected_emp = "Tất cả"
                 st.info("Không có dữ liệu")
         
-        # Áp dụng bộ lọc
-        if len(attendance_df) > 0:
-            filtered_df = attendance_df.copy()
+        # Load dữ liệu theo bộ lọc (truy vấn có index khi dùng SQLite)
+        filtered_df = load_attendance_filtered(
+            month_filter,
+            None if selected_emp == "Tất cả" else selected_emp
+        )
+        if len(filtered_df) > 0:
+            filtered_df = filtered_df.copy()
             
             # Đảm bảo cột Ngày là datetime
             filtered_df['Ngày'] = pd.to_datetime(filtered_df['Ngày'])
-            
-            # Lọc theo nhân viên
-            if selected_emp != "Tất cả":
-                filtered_df = filtered_df[filtered_df['Tên NV'] == selected_emp]
-        else:
-            filtered_df = attendance_df
         
         # Hiển thị dữ liệu
         if len(filtered_df) > 0:
             st.subheader(f"Tổng số bản ghi: {len(filtered_df)}")
             
             # Chuyển đổi lại định dạng ngày để hiển thị
-            display_df = filtered_df.copy()
+            display_df = filtered_df.drop(columns=RECORD_COLUMNS, errors='ignore')
             display_df['Ngày'] = display_df['Ngày'].dt.strftime('%Y-%m-%d')
             st.dataframe(display_df, use_container_width=True, hide_index=True)
             
-            # Tổng hợp theo nhân viên
+            # Tổng hợp theo nhân viên (tất cả nhân viên: lấy từ tổng hợp theo tháng)
             st.subheader("Tổng hợp giờ làm theo nhân viên")
-            summary = filtered_df.groupby('Tên NV')['Tổng giờ'].agg(['sum', 'count']).reset_index()
+            if selected_emp == "Tất cả":
+                summary = get_month_aggregates().employee_totals(month_filter)[['Tên NV', 'Tổng giờ', 'Số bản ghi có giờ']]
+            else:
+                summary = filtered_df.groupby('Tên NV')['Tổng giờ'].agg(['sum', 'count']).reset_index()
             summary.columns = ['Tên nhân viên', 'Tổng giờ làm', 'Số ngày công']
             summary['Tổng giờ làm'] = summary['Tổng giờ làm'].round(2)
             st.dataframe(summary, use_container_width=True, hide_index=True)
@@ -490,13 +696,13 @@ with tab4:
             with col1:
                 if st.button("📥 Xuất báo cáo chi tiết (Excel)"):
                     filename = f"bao_cao_cham_cong_{selected_month if selected_month != 'Tất cả' else 'tat_ca'}.xlsx"
-                    display_df.to_excel(filename, index=False)
+                    export_excel(display_df, filename)
                     st.success(f"✅ Đã xuất file {filename}")
             
             with col2:
                 if st.button("📥 Xuất tổng hợp (Excel)"):
                     filename = f"tong_hop_cham_cong_{selected_month if selected_month != 'Tất cả' else 'tat_ca'}.xlsx"
-                    summary.to_excel(filename, index=False)
+                    export_excel(summary, filename)
                     st.success(f"✅ Đã xuất file {filename}")
         else:
             st.info("Không có dữ liệu phù hợp với bộ lọc")
@@ -504,26 +710,28 @@ with tab4:
         st.info("Chưa có dữ liệu chấm công")
 
 # Tab 5: Thống kê
-with tab5:
+if active_view == VIEWS[4]:
     st.header("Thống kê và biểu đồ")
     
-    attendance_df = load_attendance()
+    # Cộng tổng hợp của các tháng, không đọc lại từng bản ghi
+    aggregates = get_month_aggregates()
+    totals = aggregates.totals()
     
-    if len(attendance_df) > 0:
-        attendance_df['Ngày'] = pd.to_datetime(attendance_df['Ngày'])
+    if totals['records'] > 0:
+        emp_totals = aggregates.employee_totals().set_index('Tên NV')
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Biểu đồ theo nhân viên
             st.subheader("Tổng giờ làm việc theo nhân viên")
-            emp_hours = attendance_df.groupby('Tên NV')['Tổng giờ'].sum().sort_values(ascending=False)
+            emp_hours = emp_totals['Tổng giờ'].sort_values(ascending=False)
             st.bar_chart(emp_hours)
         
         with col2:
             # Biểu đồ theo ngày
             st.subheader("Số lượng chấm công theo ngày")
-            daily_count = attendance_df.groupby(attendance_df['Ngày'].dt.date).size()
+            daily_count = aggregates.daily_counts()
             st.line_chart(daily_count)
         
         # Thống kê tổng quan
@@ -531,27 +739,24 @@ with tab5:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_records = len(attendance_df)
+            total_records = totals['records']
             st.metric("Tổng số bản ghi", total_records)
         
         with col2:
-            total_employees = attendance_df['Mã NV'].nunique()
+            total_employees = totals['employees']
             st.metric("Số nhân viên", total_employees)
         
         with col3:
-            total_hours = attendance_df['Tổng giờ'].sum()
+            total_hours = totals['hours']
             st.metric("Tổng giờ làm", f"{total_hours:.2f} h")
         
         with col4:
-            avg_hours = attendance_df['Tổng giờ'].mean()
+            avg_hours = totals['average_hours']
             st.metric("Trung bình giờ/ngày", f"{avg_hours:.2f} h")
         
         # Top nhân viên chăm chỉ
         st.subheader("🏆 Top 5 nhân viên chăm chỉ nhất")
-        top_employees = attendance_df.groupby('Tên NV').agg({
-            'Tổng giờ': 'sum',
-            'Ngày': 'count'
-        }).round(2)
+        top_employees = emp_totals[['Tổng giờ', 'Số bản ghi']].round(2)
         top_employees.columns = ['Tổng giờ làm', 'Số ngày công']
         top_employees = top_employees.sort_values('Tổng giờ làm', ascending=False).head(5)
         st.dataframe(top_employees, use_container_width=True)
@@ -560,57 +765,94 @@ with tab5:
         st.info("Chưa có dữ liệu để thống kê")
 
 # Tab 6: Xem dữ liệu
-with tab6:
+if active_view == VIEWS[5]:
     st.header("📁 Quản lý dữ liệu")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📊 File dữ liệu chấm công")
-        st.info(f"**Tên file:** {DATA_FILE}")
+        storage = get_storage()
+        st.info(f"**Backend:** {storage.name} | **Vị trí:** {storage.location()}")
         
-        if os.path.exists(DATA_FILE):
-            file_size = os.path.getsize(DATA_FILE) / 1024  # KB
-            st.success(f"✅ File tồn tại - Kích thước: {file_size:.2f} KB")
-            
-            # Hiển thị danh sách các sheet
-            try:
-                excel_file = pd.ExcelFile(DATA_FILE)
-                st.write(f"**Số sheet:** {len(excel_file.sheet_names)}")
-                st.write("**Danh sách các tháng:**")
-                for sheet in excel_file.sheet_names:
-                    if sheet != 'Template':
-                        df_sheet = pd.read_excel(DATA_FILE, sheet_name=sheet)
-                        st.write(f"- 📅 **{sheet}** ({len(df_sheet)} bản ghi)")
-            except Exception as e:
-                st.error(f"Lỗi đọc file: {e}")
-            
-            # Nút tải xuống file Excel
-            st.markdown("---")
-            with open(DATA_FILE, 'rb') as f:
-                st.download_button(
-                    label="📥 Tải xuống file chấm công",
-                    data=f,
-                    file_name=DATA_FILE,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
-            
-            # Xem nội dung file
-            st.markdown("---")
-            st.subheader("👁️ Xem nội dung từng sheet")
+        size_bytes = storage.size_bytes()
+        if size_bytes is not None:
+            st.success(f"✅ Dữ liệu tồn tại - Kích thước: {size_bytes / 1024:.2f} KB")
+        
+        # Hiển thị danh sách các tháng
+        try:
+            month_counts = storage.count_by_month()
+            st.write(f"**Số sheet:** {len(month_counts)}")
+            st.write("**Danh sách các tháng:**")
+            for month, count in month_counts.items():
+                st.write(f"- 📅 **{month}** ({count} bản ghi)")
+        except Exception as e:
+            st.error(f"Lỗi đọc dữ liệu: {e}")
+        
+        # Bản ghi chưa được ghi xuống nơi lưu trữ chính (Excel: nhật ký chưa gộp)
+        pending_count = storage.pending_writes()
+        if pending_count > 0:
+            st.info(f"📝 **Nhật ký:** {pending_count} bản ghi mới chưa gộp vào file chính")
+            if st.button("🗜️ Gộp nhật ký vào Excel", use_container_width=True):
+                merged = storage.flush()
+                st.success(f"✅ Đã gộp {merged} bản ghi")
+                st.rerun()
+        
+        # Xuất Excel (mỗi tháng một sheet) để tải xuống
+        st.markdown("---")
+        if st.button("📤 Tạo file Excel để tải xuống", use_container_width=True):
+            st.session_state['excel_export'] = storage.export_excel()
+        if 'excel_export' in st.session_state:
+            st.download_button(
+                label="📥 Tải xuống file chấm công",
+                data=st.session_state['excel_export'],
+                file_name=DATA_FILE,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+        
+        # Tính lại tổng giờ hàng loạt (ví dụ sau khi đổi quy định giờ nghỉ trưa)
+        st.markdown("---")
+        st.subheader("🔁 Tính lại tổng giờ")
+        recompute_options = sorted(get_available_months(), reverse=True)
+        recompute_scope = st.selectbox("Phạm vi", ["Tất cả"] + recompute_options, key="recompute_scope")
+        lunch_break = st.number_input("Giờ nghỉ trưa (giờ)", min_value=0.0, max_value=4.0,
+                                      value=LUNCH_BREAK_HOURS, step=0.25, key="recompute_lunch_break")
+        if st.button("🔁 Tính lại tổng giờ", use_container_width=True):
+            months = recompute_options if recompute_scope == "Tất cả" else [recompute_scope]
             try:
-                excel_file = pd.ExcelFile(DATA_FILE)
-                sheets_to_view = [s for s in excel_file.sheet_names if s != 'Template']
-                if sheets_to_view:
-                    selected_sheet = st.selectbox("Chọn sheet để xem", sheets_to_view)
-                    df_view = pd.read_excel(DATA_FILE, sheet_name=selected_sheet)
-                    st.dataframe(df_view, use_container_width=True, hide_index=True)
-                    st.info(f"Tổng số bản ghi trong sheet **{selected_sheet}**: {len(df_view)}")
+                with st.spinner("Đang tính lại..."):
+                    changed = recompute_months(storage, months, lunch_break)
+                for month_year in months:
+                    get_month_cache().invalidate(month_year)
+                get_today_index().invalidate()
+                get_month_aggregates().reindex(months)
+                st.success(f"✅ Đã tính lại {len(months)} tháng - {sum(changed.values())} bản ghi thay đổi")
             except Exception as e:
-                st.error(f"Lỗi: {e}")
-        else:
-            st.warning("⚠️ File chưa tồn tại. Hãy thêm dữ liệu chấm công để tạo file.")
+                st.error(f"Lỗi khi tính lại: {e}")
+        
+        # Dựng lại tổng hợp theo tháng (sau khi sửa dữ liệu ngoài ứng dụng)
+        st.markdown("---")
+        st.subheader("🧮 Tổng hợp theo tháng")
+        st.caption("Báo cáo tổng hợp và Thống kê dùng số liệu tổng hợp theo tháng, được cập nhật sau mỗi lần "
+                   "chấm công / sửa / xóa. Dựng lại khi dữ liệu bị sửa trực tiếp trên file.")
+        if st.button("🧮 Dựng lại tổng hợp", use_container_width=True):
+            with st.spinner("Đang dựng lại..."):
+                rebuilt = get_month_aggregates().reindex()
+            st.success(f"✅ Đã dựng lại tổng hợp của {rebuilt} tháng")
+        
+        # Xem nội dung từng tháng
+        st.markdown("---")
+        st.subheader("👁️ Xem nội dung từng sheet")
+        try:
+            sheets_to_view = sorted(get_available_months())
+            if sheets_to_view:
+                selected_sheet = st.selectbox("Chọn sheet để xem", sheets_to_view)
+                df_view = load_attendance_by_month(selected_sheet)
+                st.dataframe(df_view, use_container_width=True, hide_index=True)
+                st.info(f"Tổng số bản ghi trong sheet **{selected_sheet}**: {len(df_view)}")
+        except Exception as e:
+            st.error(f"Lỗi: {e}")
     
     with col2:
         st.subheader("👥 File danh sách nhân viên")
@@ -626,14 +868,13 @@ with tab6:
             
             # Nút tải xuống file CSV
             st.markdown("---")
-            with open(EMPLOYEE_FILE, 'rb') as f:
-                st.download_button(
-                    label="📥 Tải xuống danh sách nhân viên",
-                    data=f,
-                    file_name=EMPLOYEE_FILE,
-                    mime="text/csv",
-                    use_container_width=True
-                )
+            st.download_button(
+                label="📥 Tải xuống danh sách nhân viên",
+                data=emp_df.to_csv(index=False).encode('utf-8'),
+                file_name=EMPLOYEE_FILE,
+                mime="text/csv",
+                use_container_width=True
+            )
             
             # Xem nội dung file
             st.markdown("---")
@@ -654,6 +895,7 @@ with tab6:
         - Dữ liệu được lưu trong thư mục hiện tại
         - File chấm công: `attendance_data.xlsx`
         - File nhân viên: `employees.csv`
+        - Nhật ký chấm công mới: `attendance_journal.csv`
         
         **🔒 Bảo vệ dữ liệu:**
         - Dữ liệu được lưu tự động khi nhập
@@ -667,6 +909,7 @@ with tab6:
         - Mỗi sheet Excel = 1 tháng
         - Format tên sheet: YYYY-MM
         - Ví dụ: `2025-12` = Tháng 12/2025
+        - Chấm công mới ghi vào nhật ký, tự động gộp vào Excel
         
         **📊 Tính năng:**
         - Tự động tạo sheet theo tháng
@@ -674,6 +917,12 @@ with tab6:
         - Có thể mở bằng Excel/LibreOffice
         """)
 
+# Tab 7: Kiosk chấm công nhanh
+if active_view == VIEWS[6]:
+    st.header("🕒 Kiosk chấm công")
+    st.caption("Chọn tên rồi bấm một lần để vào ca / ra ca, giờ lấy theo đồng hồ hiện tại")
+    kiosk_panel()
+
 # Footer
 st.markdown("---")
 st.markdown("🏢 **Hệ thống chấm công nhân viên** | © 2025")
@@ -1,8 +1,35 @@
+import os
+from io import BytesIO
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
 import gspread
 from google.oauth2.service_account import Credentials
+from storage import (
+    DELETE_COLUMN,
+    EDITABLE_COLUMNS,
+    GSHEET_ATTENDANCE_COLUMNS,
+    GSHEET_EMPLOYEE_COLUMNS,
+    LUNCH_BREAK_HOURS,
+    RECORD_COLUMNS,
+    STANDARD_HOURS,
+    DayIndex,
+    EmployeeRegistry,
+    MonthAggregates,
+    MonthCache,
+    OT_MULTIPLIERS,
+    PayrollCache,
+    RateLimitedProxy,
+    RateLimiter,
+    RecordConflictError,
+    TieredStorage,
+    create_storage,
+    diff_month_edits,
+    import_attendance,
+    import_employees,
+    recompute_months,
+    write_excel_file,
+)
 
 # Cấu hình trang
 st.set_page_config(
@@ -17,16 +44,65 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Đọc cấu hình: biến môi trường (tên viết hoa) được ưu tiên hơn secrets
+def get_setting(name, default=None):
+    if name.upper() in os.environ:
+        return os.environ[name.upper()]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        # Chưa có file secrets.toml
+        return default
+
+# Quota Google Sheets API mặc định: 60 lượt đọc và 60 lượt ghi mỗi phút cho mỗi người dùng
+SHEETS_READ_PER_MINUTE = int(get_setting("sheets_read_per_minute", 60))
+SHEETS_WRITE_PER_MINUTE = int(get_setting("sheets_write_per_minute", 60))
+
+# Chu kỳ tự làm mới bảng "Chấm công hôm nay" (giây)
+TODAY_REFRESH_SECONDS = int(get_setting("today_refresh_seconds", 30))
+# Số nhân viên tối đa trong ô chọn (gõ để tìm khi danh sách dài hơn)
+EMPLOYEE_OPTION_LIMIT = 200
+
+# Bảng lương: hệ số OT ngày thường / ngày nghỉ hằng tuần / ngày lễ, ngày nghỉ hằng tuần
+# (0 = thứ Hai ... 6 = Chủ nhật) và danh sách ngày lễ "YYYY-MM-DD" cách nhau bởi dấu phẩy
+PAYROLL_OT_MULTIPLIERS = {
+    day_type: float(get_setting(f"ot_multiplier_{day_type}", default))
+    for day_type, default in OT_MULTIPLIERS.items()
+}
+PAYROLL_WEEKEND_DAYS = tuple(int(d) for d in str(get_setting("weekend_days", "6")).split(",") if d.strip())
+PAYROLL_HOLIDAYS = tuple(d.strip() for d in str(get_setting("holidays", "")).split(",") if d.strip())
+
+# Giả lập Google Sheets trong process (chạy thử / đo hiệu năng không cần mạng):
+# GSHEET_FAKE=1, độ trễ GSHEET_FAKE_LATENCY (giây), quota GSHEET_FAKE_READ_QUOTA / GSHEET_FAKE_WRITE_QUOTA,
+# lỗi ngẫu nhiên GSHEET_FAKE_ERROR_RATE, dữ liệu nạp sẵn GSHEET_FAKE_DATA (file JSON tạo bằng FakeClient.dump)
+# (hoặc các khóa tương ứng viết thường trong secrets)
+USE_FAKE_GSHEET = str(get_setting("gsheet_fake", "")).lower() in ("1", "true", "yes")
+
+def create_fake_client():
+    from storage.fake_gsheet import FakeClient
+    read_quota = get_setting("gsheet_fake_read_quota")
+    write_quota = get_setting("gsheet_fake_write_quota")
+    return FakeClient(
+        latency=float(get_setting("gsheet_fake_latency", 0)),
+        read_quota=int(read_quota) if read_quota else None,
+        write_quota=int(write_quota) if write_quota else None,
+        error_rate=float(get_setting("gsheet_fake_error_rate", 0)),
+        data_file=get_setting("gsheet_fake_data")
+    )
+
 # Kết nối Google Sheets
 @st.cache_resource
 def get_gspread_client():
-    """Khởi tạo kết nối Google Sheets"""
+    """Khởi tạo kết nối Google Sheets (mọi lệnh gọi API đi qua bộ giới hạn tốc độ dùng chung)"""
     try:
+        limiter = RateLimiter(SHEETS_READ_PER_MINUTE, SHEETS_WRITE_PER_MINUTE)
+        if USE_FAKE_GSHEET:
+            return RateLimitedProxy(create_fake_client(), limiter)
         credentials = Credentials.from_service_account_info(
             st.secrets["gcp_service_account"],
             scopes=SCOPES
         )
-        return gspread.authorize(credentials)
+        return RateLimitedProxy(gspread.authorize(credentials), limiter)
     except Exception as e:
         st.error(f"Lỗi kết nối Google Sheets: {e}")
         st.info("Vui lòng kiểm tra cấu hình secrets trong .streamlit/secrets.toml")
@@ -34,8 +110,12 @@ def get_gspread_client():
 
 # Lấy Google Sheet IDs từ secrets
 try:
-    ATTENDANCE_SHEET_ID = st.secrets["attendance_spreadsheet_id"]
-    EMPLOYEES_SHEET_ID = st.secrets["employees_spreadsheet_id"]
+    if USE_FAKE_GSHEET:
+        ATTENDANCE_SHEET_ID = get_setting("attendance_spreadsheet_id", "fake-attendance")
+        EMPLOYEES_SHEET_ID = get_setting("employees_spreadsheet_id", "fake-employees")
+    else:
+        ATTENDANCE_SHEET_ID = st.secrets["attendance_spreadsheet_id"]
+        EMPLOYEES_SHEET_ID = st.secrets["employees_spreadsheet_id"]
 except Exception as e:
     st.error("⚠️ Chưa cấu hình spreadsheet IDs trong secrets.toml")
     st.error(f"Chi tiết lỗi: {e}")
@@ -49,161 +129,230 @@ if gc is None:
     st.error("❌ Không thể kết nối Google Sheets. Vui lòng kiểm tra cấu hình.")
     st.stop()
 
+# Backend lưu trữ: "gsheet" (mặc định) hoặc "tiered" (SQLite cục bộ làm bộ đệm trước Google Sheets)
+STORAGE_BACKEND = get_setting("storage_backend", "gsheet")
+
+# Backend lưu trữ dùng chung giữa các phiên
+@st.cache_resource
+def get_storage():
+    return create_storage(
+        STORAGE_BACKEND,
+        attendance_columns=GSHEET_ATTENDANCE_COLUMNS,
+        employee_columns=GSHEET_EMPLOYEE_COLUMNS,
+        db_file="attendance_cache.db",
+        client=gc,
+        attendance_sheet_id=ATTENDANCE_SHEET_ID,
+        employees_sheet_id=EMPLOYEES_SHEET_ID
+    )
+
+storage = get_storage()
+
+# Phần Google Sheets của backend (backend tiered: remote phía sau bộ đệm)
+def get_gsheet_storage():
+    return storage.remote if isinstance(storage, TieredStorage) else storage
+
+# Danh sách nhân viên có index dùng chung giữa các phiên (đọc lại sau 5 phút hoặc khi thêm/xóa nhân viên)
+@st.cache_resource
+def get_employee_registry():
+    return EmployeeRegistry(storage, ttl=300)
+
+employee_registry = get_employee_registry()
+
 # Đọc danh sách nhân viên từ Google Sheets
-@st.cache_data(ttl=300)  # Tăng cache lên 5 phút
 def load_employees():
     """Đọc danh sách nhân viên từ Google Sheets"""
     try:
-        sheet = gc.open_by_key(EMPLOYEES_SHEET_ID).sheet1
-        data = sheet.get_all_records()
-        if data:
-            return pd.DataFrame(data)
-        else:
-            # Tạo dữ liệu mẫu nếu sheet trống
-            df_empty = pd.DataFrame(columns=['Tên NV', 'Tiền công/ngày'])
-            return df_empty
+        return employee_registry.employees()
+    except Exception as e:
+        st.error(f"Lỗi đọc danh sách nhân viên: {e}")
+        return pd.DataFrame(columns=GSHEET_EMPLOYEE_COLUMNS)
+
+# Số nhân viên (0 nếu không đọc được danh sách)
+def employee_count():
+    try:
+        return len(employee_registry)
     except Exception as e:
         st.error(f"Lỗi đọc danh sách nhân viên: {e}")
-        return pd.DataFrame(columns=['Tên NV', 'Tiền công/ngày'])
+        return 0
+
+# Chọn nhân viên: gõ tên (không cần dấu) để tìm; trả về Tên NV
+def employee_picker(label, key, current=None):
+    query = st.text_input("Tìm nhân viên", key=f"{key}_search", placeholder="Nhập tên...")
+    options = employee_registry.search(query, limit=EMPLOYEE_OPTION_LIMIT)
+    if not options:
+        st.caption("Không tìm thấy nhân viên phù hợp, hiển thị toàn bộ danh sách")
+        options = employee_registry.search('', limit=EMPLOYEE_OPTION_LIMIT)
+    if current is not None and current not in options and employee_registry.get(current) is not None:
+        options = [current] + options
+    index = options.index(current) if current in options else 0
+    return st.selectbox(label, options, index=index, key=key)
+
+# Bộ đệm chấm công theo tháng dùng chung giữa các phiên (5 phút), cập nhật trực tiếp khi ghi
+@st.cache_resource
+def get_month_cache():
+    return MonthCache(storage, ttl=300)
+
+month_cache = get_month_cache()
+
+# Chấm công hôm nay dùng chung giữa các phiên: chỉ đọc các dòng mới của tháng trong bộ đệm
+@st.cache_resource
+def get_today_index():
+    return DayIndex(month_cache, GSHEET_ATTENDANCE_COLUMNS)
+
+today_index = get_today_index()
+
+# Tổng hợp theo tháng dùng chung giữa các phiên: cập nhật sau mỗi lần ghi, Thống kê không phải quét mọi bản ghi
+@st.cache_resource
+def get_month_aggregates():
+    return MonthAggregates(month_cache, 'Tên NV')
+
+month_aggregates = get_month_aggregates()
+
+# Bảng lương theo tháng dùng chung giữa các phiên: chỉ tính lại khi dữ liệu tháng hoặc danh sách nhân viên đổi
+@st.cache_resource
+def get_payroll_cache():
+    return PayrollCache(month_cache, employee_registry, standard_hours=STANDARD_HOURS,
+                        ot_multipliers=PAYROLL_OT_MULTIPLIERS, weekend_days=PAYROLL_WEEKEND_DAYS,
+                        holidays=PAYROLL_HOLIDAYS)
+
+# Bảng lương một tháng (None nếu không tính được)
+def load_payroll(month_year):
+    try:
+        return get_payroll_cache().get(month_year)
+    except Exception as e:
+        st.error(f"Lỗi tính bảng lương: {e}")
+        return None
+
+# Xuất bảng lương ra Excel (bytes để tải về)
+def payroll_excel(payroll, month_year):
+    buffer = BytesIO()
+    write_excel_file(payroll, buffer, sheet_name=f"Lương {month_year}")
+    return buffer.getvalue()
 
 # Đọc dữ liệu chấm công từ một sheet cụ thể
-@st.cache_data(ttl=300)  # Tăng cache lên 5 phút
 def load_attendance_by_month(month_year):
     """Đọc dữ liệu từ sheet theo tháng (format: YYYY-MM)"""
     try:
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        
-        # Kiểm tra sheet có tồn tại không
-        try:
-            worksheet = spreadsheet.worksheet(month_year)
-            data = worksheet.get_all_records()
-            if data:
-                df = pd.DataFrame(data)
-                # Đảm bảo có cột OT, nếu không thì thêm = 0
-                if 'OT' not in df.columns:
-                    df['OT'] = 0
-                return df
-        except gspread.exceptions.WorksheetNotFound:
-            pass
-        
-        return pd.DataFrame(columns=['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú'])
+        return month_cache.load_month(month_year)
     except Exception as e:
         st.error(f"Lỗi đọc dữ liệu chấm công: {e}")
-        return pd.DataFrame(columns=['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú'])
+        return pd.DataFrame(columns=GSHEET_ATTENDANCE_COLUMNS)
 
 # Đọc tất cả dữ liệu chấm công
-@st.cache_data(ttl=300)  # Tăng cache lên 5 phút
 def load_attendance():
     """Đọc dữ liệu từ tất cả các sheet"""
     try:
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        worksheets = spreadsheet.worksheets()
-        
-        all_data = []
-        for ws in worksheets:
-            # Bỏ qua sheet Template hoặc sheet mặc định
-            if ws.title not in ['Sheet1', 'Template']:
-                data = ws.get_all_records()
-                if data:
-                    all_data.extend(data)
-        
-        if all_data:
-            df = pd.DataFrame(all_data)
-            # Đảm bảo có cột OT, nếu không thì thêm vào
-            if 'OT' not in df.columns:
-                df['OT'] = 0
-            return df
-        return pd.DataFrame(columns=['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú'])
+        return month_cache.load_all()
     except Exception as e:
         st.error(f"Lỗi đọc tất cả dữ liệu: {e}")
-        return pd.DataFrame(columns=['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú'])
+        return pd.DataFrame(columns=GSHEET_ATTENDANCE_COLUMNS)
 
 # Lưu bản ghi chấm công
 def save_attendance(employee_name, date_str, time_in, time_out, total_hours, ot_hours, note):
-    """Lưu dữ liệu chấm công vào Google Sheets"""
+    """Lưu dữ liệu chấm công vào Google Sheets (trả về 'pending' nếu đang chờ ghi theo lô)"""
     try:
-        # Xác định tên sheet theo tháng
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        sheet_name = date_obj.strftime("%Y-%m")
-        
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        
-        # Tạo hoặc lấy worksheet
-        try:
-            worksheet = spreadsheet.worksheet(sheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            # Tạo sheet mới
-            worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="7")
-            # Thêm header
-            worksheet.append_row(['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú'])
+        record = dict(zip(
+            GSHEET_ATTENDANCE_COLUMNS,
+            [employee_name, date_str, time_in, time_out, total_hours, ot_hours, note]
+        ))
+        status = storage.save_attendance(record)
         
-        # Thêm dữ liệu
-        worksheet.append_row([employee_name, date_str, time_in, time_out, total_hours, ot_hours, note])
+        # Thêm dòng vào bộ đệm của tháng (không đọc lại)
+        month_cache.apply_save(record)
+        month_aggregates.apply_save(record)
         
-        # Clear cache để refresh dữ liệu
-        load_attendance_by_month.clear()
-        load_attendance.clear()
-        
-        return True
+        return status or True
     except Exception as e:
         st.error(f"Lỗi lưu dữ liệu: {e}")
         return False
 
+# Bản ghi đã bị sửa/xóa ở nơi khác: bỏ bộ đệm của tháng để lần chạy lại đọc dữ liệu mới
+def show_conflict(sheet_name, e):
+    month_cache.invalidate(sheet_name)
+    month_aggregates.reindex(sheet_name)
+    st.error(f"⚠️ Bản ghi đã bị thay đổi ở nơi khác ({e}). Dữ liệu sẽ được tải lại, vui lòng thử lại.")
+
 # Xóa bản ghi chấm công
-def delete_attendance_record(sheet_name, row_index):
-    """Xóa một bản ghi chấm công (row_index là STT hiển thị, bắt đầu từ 1)"""
+def delete_attendance_record(sheet_name, record_id, version):
+    """Xóa một bản ghi chấm công (theo ID, chỉ khi chưa bị sửa kể từ lúc đọc)"""
     try:
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        worksheet = spreadsheet.worksheet(sheet_name)
+        storage.delete_attendance_record(sheet_name, record_id, version)
         
-        # row_index + 1 vì row 1 là header, +1 nữa vì index bắt đầu từ 1
-        actual_row = row_index + 2
-        worksheet.delete_rows(actual_row)
-        
-        # Clear cache
-        load_attendance_by_month.clear()
-        load_attendance.clear()
+        # Xóa dòng khỏi bộ đệm của tháng
+        month_cache.apply_delete(sheet_name, record_id)
+        today_index.apply_delete(sheet_name, record_id)
+        month_aggregates.apply_delete(sheet_name, record_id)
         
         return True
+    except RecordConflictError as e:
+        show_conflict(sheet_name, e)
+        return False
     except Exception as e:
         st.error(f"Lỗi xóa dữ liệu: {e}")
         return False
 
 # Cập nhật bản ghi chấm công
-def update_attendance_record(sheet_name, row_index, employee_name, date_str, time_in, time_out, total_hours, ot_hours, note):
-    """Cập nhật một bản ghi chấm công"""
+def update_attendance_record(sheet_name, record_id, version, employee_name, date_str, time_in, time_out, total_hours, ot_hours, note):
+    """Cập nhật một bản ghi chấm công (theo ID, chỉ khi chưa bị sửa kể từ lúc đọc)"""
     try:
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        worksheet = spreadsheet.worksheet(sheet_name)
+        record = dict(zip(
+            GSHEET_ATTENDANCE_COLUMNS,
+            [employee_name, date_str, time_in, time_out, total_hours, ot_hours, note]
+        ))
+        storage.update_attendance_record(sheet_name, record_id, record, version)
         
-        # row_index + 2 vì row 1 là header
-        actual_row = row_index + 2
-        worksheet.update(f'A{actual_row}:G{actual_row}', 
-                        [[employee_name, date_str, time_in, time_out, total_hours, ot_hours, note]])
-        
-        # Clear cache
-        load_attendance_by_month.clear()
-        load_attendance.clear()
+        # Sửa dòng trong bộ đệm của tháng
+        month_cache.apply_update(sheet_name, record_id, record)
+        today_index.apply_update(sheet_name, record_id, record)
+        month_aggregates.apply_update(sheet_name, record_id, record)
         
         return True
+    except RecordConflictError as e:
+        show_conflict(sheet_name, e)
+        return False
     except Exception as e:
         st.error(f"Lỗi cập nhật dữ liệu: {e}")
         return False
 
+# Lưu các thay đổi trên bảng sửa nhiều dòng
+def apply_month_edits(sheet_name, original_df, edited_df):
+    """Chỉ ghi các dòng có ô thay đổi hoặc được đánh dấu xóa: một request sửa và một request xóa dòng.
+
+    Trả về (số dòng sửa, số dòng xóa) hoặc None nếu không ghi.
+    """
+    updates, deletes, errors = diff_month_edits(original_df, edited_df, GSHEET_ATTENDANCE_COLUMNS,
+                                                LUNCH_BREAK_HOURS, STANDARD_HOURS)
+    if len(errors) > 0:
+        st.error(f"❌ {len(errors)} dòng không hợp lệ, chưa lưu thay đổi nào")
+        st.dataframe(errors.drop(columns=[DELETE_COLUMN], errors='ignore'), use_container_width=True, hide_index=True)
+        return None
+    if not updates and not deletes:
+        st.info("Không có thay đổi nào")
+        return None
+    try:
+        storage.apply_attendance_changes(sheet_name, updates, deletes)
+        
+        # Sửa bộ đệm của tháng bằng một lần sao chép
+        month_cache.apply_changes(sheet_name, updates, deletes)
+        today_index.apply_changes(sheet_name, updates, deletes)
+        month_aggregates.apply_changes(sheet_name, updates, deletes)
+        
+        return len(updates), len(deletes)
+    except RecordConflictError as e:
+        show_conflict(sheet_name, e)
+        return None
+    except Exception as e:
+        st.error(f"Lỗi lưu dữ liệu: {e}")
+        return None
+
 # Thêm nhân viên mới
 def add_employee(emp_name, daily_wage):
     """Thêm nhân viên mới vào Google Sheets"""
     try:
-        sheet = gc.open_by_key(EMPLOYEES_SHEET_ID).sheet1
+        storage.add_employee({'Tên NV': emp_name, 'Tiền công/ngày': daily_wage})
         
-        # Kiểm tra nếu sheet trống, thêm header
-        if sheet.row_count == 0 or len(sheet.get_all_values()) == 0:
-            sheet.append_row(['Tên NV', 'Tiền công/ngày'])
-        
-        sheet.append_row([emp_name, daily_wage])
-        
-        # Clear cache
-        load_employees.clear()
+        # Dựng lại danh sách nhân viên ở lần đọc tới
+        employee_registry.invalidate()
         
         return True
     except Exception as e:
@@ -212,16 +361,12 @@ def add_employee(emp_name, daily_wage):
 
 # Xóa nhân viên
 def delete_employee(row_index):
-    """Xóa nhân viên khỏi Google Sheets (row_index là STT hiển thị, bắt đầu từ 1)"""
+    """Xóa nhân viên khỏi Google Sheets (row_index là STT hiển thị - 1)"""
     try:
-        sheet = gc.open_by_key(EMPLOYEES_SHEET_ID).sheet1
+        storage.delete_employee(row_index)
         
-        # row_index + 1 vì row 1 là header, +1 nữa vì index bắt đầu từ 1
-        actual_row = row_index + 2
-        sheet.delete_rows(actual_row)
-        
-        # Clear cache
-        load_employees.clear()
+        # Dựng lại danh sách nhân viên ở lần đọc tới
+        employee_registry.invalidate()
         
         return True
     except Exception as e:
@@ -234,8 +379,11 @@ def calculate_hours(time_in, time_out):
         time_in_dt = datetime.strptime(time_in, "%H:%M")
         time_out_dt = datetime.strptime(time_out, "%H:%M")
         diff = time_out_dt - time_in_dt
+        # Giờ ra trước giờ vào: ca qua đêm, giờ ra thuộc ngày hôm sau
+        if diff.total_seconds() < 0:
+            diff += timedelta(days=1)
         hours = diff.total_seconds() / 3600
-        hours = hours - 1.0
+        hours = hours - LUNCH_BREAK_HOURS
         hours = max(0, hours)
         return round(hours, 2)
     return 0
@@ -243,89 +391,133 @@ def calculate_hours(time_in, time_out):
 # Tính OT (nếu > 8 giờ)
 def calculate_ot(total_hours):
     """Tính giờ OT nếu tổng giờ > 8"""
-    if total_hours > 8:
-        return round(total_hours - 8, 2)
+    if total_hours > STANDARD_HOURS:
+        return round(total_hours - STANDARD_HOURS, 2)
     return 0
 
+# Đọc giờ "HH:MM"; ô trống (ca chưa ra) thì dùng giá trị mặc định
+def parse_time(value, default):
+    if isinstance(value, str) and value.strip():
+        return datetime.strptime(value.strip(), "%H:%M").time()
+    return default
+
+# Ca đang mở (đã vào, chưa ra) của nhân viên: tìm trong ngày date_str rồi ngày hôm trước (ca qua đêm);
+# trả về dòng chấm công (Series) hoặc None
+def find_open_punch(employee_name, date_str):
+    day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    months = {}
+    for punch_date in (date_str, (day - timedelta(days=1)).strftime("%Y-%m-%d")):
+        if punch_date[:7] not in months:
+            months[punch_date[:7]] = load_attendance_by_month(punch_date[:7])
+        month_df = months[punch_date[:7]]
+        if len(month_df) == 0:
+            continue
+        time_out = month_df['Giờ ra'].fillna('').astype(str).str.strip()
+        is_open = (
+            (month_df['Tên NV'] == employee_name)
+            & (month_df['Ngày'].astype(str) == punch_date)
+            & (time_out == '')
+        )
+        positions = is_open.to_numpy().nonzero()[0]
+        if len(positions) > 0:
+            return month_df.iloc[positions[-1]]
+    return None
+
+# Kiosk: vào ca = ghi thêm một bản ghi chưa có giờ ra
+def kiosk_clock_in(employee_name):
+    now = datetime.now()
+    if save_attendance(employee_name, now.strftime("%Y-%m-%d"), now.strftime("%H:%M"), "", 0, 0, ""):
+        st.session_state.kiosk_message = f"🟢 {employee_name} vào ca lúc {now.strftime('%H:%M')}"
+
+# Kiosk: ra ca = cập nhật giờ ra, tổng giờ và OT cho ca đang mở (bản ghi giữ Ngày vào ca, kể cả ca qua đêm)
+def kiosk_clock_out(employee_name, record_id, version, date_str, time_in, note):
+    now = datetime.now()
+    time_out = now.strftime("%H:%M")
+    total_hours = calculate_hours(time_in, time_out)
+    ot_hours = calculate_ot(total_hours)
+    if update_attendance_record(date_str[:7], record_id, version, employee_name, date_str, time_in, time_out, total_hours, ot_hours, note):
+        st.session_state.kiosk_message = (
+            f"🔴 {employee_name} ra ca lúc {time_out} - Tổng: {total_hours} giờ"
+            + (f" (OT: {ot_hours}h)" if ot_hours > 0 else "")
+        )
+
+# Kiosk chấm công nhanh: chạy trong fragment nên bấm nút chỉ chạy lại phần này, không chạy lại cả trang
+@st.fragment
+def kiosk_panel():
+    if employee_count() == 0:
+        st.warning("⚠️ Chưa có nhân viên nào. Vui lòng thêm nhân viên ở tab 'Quản lý nhân viên'")
+        return
+    
+    selected_employee = employee_picker("Chọn tên của bạn", "kiosk_employee")
+    
+    today_str = date.today().strftime("%Y-%m-%d")
+    open_record = find_open_punch(selected_employee, today_str)
+    if open_record is None:
+        st.button("🟢 Vào ca", type="primary", use_container_width=True,
+                  on_click=kiosk_clock_in, args=(selected_employee,))
+    else:
+        note = str(open_record['Ghi chú']) if pd.notna(open_record['Ghi chú']) else ""
+        open_date = str(open_record['Ngày'])
+        since = open_record['Giờ vào'] if open_date == today_str else f"{open_record['Giờ vào']} ngày {open_date}"
+        st.info(f"Đang trong ca từ **{since}**")
+        st.button("🔴 Ra ca", type="primary", use_container_width=True,
+                  on_click=kiosk_clock_out,
+                  args=(selected_employee, open_record['ID'], int(open_record['Phiên bản']), open_date,
+                        open_record['Giờ vào'], note))
+    
+    if st.session_state.get('kiosk_message'):
+        st.success(st.session_state.kiosk_message)
+
 # Hàm sửa header cho sheet cũ (chạy một lần)
 def fix_sheet_headers():
     """Sửa header cho tất cả các sheet cũ"""
     try:
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        worksheets = spreadsheet.worksheets()
-        expected_header = ['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú']
-        
-        fixed_sheets = []
-        for ws in worksheets:
-            if ws.title not in ['Sheet1', 'Template']:
-                header = ws.row_values(1)
-                
-                # Nếu header chưa đúng
-                if header != expected_header:
-                    # Nếu sheet cũ chỉ có 6 cột, thêm cột OT
-                    if len(header) == 6 and header == ['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'Ghi chú']:
-                        all_data = ws.get_all_values()
-                        if len(all_data) > 1:  # Có dữ liệu
-                            # Chuẩn bị dữ liệu mới với cột OT
-                            new_data = [expected_header]  # Header mới
-                            
-                            for row in all_data[1:]:  # Bỏ qua header cũ
-                                if len(row) >= 6:
-                                    # Lấy dữ liệu cũ
-                                    ten_nv = row[0]
-                                    ngay = row[1]
-                                    gio_vao = row[2]
-                                    gio_ra = row[3]
-                                    tong_gio = row[4]
-                                    ghi_chu = row[5] if len(row) > 5 else ""
-                                    
-                                    # Tính OT
-                                    try:
-                                        total_hours = float(tong_gio) if tong_gio and tong_gio != '' else 0
-                                        ot = round(max(0, total_hours - 8), 2)
-                                    except:
-                                        ot = 0
-                                    
-                                    # Thêm dòng mới với cột OT
-                                    new_data.append([ten_nv, ngay, gio_vao, gio_ra, tong_gio, ot, ghi_chu])
-                            
-                            # Xóa tất cả dữ liệu cũ và ghi dữ liệu mới (nhanh hơn update từng dòng)
-                            ws.clear()
-                            ws.update(f'A1:G{len(new_data)}', new_data)
-                            fixed_sheets.append(ws.title)
-                    else:
-                        # Chỉ cập nhật header
-                        ws.update('A1:G1', [expected_header])
-                        fixed_sheets.append(ws.title)
-        
-        return fixed_sheets
+        return get_gsheet_storage().fix_sheet_headers()
     except Exception as e:
         st.error(f"Lỗi sửa header: {e}")
         return []
 
 # Lấy danh sách các sheet (tháng)
-@st.cache_data(ttl=300)  # Tăng cache lên 5 phút
 def get_available_months():
     """Lấy danh sách các tháng có sẵn"""
     try:
-        spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-        worksheets = spreadsheet.worksheets()
-        months = [ws.title for ws in worksheets if ws.title not in ['Sheet1', 'Template']]
-        return months
+        return month_cache.get_available_months()
     except Exception as e:
         st.error(f"Lỗi lấy danh sách tháng: {e}")
         return []
 
+# Bảng chấm công hôm nay: fragment tự chạy lại sau mỗi TODAY_REFRESH_SECONDS giây (không chạy lại cả trang)
+@st.fragment(run_every=TODAY_REFRESH_SECONDS)
+def today_panel():
+    today_str = date.today().strftime("%Y-%m-%d")
+    try:
+        today_attendance = today_index.load(today_str)
+    except Exception as e:
+        st.error(f"Lỗi đọc dữ liệu chấm công: {e}")
+        return
+    if len(today_attendance) > 0:
+        st.dataframe(today_attendance.drop(columns=RECORD_COLUMNS), use_container_width=True, hide_index=True)
+    else:
+        st.info("Chưa có bản ghi chấm công nào hôm nay")
+
 # Header
 st.title("⏰ Hệ thống chấm công nhân viên")
-st.success("✅ Đã kết nối Google Sheets - Dữ liệu được lưu trữ vĩnh viễn")
+if USE_FAKE_GSHEET:
+    st.warning("🧪 Đang dùng Google Sheets giả lập - dữ liệu chỉ nằm trong bộ nhớ")
+else:
+    st.success("✅ Đã kết nối Google Sheets - Dữ liệu được lưu trữ vĩnh viễn")
 st.markdown("---")
 
-# Tạo tabs
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📝 Chấm công", "✏️ Sửa/Xóa", "👥 Quản lý nhân viên", "📊 Báo cáo", "📈 Thống kê", "📁 Dữ liệu"])
+# Điều hướng: chỉ chạy phần của trang đang xem (st.tabs chạy cả 6 tab ở mỗi lần chạy lại)
+VIEWS = ["📝 Chấm công", "✏️ Sửa/Xóa", "👥 Quản lý nhân viên", "📊 Báo cáo", "📈 Thống kê", "📁 Dữ liệu", "🕒 Kiosk"]
+# Mở thẳng kiosk bằng ?kiosk=1 (máy chấm công đặt tại xưởng)
+active_view = st.radio(
+    "Chức năng", VIEWS, index=len(VIEWS) - 1 if st.query_params.get("kiosk") else 0,
+    horizontal=True, label_visibility="collapsed", key="active_view"
+)
 
 # Tab 1: Chấm công
-with tab1:
+if active_view == VIEWS[0]:
     st.header("Chấm công hàng ngày")
     
     col1, col2 = st.columns(2)
@@ -333,13 +525,11 @@ with tab1:
     with col1:
         st.subheader("Thông tin chấm công")
         
-        employees_df = load_employees()
-        if len(employees_df) > 0:
-            employee_options = [row['Tên NV'] for _, row in employees_df.iterrows()]
-            selected_employee = st.selectbox("Chọn nhân viên", employee_options)
+        if employee_count() > 0:
+            selected_employee = employee_picker("Chọn nhân viên", "attendance_employee")
             
             # Lấy thông tin tiền công
-            emp_info = employees_df[employees_df['Tên NV'] == selected_employee].iloc[0]
+            emp_info = employee_registry.get(selected_employee)
             st.info(f"💰 **Tiền công/ngày:** {emp_info['Tiền công/ngày']:,} VNĐ")
             
             attendance_date = st.date_input("Ngày", value=date.today())
@@ -359,7 +549,7 @@ with tab1:
             
             if st.button("✅ Lưu chấm công", type="primary", use_container_width=True):
                 with st.spinner("Đang lưu vào Google Sheets..."):
-                    if save_attendance(
+                    status = save_attendance(
                         selected_employee,
                         attendance_date.strftime("%Y-%m-%d"),
                         time_in_str,
@@ -367,8 +557,11 @@ with tab1:
                         estimated_hours,
                         estimated_ot,
                         note
-                    ):
+                    )
+                    if status:
                         st.success(f"✅ Đã lưu chấm công cho {selected_employee} - Tổng: {estimated_hours} giờ" + (f" (OT: {estimated_ot}h)" if estimated_ot > 0 else ""))
+                        if status == 'pending':
+                            st.toast("⏳ Đang chờ ghi lên Google Sheets (ghi theo lô)")
                         st.rerun()
                     else:
                         st.error("❌ Có lỗi khi lưu dữ liệu")
@@ -377,21 +570,41 @@ with tab1:
     
     with col2:
         st.subheader("Chấm công hôm nay")
-        current_month = date.today().strftime("%Y-%m")
-        today_str = date.today().strftime("%Y-%m-%d")
-        
-        month_attendance = load_attendance_by_month(current_month)
-        if len(month_attendance) > 0:
-            today_attendance = month_attendance[month_attendance['Ngày'] == today_str]
-            if len(today_attendance) > 0:
-                st.dataframe(today_attendance, use_container_width=True, hide_index=True)
-            else:
-                st.info("Chưa có bản ghi chấm công nào hôm nay")
-        else:
-            st.info("Chưa có dữ liệu chấm công trong tháng này")
+        today_panel()
+    
+    # Nhập hàng loạt từ file xuất của máy chấm công
+    st.markdown("---")
+    with st.expander("📥 Nhập chấm công từ file (CSV/XLSX)"):
+        st.caption("Cột bắt buộc: Tên NV, Ngày (YYYY-MM-DD hoặc DD/MM/YYYY), Giờ vào; "
+                   "tùy chọn: Giờ ra, Ghi chú. Tổng giờ/OT được tính tự động.")
+        uploaded_file = st.file_uploader("Chọn file", type=["csv", "xlsx"], key="import_file")
+        if uploaded_file is not None and st.button("📥 Nhập dữ liệu", type="primary", key="import_button"):
+            progress_bar = st.progress(0.0, text="Đang đọc file...")
+            
+            def show_progress(fraction, rows_read):
+                progress_bar.progress(min(fraction or 0.0, 1.0), text=f"Đã đọc {rows_read} dòng")
+            
+            try:
+                result = import_attendance(storage, uploaded_file, uploaded_file.name, load_employees(),
+                                           progress=show_progress)
+                # Chỉ các tháng vừa nhập được đọc lại ở lần xem tiếp theo
+                for month_year in result['months']:
+                    month_cache.invalidate(month_year)
+                month_aggregates.reindex(result['months'])
+                progress_bar.progress(1.0, text="Hoàn tất")
+                st.success(f"✅ Đã nhập {result['imported']} bản ghi vào {len(result['months'])} tháng: " +
+                           ", ".join(f"{m} ({n})" for m, n in result['months'].items()))
+                invalid = result['invalid']
+                if len(invalid) > 0:
+                    st.warning(f"⚠️ {len(invalid)} dòng không hợp lệ đã bị bỏ qua")
+                    st.dataframe(invalid.head(100), use_container_width=True, hide_index=True)
+                    st.download_button("📥 Tải danh sách dòng lỗi", invalid.to_csv(index=False).encode('utf-8'),
+                                       file_name="import_errors.csv", mime="text/csv")
+            except Exception as e:
+                st.error(f"Lỗi nhập dữ liệu: {e}")
 
 # Tab 2: Sửa/Xóa
-with tab2:
+if active_view == VIEWS[1]:
     st.header("✏️ Sửa hoặc Xóa dữ liệu chấm công")
     
     available_months = get_available_months()
@@ -413,9 +626,27 @@ with tab2:
             st.markdown("---")
             st.subheader("📋 Danh sách chấm công")
             
-            display_df = df_month.copy()
+            # Sửa trực tiếp các ô Ngày, Giờ vào, Giờ ra, Ghi chú hoặc tick cột Xóa, lưu một lần
+            display_df = df_month.drop(columns=RECORD_COLUMNS, errors='ignore').astype(object)
             display_df.insert(0, 'STT', range(1, len(display_df) + 1))
-            st.dataframe(display_df, use_container_width=True, hide_index=True)
+            display_df[DELETE_COLUMN] = False
+            with st.form(f"batch_edit_{selected_month}"):
+                edited_df = st.data_editor(
+                    display_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    num_rows="fixed",
+                    disabled=[c for c in display_df.columns if c not in EDITABLE_COLUMNS + [DELETE_COLUMN]],
+                    column_config={DELETE_COLUMN: st.column_config.CheckboxColumn("🗑️ Xóa")},
+                    key=f"batch_editor_{selected_month}"
+                )
+                st.caption("Tổng giờ và OT được tính lại cho các dòng đã sửa. Chỉ các dòng thay đổi được ghi.")
+                batch_submitted = st.form_submit_button("💾 Lưu các thay đổi trên bảng", type="primary")
+            if batch_submitted:
+                result = apply_month_edits(selected_month, df_month, edited_df)
+                if result is not None:
+                    st.success(f"✅ Đã sửa {result[0]} và xóa {result[1]} bản ghi!")
+                    st.rerun()
             
             st.markdown("---")
             
@@ -446,7 +677,7 @@ with tab2:
                     
                     if st.button("🗑️ Xác nhận xóa", type="secondary", use_container_width=True):
                         with st.spinner("Đang xóa..."):
-                            if delete_attendance_record(selected_month, record_to_delete - 1):
+                            if delete_attendance_record(selected_month, record_info['ID'], int(record_info['Phiên bản'])):
                                 st.success("✅ Đã xóa bản ghi!")
                                 st.rerun()
             
@@ -465,23 +696,15 @@ with tab2:
                     current_record = df_month.iloc[record_to_edit - 1]
                     st.markdown("**Thông tin hiện tại:**")
                     
-                    employees_df = load_employees()
-                    if len(employees_df) > 0:
-                        emp_list = [row['Tên NV'] for _, row in employees_df.iterrows()]
-                        current_emp_idx = emp_list.index(current_record['Tên NV']) if current_record['Tên NV'] in emp_list else 0
-                        
-                        new_employee = st.selectbox(
-                            "Nhân viên", 
-                            emp_list,
-                            index=current_emp_idx,
-                            key="edit_emp"
-                        )
+                    if employee_count() > 0:
+                        # Nhân viên hiện tại được chọn sẵn (tra theo tên, không quét danh sách)
+                        new_employee = employee_picker("Nhân viên", "edit_emp", current=str(current_record['Tên NV']))
                         
                         current_date = datetime.strptime(str(current_record['Ngày']), "%Y-%m-%d").date()
                         new_date = st.date_input("Ngày", value=current_date, key="edit_date")
                         
-                        current_time_in = datetime.strptime(current_record['Giờ vào'], "%H:%M").time()
-                        current_time_out = datetime.strptime(current_record['Giờ ra'], "%H:%M").time()
+                        current_time_in = parse_time(current_record['Giờ vào'], time(8, 0))
+                        current_time_out = parse_time(current_record['Giờ ra'], time(17, 0))
                         
                         new_time_in = st.time_input("Giờ vào", value=current_time_in, key="edit_time_in")
                         new_time_out = st.time_input("Giờ ra", value=current_time_out, key="edit_time_out")
@@ -502,7 +725,8 @@ with tab2:
                             with st.spinner("Đang cập nhật..."):
                                 if update_attendance_record(
                                     selected_month,
-                                    record_to_edit - 1,
+                                    current_record['ID'],
+                                    int(current_record['Phiên bản']),
                                     new_employee,
                                     new_date.strftime("%Y-%m-%d"),
                                     new_time_in.strftime("%H:%M"),
@@ -519,7 +743,7 @@ with tab2:
         st.warning("⚠️ Chưa có dữ liệu chấm công. Hãy thêm dữ liệu ở tab 'Chấm công' trước.")
 
 # Tab 3: Quản lý nhân viên
-with tab3:
+if active_view == VIEWS[2]:
     st.header("Quản lý nhân viên")
     
     col1, col2 = st.columns([1, 2])
@@ -531,8 +755,7 @@ with tab3:
         
         if st.button("➕ Thêm nhân viên", type="primary", use_container_width=True):
             if new_emp_name:
-                employees_df = load_employees()
-                if new_emp_name in employees_df['Tên NV'].values:
+                if employee_registry.get(new_emp_name) is not None:
                     st.error("❌ Tên nhân viên đã tồn tại!")
                 else:
                     with st.spinner("Đang thêm nhân viên..."):
@@ -583,8 +806,27 @@ with tab3:
         else:
             st.info("Chưa có nhân viên nào")
 
+    # Nhập hàng loạt (ví dụ khi mở thêm chi nhánh): kiểm tra trùng tên trong bộ nhớ, ghi một lần
+    st.markdown("---")
+    with st.expander("📥 Nhập danh sách nhân viên từ file (CSV/XLSX)"):
+        st.caption("Cột bắt buộc: Tên NV, Tiền công/ngày. Tên đã có hoặc lặp lại trong file được bỏ qua.")
+        employee_file = st.file_uploader("Chọn file", type=["csv", "xlsx"], key="employee_import_file")
+        if employee_file is not None and st.button("📥 Nhập nhân viên", type="primary", key="employee_import_button"):
+            try:
+                result = import_employees(storage, employee_file, employee_file.name, employee_registry.keys())
+                employee_registry.invalidate()
+                st.success(f"✅ Đã thêm {result['inserted']} nhân viên | Trùng tên: {result['duplicates']} | "
+                           f"Không hợp lệ: {result['invalid']}")
+                rejected = result['rejected']
+                if len(rejected) > 0:
+                    st.dataframe(rejected.head(100), use_container_width=True, hide_index=True)
+                    st.download_button("📥 Tải danh sách dòng bị bỏ qua", rejected.to_csv(index=False).encode('utf-8'),
+                                       file_name="employee_import_errors.csv", mime="text/csv")
+            except Exception as e:
+                st.error(f"Lỗi nhập danh sách nhân viên: {e}")
+
 # Tab 4: Báo cáo (tương tự app.py nhưng dùng Google Sheets)
-with tab4:
+if active_view == VIEWS[3]:
     st.header("Báo cáo chấm công")
     
     available_months = get_available_months()
@@ -621,12 +863,18 @@ with tab4:
         if len(filtered_df) > 0:
             st.subheader(f"Tổng số bản ghi: {len(filtered_df)}")
             
-            display_df = filtered_df.copy()
+            display_df = filtered_df.drop(columns=RECORD_COLUMNS, errors='ignore')
             display_df['Ngày'] = display_df['Ngày'].dt.strftime('%Y-%m-%d')
             st.dataframe(display_df, use_container_width=True, hide_index=True)
             
             st.subheader("Tổng hợp giờ làm theo nhân viên")
-            summary = filtered_df.groupby('Tên NV')['Tổng giờ'].agg(['sum', 'count']).reset_index()
+            if selected_emp == "Tất cả":
+                # Tất cả nhân viên: lấy từ tổng hợp theo tháng
+                summary = month_aggregates.employee_totals(
+                    None if selected_month == "Tất cả" else selected_month
+                )[['Tên NV', 'Tổng giờ', 'Số bản ghi có giờ']]
+            else:
+                summary = filtered_df.groupby('Tên NV')['Tổng giờ'].agg(['sum', 'count']).reset_index()
             summary.columns = ['Tên nhân viên', 'Tổng giờ làm', 'Số bản ghi']
             summary['Tổng giờ làm'] = summary['Tổng giờ làm'].round(2)
             # Tính số ngày công dựa trên giờ làm (8 giờ = 1 ngày công)
@@ -634,47 +882,64 @@ with tab4:
             st.dataframe(summary, use_container_width=True, hide_index=True)
         else:
             st.info("Không có dữ liệu phù hợp với bộ lọc")
+        
+        # Bảng lương của tháng đang chọn (tất cả nhân viên)
+        if selected_month != "Tất cả":
+            st.subheader(f"💵 Bảng lương tháng {selected_month}")
+            payroll = load_payroll(selected_month)
+            if payroll is not None and len(payroll) > 0:
+                st.caption(
+                    f"Số ngày công = (Tổng giờ - OT) / {STANDARD_HOURS}; Tiền OT = giờ OT × tiền công 1 giờ × hệ số "
+                    f"(ngày thường {PAYROLL_OT_MULTIPLIERS['weekday']}, ngày nghỉ {PAYROLL_OT_MULTIPLIERS['weekend']}, "
+                    f"ngày lễ {PAYROLL_OT_MULTIPLIERS['holiday']})"
+                )
+                st.dataframe(payroll, use_container_width=True, hide_index=True)
+                st.metric("Tổng quỹ lương", f"{payroll['Tổng lương'].sum():,} VNĐ")
+                st.download_button(
+                    "📥 Xuất bảng lương (Excel)",
+                    payroll_excel(payroll, selected_month),
+                    file_name=f"bang_luong_{selected_month}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
     else:
         st.info("Chưa có dữ liệu chấm công")
 
 # Tab 5: Thống kê (tương tự app.py)
-with tab5:
+if active_view == VIEWS[4]:
     st.header("Thống kê và biểu đồ")
     
-    attendance_df = load_attendance()
+    # Cộng tổng hợp của các tháng, không đọc lại từng bản ghi
+    totals = month_aggregates.totals()
     
-    if len(attendance_df) > 0:
-        attendance_df['Ngày'] = pd.to_datetime(attendance_df['Ngày'])
+    if totals['records'] > 0:
+        emp_totals = month_aggregates.employee_totals().set_index('Tên NV')
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Tổng giờ làm việc theo nhân viên")
-            emp_hours = attendance_df.groupby('Tên NV')['Tổng giờ'].sum().sort_values(ascending=False)
+            emp_hours = emp_totals['Tổng giờ'].sort_values(ascending=False)
             st.bar_chart(emp_hours)
         
         with col2:
             st.subheader("Số lượng chấm công theo ngày")
-            daily_count = attendance_df.groupby(attendance_df['Ngày'].dt.date).size()
+            daily_count = month_aggregates.daily_counts()
             st.line_chart(daily_count)
         
         st.subheader("Thống kê tổng quan")
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Tổng số bản ghi", len(attendance_df))
+            st.metric("Tổng số bản ghi", totals['records'])
         with col2:
-            st.metric("Số nhân viên", attendance_df['Tên NV'].nunique())
+            st.metric("Số nhân viên", totals['employees'])
         with col3:
-            st.metric("Tổng giờ làm", f"{attendance_df['Tổng giờ'].sum():.2f} h")
+            st.metric("Tổng giờ làm", f"{totals['hours']:.2f} h")
         with col4:
-            st.metric("Trung bình giờ/ngày", f"{attendance_df['Tổng giờ'].mean():.2f} h")
+            st.metric("Trung bình giờ/ngày", f"{totals['average_hours']:.2f} h")
         
         st.subheader("🏆 Top 5 nhân viên chăm chỉ nhất")
-        top_employees = attendance_df.groupby('Tên NV').agg({
-            'Tổng giờ': 'sum',
-            'Ngày': 'count'
-        }).round(2)
+        top_employees = emp_totals[['Tổng giờ', 'Số bản ghi']].round(2)
         top_employees.columns = ['Tổng giờ làm', 'Số bản ghi']
         # Tính số ngày công dựa trên giờ làm (8 giờ = 1 ngày công)
         top_employees['Số ngày công'] = (top_employees['Tổng giờ làm'] / 8).round(2)
@@ -684,7 +949,7 @@ with tab5:
         st.info("Chưa có dữ liệu để thống kê")
 
 # Tab 6: Thông tin Google Sheets
-with tab6:
+if active_view == VIEWS[5]:
     st.header("📁 Quản lý dữ liệu Google Sheets")
     
     col1, col2 = st.columns(2)
@@ -694,15 +959,49 @@ with tab6:
         st.info("Dữ liệu được lưu trữ trên Google Sheets")
         
         try:
-            spreadsheet = gc.open_by_key(ATTENDANCE_SHEET_ID)
-            st.success(f"✅ Kết nối thành công: **{spreadsheet.title}**")
+            gsheet_storage = get_gsheet_storage()
+            st.success(f"✅ Kết nối thành công: **{gsheet_storage.attendance_title()}**")
             
-            worksheets = spreadsheet.worksheets()
-            st.write(f"**Số sheet:** {len(worksheets)}")
+            month_rows = gsheet_storage.month_row_counts()
+            st.write(f"**Số sheet:** {len(month_rows)}")
             st.write("**Danh sách các tháng:**")
-            for ws in worksheets:
-                if ws.title not in ['Sheet1', 'Template']:
-                    st.write(f"- 📅 **{ws.title}** ({ws.row_count - 1} bản ghi)")
+            for title, row_count in month_rows.items():
+                st.write(f"- 📅 **{title}** ({row_count} bản ghi)")
+            
+            # Chấm công đang chờ ghi theo lô lên Google Sheets
+            pending_rows = gsheet_storage.pending_writes()
+            if pending_rows > 0:
+                st.info(f"⏳ **Đang chờ ghi:** {pending_rows} bản ghi sẽ được ghi lên Google Sheets theo lô")
+                if st.button("📤 Ghi ngay lên Google Sheets", use_container_width=True):
+                    gsheet_storage.flush()
+                    st.rerun()
+            if gsheet_storage.write_buffer is not None and gsheet_storage.write_buffer.last_error is not None:
+                st.warning(f"Lỗi ghi theo lô gần nhất (sẽ thử lại): {gsheet_storage.write_buffer.last_error}")
+            
+            # Thống kê bộ giới hạn tốc độ Google Sheets API
+            metrics = gc.limiter.snapshot()
+            st.caption(
+                f"🚦 **Google Sheets API:** {metrics['reads']} lượt đọc, {metrics['writes']} lượt ghi · "
+                f"chờ quota {metrics['throttled']} lần ({metrics['wait_seconds']:.1f}s) · "
+                f"thử lại {metrics['retried']} lần · thất bại {metrics['failed']} lần"
+            )
+            if USE_FAKE_GSHEET:
+                st.caption("🧪 **Google Sheets giả lập** - số lệnh gọi: " +
+                           ", ".join(f"{name}: {count}" for name, count in sorted(gc.calls.items())))
+            
+            # Bộ đệm cục bộ (backend tiered): thao tác ghi đang chờ đẩy lên Google Sheets
+            if isinstance(storage, TieredStorage):
+                st.markdown("---")
+                st.info(f"⚡ **Bộ đệm cục bộ:** {storage.pending_writes()} thao tác ghi đang chờ đẩy lên Google Sheets")
+                for error in storage.errors:
+                    st.error(f"Lỗi ghi nền: {error}")
+                if st.button("🔄 Tải lại từ Google Sheets", use_container_width=True):
+                    storage.flush()
+                    storage.refresh()
+                    month_cache.invalidate()
+                    month_aggregates.reindex()
+                    employee_registry.invalidate()
+                    st.rerun()
             
             st.markdown("---")
             
@@ -716,13 +1015,43 @@ with tab6:
                     if fixed_sheets:
                         st.success(f"✅ Đã sửa header cho {len(fixed_sheets)} sheet: {', '.join(fixed_sheets)}")
                         # Clear cache để load lại dữ liệu mới
-                        load_attendance_by_month.clear()
-                        load_attendance.clear()
-                        get_available_months.clear()
+                        month_cache.invalidate()
+                        month_aggregates.reindex()
                         st.rerun()
                     else:
                         st.info("✅ Tất cả sheet đã có header đúng!")
             
+            # Tính lại Tổng giờ / OT hàng loạt (ví dụ sau khi đổi quy định giờ nghỉ trưa)
+            st.info("**Tính lại tổng giờ:** Tính lại Tổng giờ và OT từ giờ vào/ra, chỉ ghi lại các tháng có thay đổi")
+            recompute_options = sorted(get_available_months(), reverse=True)
+            recompute_scope = st.selectbox("Phạm vi", ["Tất cả"] + recompute_options, key="recompute_scope")
+            col_lunch, col_standard = st.columns(2)
+            with col_lunch:
+                lunch_break = st.number_input("Giờ nghỉ trưa (giờ)", min_value=0.0, max_value=4.0,
+                                              value=LUNCH_BREAK_HOURS, step=0.25, key="recompute_lunch_break")
+            with col_standard:
+                standard_hours = st.number_input("Giờ chuẩn/ngày (vượt quá tính OT)", min_value=1.0, max_value=24.0,
+                                                 value=float(STANDARD_HOURS), step=0.5, key="recompute_standard_hours")
+            if st.button("🔁 Tính lại tổng giờ", type="secondary", use_container_width=True):
+                months = recompute_options if recompute_scope == "Tất cả" else [recompute_scope]
+                with st.spinner("Đang tính lại..."):
+                    changed = recompute_months(storage, months, lunch_break, standard_hours)
+                # Chỉ đọc lại các tháng có bản ghi thay đổi
+                changed_months = [m for m in months if changed.get(m, 0) > 0]
+                for month_year in changed_months:
+                    month_cache.invalidate(month_year)
+                month_aggregates.reindex(changed_months)
+                st.success(f"✅ Đã tính lại {len(months)} tháng - {sum(changed.values())} bản ghi thay đổi")
+            
+            # Dựng lại tổng hợp theo tháng (sau khi sửa dữ liệu trực tiếp trên Google Sheets)
+            st.info("**Dựng lại tổng hợp:** Báo cáo tổng hợp và Thống kê dùng số liệu tổng hợp theo tháng, "
+                    "được cập nhật sau mỗi lần chấm công / sửa / xóa trong ứng dụng")
+            if st.button("🧮 Dựng lại tổng hợp", type="secondary", use_container_width=True):
+                month_cache.invalidate()
+                with st.spinner("Đang dựng lại..."):
+                    rebuilt = month_aggregates.reindex()
+                st.success(f"✅ Đã dựng lại tổng hợp của {rebuilt} tháng")
+            
             st.markdown("---")
             st.markdown(f"🔗 [Mở Google Sheets](https://docs.google.com/spreadsheets/d/{ATTENDANCE_SHEET_ID})")
         except Exception as e:
@@ -733,8 +1062,7 @@ with tab6:
         st.info("Dữ liệu được lưu trữ trên Google Sheets")
         
         try:
-            spreadsheet = gc.open_by_key(EMPLOYEES_SHEET_ID)
-            st.success(f"✅ Kết nối thành công: **{spreadsheet.title}**")
+            st.success(f"✅ Kết nối thành công: **{get_gsheet_storage().employees_title()}**")
             
             emp_df = load_employees()
             st.write(f"**Tổng số nhân viên:** {len(emp_df)}")
@@ -767,6 +1095,12 @@ with tab6:
         - Export sang Excel, CSV, PDF
         """)
 
+# Tab 7: Kiosk chấm công nhanh
+if active_view == VIEWS[6]:
+    st.header("🕒 Kiosk chấm công")
+    st.caption("Chọn tên rồi bấm một lần để vào ca / ra ca, giờ lấy theo đồng hồ hiện tại")
+    kiosk_panel()
+
 # Footer
 st.markdown("---")
 st.markdown("🏢 **Hệ thống chấm công nhân viên** | © 2025")
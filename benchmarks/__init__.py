@@ -0,0 +1,4 @@
+"""Đo hiệu năng các backend lưu trữ với dữ liệu chấm công giả lập
+
+Chạy: python -m benchmarks.run --employees 200 --months 12 --output benchmark_results.json
+"""
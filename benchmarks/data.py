@@ -0,0 +1,122 @@
+"""Sinh dữ liệu nhân viên / chấm công giả lập và ghi sẵn vào từng backend"""
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from storage import (
+    ATTENDANCE_COLUMNS,
+    EMPLOYEE_COLUMNS,
+    GSHEET_ATTENDANCE_COLUMNS,
+    GSHEET_EMPLOYEE_COLUMNS,
+    create_storage,
+)
+from storage.base import append_dataframe
+
+DEPARTMENTS = ['Sản xuất', 'Kho', 'Kế toán', 'Kinh doanh', 'Nhân sự']
+POSITIONS = ['Công nhân', 'Tổ trưởng', 'Nhân viên', 'Trưởng phòng']
+
+ATTENDANCE_SHEET_ID = 'bench-attendance'
+EMPLOYEES_SHEET_ID = 'bench-employees'
+
+
+# Số phút -> "HH:MM" cho cả mảng
+def _format_minutes(minutes):
+    minutes = pd.Series(minutes)
+    return (minutes // 60).astype(str).str.zfill(2) + ':' + (minutes % 60).astype(str).str.zfill(2)
+
+
+def generate_employees(count, seed=0):
+    """count nhân viên với đủ cột của cả app.py và app_gsheet.py"""
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(1, count + 1)
+    return pd.DataFrame({
+        'Mã NV': [f"NV{i:05d}" for i in numbers],
+        'Tên NV': [f"Nhân viên {i:05d}" for i in numbers],
+        'Bộ phận': rng.choice(DEPARTMENTS, count),
+        'Chức vụ': rng.choice(POSITIONS, count),
+        'Tiền công/ngày': rng.integers(20, 60, count) * 10000,
+    })
+
+
+def generate_attendance(employees, months, start_month='2023-01', seed=0):
+    """Mỗi nhân viên chấm công mỗi ngày làm việc (thứ 2 - thứ 6) trong months tháng"""
+    rng = np.random.default_rng(seed)
+    periods = pd.period_range(start_month, periods=months, freq='M')
+    days = pd.bdate_range(periods[0].start_time, periods[-1].end_time).strftime('%Y-%m-%d')
+    rows = len(days) * len(employees)
+
+    time_in = 7 * 60 + 30 + rng.integers(0, 60, rows)
+    time_out = 16 * 60 + 30 + rng.integers(0, 180, rows)
+    total_hours = np.round(np.maximum(0, (time_out - time_in) / 60 - 1.0), 2)
+    ot_hours = np.round(np.maximum(0, total_hours - 8), 2)
+    employee_index = np.tile(np.arange(len(employees)), len(days))
+
+    return pd.DataFrame({
+        'Mã NV': employees['Mã NV'].values[employee_index],
+        'Tên NV': employees['Tên NV'].values[employee_index],
+        'Ngày': np.repeat(np.asarray(days), len(employees)),
+        'Giờ vào': _format_minutes(time_in).values,
+        'Giờ ra': _format_minutes(time_out).values,
+        'Tổng giờ': total_hours,
+        'OT': ot_hours,
+        'Ghi chú': '',
+        # ID cố định (dạng giống new_record_id) để dữ liệu sinh ra không cần gán ID khi nạp
+        'ID': pd.Series(np.arange(rows)).map('{:012x}'.format).values,
+        'Phiên bản': 1,
+    })
+
+
+def _split_months(attendance):
+    return {month: rows for month, rows in attendance.groupby(attendance['Ngày'].str[:7], sort=True)}
+
+
+def populate(backend, directory, employees, attendance, client=None):
+    """Ghi sẵn dữ liệu vào backend trong directory, trả về storage đã tạo bằng create_storage()
+
+    gsheet/tiered dùng client giả lập (storage.fake_gsheet.FakeClient).
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'data_file': os.path.join(directory, 'attendance_data.xlsx'),
+        'employee_file': os.path.join(directory, 'employees.csv'),
+        'journal_file': os.path.join(directory, 'attendance_journal.csv'),
+        'csv_dir': os.path.join(directory, 'attendance_csv'),
+        'db_file': os.path.join(directory, 'attendance.db'),
+    }
+    months = _split_months(attendance)
+
+    if backend in ('gsheet', 'tiered'):
+        client.create_spreadsheet(EMPLOYEES_SHEET_ID, worksheets={
+            'Sheet1': [GSHEET_EMPLOYEE_COLUMNS] + employees[GSHEET_EMPLOYEE_COLUMNS].values.tolist()
+        })
+        client.create_spreadsheet(ATTENDANCE_SHEET_ID, worksheets={'Sheet1': [], **{
+            month: [GSHEET_ATTENDANCE_COLUMNS] + rows[GSHEET_ATTENDANCE_COLUMNS].values.tolist()
+            for month, rows in months.items()
+        }})
+        return create_storage(
+            backend, GSHEET_ATTENDANCE_COLUMNS, GSHEET_EMPLOYEE_COLUMNS, db_file=paths['db_file'],
+            client=client, attendance_sheet_id=ATTENDANCE_SHEET_ID, employees_sheet_id=EMPLOYEES_SHEET_ID
+        )
+
+    employees = employees[EMPLOYEE_COLUMNS]
+    if backend == 'excel':
+        employees.to_csv(paths['employee_file'], index=False, encoding='utf-8')
+        workbook = Workbook(write_only=True)
+        workbook.create_sheet('Template').append(ATTENDANCE_COLUMNS)
+        for month, rows in months.items():
+            append_dataframe(workbook.create_sheet(month), rows[ATTENDANCE_COLUMNS])
+        workbook.save(paths['data_file'])
+    elif backend == 'csv':
+        employees.to_csv(paths['employee_file'], index=False, encoding='utf-8')
+        os.makedirs(paths['csv_dir'], exist_ok=True)
+        for month, rows in months.items():
+            rows[ATTENDANCE_COLUMNS].to_csv(
+                os.path.join(paths['csv_dir'], f"attendance_{month}.csv"), index=False, encoding='utf-8'
+            )
+
+    storage = create_storage(backend, **paths)
+    if backend == 'sqlite':
+        storage.import_dataframes(employees, attendance[ATTENDANCE_COLUMNS])
+    return storage
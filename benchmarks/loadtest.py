@@ -0,0 +1,237 @@
+"""Chạy thử nhiều phiên đồng thời với streamlit.testing AppTest, đo độ trễ mỗi lần chạy lại
+
+Mỗi người dùng giả lập có một AppTest riêng (các phiên dùng chung cache_resource/cache_data
+như trên server thật) và lặp lại: mở trang, chấm công, xem báo cáo một tháng, xem báo cáo
+tất cả, mở trang thống kê, chạy lại trang. Kết quả gồm p50/p95/p99 theo từng thao tác,
+RSS lớn nhất và số lượt đọc/ghi storage.
+
+Ví dụ:
+    python -m benchmarks.loadtest --app app.py --backend sqlite --users 5 --iterations 3
+    python -m benchmarks.loadtest --app app_gsheet.py --backend tiered --employees 200 --months 12 --latency 0.05
+"""
+import argparse
+import functools
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.data import ATTENDANCE_SHEET_ID, EMPLOYEES_SHEET_ID, generate_attendance, generate_employees, populate
+from storage import AttendanceStorage, CSVStorage, ExcelStorage, SQLiteStorage, TieredStorage
+
+READ_METHODS = [
+    'load_employees', 'load_attendance', 'load_attendance_by_month', 'load_attendance_months',
+    'load_attendance_by_date', 'load_attendance_filtered', 'get_employee_names', 'get_available_months',
+    'count_by_month', 'export_excel',
+]
+WRITE_METHODS = [
+    'add_employee', 'delete_employee', 'save_attendance', 'update_attendance_record',
+    'delete_attendance_record', 'flush',
+]
+
+# Số lượt gọi storage (chỉ tính lệnh gọi ngoài cùng, không tính lệnh gọi lồng bên trong backend)
+storage_calls = Counter()
+_calls_lock = threading.Lock()
+_depth = threading.local()
+
+
+def _counted(kind, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_depth, 'value', 0)
+        if depth == 0:
+            with _calls_lock:
+                storage_calls[kind] += 1
+        _depth.value = depth + 1
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _depth.value = depth
+    wrapper._counted = True
+    return wrapper
+
+
+def instrument_storage(classes):
+    """Đếm lượt đọc/ghi trên các lớp storage (gắn trực tiếp vào lớp, dùng chung mọi phiên)"""
+    for cls in classes:
+        for kind, names in (('reads', READ_METHODS), ('writes', WRITE_METHODS)):
+            for name in names:
+                method = getattr(cls, name, None)
+                if method is not None and not getattr(method, '_counted', False):
+                    setattr(cls, name, _counted(kind, method))
+
+
+def peak_rss_mb():
+    # ru_maxrss: KB trên Linux, byte trên macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    return None
+
+
+def _open_view(at, label):
+    # Chọn trang trên thanh điều hướng (chỉ trang đang xem được chạy)
+    navigation = _widget(at.radio, "Chức năng")
+    if navigation is not None and navigation.value != label:
+        navigation.set_value(label)
+        at.run()
+
+
+def _save_punch(at, user):
+    _open_view(at, "📝 Chấm công")
+    employee = _widget(at.selectbox, "Chọn nhân viên")
+    if employee is not None and employee.options:
+        employee.set_value(employee.options[user % len(employee.options)])
+    button = _widget(at.button, "✅ Lưu chấm công")
+    if button is not None:
+        button.click()
+    at.run()
+
+
+def _select_month(at, pick):
+    _open_view(at, "📊 Báo cáo")
+    month = _widget(at.selectbox, "Chọn tháng")
+    if month is not None and month.options:
+        month.set_value(pick(month.options))
+    at.run()
+
+
+INTERACTIONS = [
+    ('open', lambda at, user: at.run()),
+    ('save_punch', _save_punch),
+    # options[0] = "Tất cả", options[1] = tháng mới nhất
+    ('report_month', lambda at, user: _select_month(at, lambda options: options[min(1, len(options) - 1)])),
+    ('report_all', lambda at, user: _select_month(at, lambda options: options[0])),
+    ('statistics', lambda at, user: _open_view(at, "📈 Thống kê")),
+    ('rerun', lambda at, user: at.run()),
+]
+
+
+def run_user(app_file, user, iterations, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_file, default_timeout=timeout)
+    samples = []
+    for _ in range(iterations):
+        for name, interaction in INTERACTIONS:
+            start = time.perf_counter()
+            interaction(at, user)
+            samples.append((name, time.perf_counter() - start, len(at.exception)))
+    return samples
+
+
+def prepare_data(app_file, backend, directory, employees, months, latency, seed):
+    """Sinh dữ liệu trong directory và cấu hình biến môi trường cho app"""
+    employees_df = generate_employees(employees, seed)
+    attendance_df = generate_attendance(employees_df, months, seed=seed)
+    if os.path.basename(app_file) == 'app_gsheet.py':
+        from storage.fake_gsheet import FakeClient
+        client = FakeClient()
+        populate('gsheet', directory, employees_df, attendance_df, client)
+        data_file = os.path.join(directory, 'fake_gsheet.json')
+        client.dump(data_file)
+        os.environ.update({
+            'GSHEET_FAKE': '1',
+            'GSHEET_FAKE_DATA': data_file,
+            'GSHEET_FAKE_LATENCY': str(latency),
+            'ATTENDANCE_SPREADSHEET_ID': ATTENDANCE_SHEET_ID,
+            'EMPLOYEES_SPREADSHEET_ID': EMPLOYEES_SHEET_ID,
+            'STORAGE_BACKEND': backend,
+        })
+    else:
+        populate(backend, directory, employees_df, attendance_df)
+        os.environ['ATTENDANCE_STORAGE'] = backend
+    return len(attendance_df)
+
+
+def percentiles(values):
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(max(values)),
+        'count': len(values),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy thử nhiều phiên Streamlit đồng thời bằng AppTest")
+    parser.add_argument('--app', default='app.py', choices=['app.py', 'app_gsheet.py'])
+    parser.add_argument('--backend', default=None,
+                        help="app.py: excel/csv/sqlite (mặc định excel); app_gsheet.py: gsheet/tiered (mặc định gsheet)")
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--employees', type=int, default=50)
+    parser.add_argument('--months', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Độ trễ mỗi lệnh gọi Google Sheets giả lập (giây)")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='loadtest_results.json')
+    args = parser.parse_args(argv)
+    backend = args.backend or ('gsheet' if args.app == 'app_gsheet.py' else 'excel')
+    app_file = os.path.abspath(args.app)
+    output_file = os.path.abspath(args.output)
+
+    from storage.gsheet import GSheetStorage
+    instrument_storage([AttendanceStorage, ExcelStorage, CSVStorage, SQLiteStorage, GSheetStorage, TieredStorage])
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        rows = prepare_data(app_file, backend, directory, args.employees, args.months, args.latency, args.seed)
+        # Các app dùng đường dẫn file tương đối
+        os.chdir(directory)
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.users) as pool:
+                futures = [pool.submit(run_user, app_file, user, args.iterations, args.timeout)
+                           for user in range(args.users)]
+                samples = [sample for future in futures for sample in future.result()]
+            wall_time = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    by_interaction = defaultdict(list)
+    errors = Counter()
+    for name, seconds, exceptions in samples:
+        by_interaction[name].append(seconds)
+        errors[name] += exceptions
+    output = {
+        'app': args.app,
+        'backend': backend,
+        'users': args.users,
+        'iterations': args.iterations,
+        'employees': args.employees,
+        'months': args.months,
+        'rows': rows,
+        'wall_seconds': wall_time,
+        'peak_rss_mb': peak_rss_mb(),
+        'storage_reads': storage_calls['reads'],
+        'storage_writes': storage_calls['writes'],
+        'interactions': {
+            name: {**percentiles(values), 'exceptions': errors[name]} for name, values in by_interaction.items()
+        },
+    }
+    for name, stats in output['interactions'].items():
+        print(f"{name:<14} p50 {stats['p50'] * 1000:8.1f} ms  p95 {stats['p95'] * 1000:8.1f} ms  "
+              f"p99 {stats['p99'] * 1000:8.1f} ms", file=sys.stderr)
+    print(f"RSS lớn nhất {output['peak_rss_mb']:.0f} MB, {output['storage_reads']} lượt đọc, "
+          f"{output['storage_writes']} lượt ghi storage", file=sys.stderr)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Đo thời gian các thao tác chính của từng backend, ghi kết quả ra file JSON
+
+Ví dụ:
+    python -m benchmarks.run --employees 50 500 --months 1 12 --backends excel sqlite gsheet
+    python -m benchmarks.run --employees 200 --months 6 --latency 0.05 --output results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.data import generate_attendance, generate_employees, populate
+from storage import BACKENDS
+
+
+def report_summary(df):
+    """Tab Báo cáo: tổng hợp giờ làm theo nhân viên"""
+    df = df.copy()
+    df['Ngày'] = pd.to_datetime(df['Ngày'])
+    summary = df.groupby('Tên NV')['Tổng giờ'].agg(['sum', 'count']).reset_index()
+    summary.columns = ['Tên nhân viên', 'Tổng giờ làm', 'Số bản ghi']
+    summary['Tổng giờ làm'] = summary['Tổng giờ làm'].round(2)
+    summary['Số ngày công'] = (summary['Tổng giờ làm'] / 8).round(2)
+    return summary
+
+
+def statistics_view(df):
+    """Tab Thống kê: giờ theo nhân viên, số chấm công theo ngày, số liệu tổng quan, top 5"""
+    df = df.copy()
+    df['Ngày'] = pd.to_datetime(df['Ngày'])
+    emp_hours = df.groupby('Tên NV')['Tổng giờ'].sum().sort_values(ascending=False)
+    daily_count = df.groupby(df['Ngày'].dt.date).size()
+    overview = (len(df), df['Tên NV'].nunique(), df['Tổng giờ'].sum(), df['Tổng giờ'].mean())
+    top_employees = df.groupby('Tên NV').agg({'Tổng giờ': 'sum', 'Ngày': 'count'}).round(2)
+    top_employees.columns = ['Tổng giờ làm', 'Số bản ghi']
+    top_employees['Số ngày công'] = (top_employees['Tổng giờ làm'] / 8).round(2)
+    top_employees = top_employees.sort_values('Tổng giờ làm', ascending=False).head(5)
+    return emp_hours, daily_count, overview, top_employees
+
+
+def _timed(fn, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def benchmark_backend(backend, employees, attendance, repeat, latency):
+    """Đo một backend với một bộ dữ liệu, trả về danh sách kết quả theo thao tác"""
+    client = None
+    if backend in ('gsheet', 'tiered'):
+        from storage.fake_gsheet import FakeClient
+        client = FakeClient(latency=latency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = populate(backend, directory, employees, attendance, client)
+        month = max(storage.get_available_months())
+        employee = employees.iloc[0]
+        record = {
+            'Mã NV': employee['Mã NV'], 'Tên NV': employee['Tên NV'], 'Ngày': f"{month}-28",
+            'Giờ vào': '08:00', 'Giờ ra': '17:30', 'Tổng giờ': 8.5, 'OT': 0.5, 'Ghi chú': 'benchmark',
+        }
+
+        first = storage.load_attendance_by_month(month).iloc[0]
+        target = {'ID': first['ID'], 'Phiên bản': int(first['Phiên bản'])}
+
+        def update_first():
+            updated = dict(record)
+            storage.update_attendance_record(month, target['ID'], updated, target['Phiên bản'])
+            target['Phiên bản'] = updated['Phiên bản']
+
+        def delete_last():
+            last = storage.load_attendance_by_month(month).iloc[-1]
+            storage.delete_attendance_record(month, last['ID'], int(last['Phiên bản']))
+
+        operations = [
+            ('load_attendance', storage.load_attendance),
+            ('load_attendance_by_month', lambda: storage.load_attendance_by_month(month)),
+            ('save_attendance', lambda: storage.save_attendance(dict(record))),
+            # Thao tác ghi trễ (nhật ký Excel, ghi theo lô / ghi nền Google Sheets)
+            ('flush', storage.flush),
+            ('update_attendance_record', update_first),
+            ('delete_attendance_record', delete_last),
+            ('report_summary', lambda: report_summary(storage.load_attendance())),
+            ('statistics', lambda: statistics_view(storage.load_attendance())),
+        ]
+        results = []
+        for name, fn in operations:
+            if client is not None:
+                client.reset_calls()
+            seconds = _timed(fn, repeat)
+            result = {
+                'backend': backend,
+                'operation': name,
+                'employees': len(employees),
+                'rows': len(attendance),
+                'seconds': seconds,
+                'median': statistics.median(seconds),
+                'min': min(seconds),
+            }
+            if client is not None:
+                result['api_calls'] = dict(client.calls)
+            results.append(result)
+        storage.flush()
+        return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo hiệu năng các backend lưu trữ chấm công")
+    parser.add_argument('--employees', type=int, nargs='+', default=[50])
+    parser.add_argument('--months', type=int, nargs='+', default=[3])
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Độ trễ mỗi lệnh gọi Google Sheets giả lập (giây)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    results = []
+    for employee_count in args.employees:
+        employees = generate_employees(employee_count, args.seed)
+        for month_count in args.months:
+            attendance = generate_attendance(employees, month_count, seed=args.seed)
+            for backend in args.backends:
+                print(f"{backend}: {employee_count} nhân viên x {month_count} tháng ({len(attendance)} dòng)",
+                      file=sys.stderr)
+                for result in benchmark_backend(backend, employees, attendance, args.repeat, args.latency):
+                    print(f"  {result['operation']:<26} {result['median'] * 1000:10.1f} ms", file=sys.stderr)
+                    results.append(result)
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi kết quả vào {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
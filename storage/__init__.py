@@ -0,0 +1,99 @@
+"""Các backend lưu trữ dữ liệu chấm công
+
+Tất cả backend cùng giao diện AttendanceStorage; chọn backend bằng create_storage().
+"""
+from storage.aggregates import MonthAggregates
+from storage.base import (
+    ATTENDANCE_COLUMNS,
+    EMPLOYEE_COLUMNS,
+    GSHEET_ATTENDANCE_COLUMNS,
+    GSHEET_EMPLOYEE_COLUMNS,
+    RECORD_COLUMNS,
+    AttendanceStorage,
+    RecordConflictError,
+    month_of,
+    write_excel_file,
+)
+from storage.cache import DayIndex, MonthCache
+from storage.csv_store import CSVStorage
+from storage.edits import DELETE_COLUMN, EDITABLE_COLUMNS, diff_month_edits
+from storage.employees import EmployeeRegistry
+from storage.excel import ExcelStorage
+from storage.hours import (
+    LUNCH_BREAK_HOURS,
+    STANDARD_HOURS,
+    calculate_hours_column,
+    calculate_ot_column,
+    recompute_hours,
+    recompute_months,
+)
+from storage.importer import import_attendance, import_employees
+from storage.payroll import OT_MULTIPLIERS, PayrollCache, compute_payroll
+from storage.ratelimit import RateLimitedProxy, RateLimiter, TokenBucket
+from storage.sqlite import SQLiteStorage
+from storage.tiered import TieredStorage
+
+BACKENDS = ['excel', 'csv', 'sqlite', 'gsheet', 'tiered']
+
+
+def create_storage(backend, attendance_columns=ATTENDANCE_COLUMNS, employee_columns=EMPLOYEE_COLUMNS,
+                   data_file="attendance_data.xlsx", employee_file="employees.csv",
+                   journal_file="attendance_journal.csv", csv_dir="attendance_csv",
+                   db_file="attendance.db", client=None, attendance_sheet_id=None,
+                   employees_sheet_id=None):
+    """Tạo backend theo tên cấu hình: excel, csv, sqlite, gsheet, tiered (SQLite trước Google Sheets)"""
+    if backend == 'excel':
+        return ExcelStorage(data_file, employee_file, journal_file, attendance_columns, employee_columns)
+    if backend == 'csv':
+        return CSVStorage(csv_dir, employee_file, attendance_columns, employee_columns)
+    if backend == 'sqlite':
+        return SQLiteStorage(db_file, attendance_columns, employee_columns)
+    if backend in ('gsheet', 'tiered'):
+        # gspread chỉ cần khi dùng Google Sheets
+        from storage.gsheet import GSheetStorage
+        remote = GSheetStorage(client, attendance_sheet_id, employees_sheet_id,
+                               attendance_columns, employee_columns)
+        if backend == 'gsheet':
+            return remote
+        return TieredStorage(SQLiteStorage(db_file, attendance_columns, employee_columns), remote)
+    raise ValueError(f"Backend lưu trữ không hợp lệ: {backend} (chọn một trong {', '.join(BACKENDS)})")
+
+
+__all__ = [
+    'ATTENDANCE_COLUMNS',
+    'BACKENDS',
+    'DELETE_COLUMN',
+    'EDITABLE_COLUMNS',
+    'EMPLOYEE_COLUMNS',
+    'GSHEET_ATTENDANCE_COLUMNS',
+    'GSHEET_EMPLOYEE_COLUMNS',
+    'LUNCH_BREAK_HOURS',
+    'OT_MULTIPLIERS',
+    'RECORD_COLUMNS',
+    'STANDARD_HOURS',
+    'AttendanceStorage',
+    'CSVStorage',
+    'DayIndex',
+    'EmployeeRegistry',
+    'ExcelStorage',
+    'MonthAggregates',
+    'MonthCache',
+    'PayrollCache',
+    'RateLimitedProxy',
+    'RateLimiter',
+    'RecordConflictError',
+    'SQLiteStorage',
+    'TieredStorage',
+    'TokenBucket',
+    'calculate_hours_column',
+    'calculate_ot_column',
+    'compute_payroll',
+    'create_storage',
+    'diff_month_edits',
+    'import_attendance',
+    'import_employees',
+    'month_of',
+    'recompute_hours',
+    'recompute_months',
+    'write_excel_file',
+]
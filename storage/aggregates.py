@@ -0,0 +1,217 @@
+"""Số liệu tổng hợp chấm công theo tháng, cập nhật tăng dần sau mỗi lần ghi
+
+Mỗi tháng giữ tổng giờ / OT / số bản ghi theo nhân viên và số lần chấm công theo ngày, cùng
+phần đóng góp của từng bản ghi (theo ID): thêm bản ghi chỉ cộng vào, sửa/xóa trừ phần cũ rồi
+cộng phần mới. Số liệu "Tất cả" là tổng của các tháng thay vì quét lại mọi dòng chấm công.
+"""
+import threading
+
+import pandas as pd
+
+from storage.base import month_of
+
+
+def _number(value):
+    # Tổng giờ / OT dạng số; ô trống hoặc không hợp lệ trả về None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+class _MonthTotals:
+    """Tổng hợp của một tháng"""
+
+    def __init__(self):
+        self.entries = {}    # ID -> (khóa nhân viên, tên, ngày, tổng giờ hoặc None, OT)
+        self.employees = {}  # (khóa nhân viên, tên) -> [tổng giờ, OT, số bản ghi, số bản ghi có giờ]
+        self.days = {}       # ngày -> số lần chấm công
+
+    def add(self, record_id, entry):
+        self.remove(record_id)
+        self.entries[record_id] = entry
+        key, name, day, hours, ot = entry
+        totals = self.employees.setdefault((key, name), [0.0, 0.0, 0, 0])
+        totals[0] += hours or 0.0
+        totals[1] += ot
+        totals[2] += 1
+        totals[3] += hours is not None
+        self.days[day] = self.days.get(day, 0) + 1
+
+    def remove(self, record_id):
+        entry = self.entries.pop(record_id, None)
+        if entry is None:
+            return False
+        key, name, day, hours, ot = entry
+        totals = self.employees[(key, name)]
+        totals[0] -= hours or 0.0
+        totals[1] -= ot
+        totals[2] -= 1
+        totals[3] -= hours is not None
+        if totals[2] == 0:
+            del self.employees[(key, name)]
+        self.days[day] -= 1
+        if self.days[day] == 0:
+            del self.days[day]
+        return True
+
+
+class MonthAggregates:
+    """Tổng hợp theo tháng dùng chung giữa các phiên trong process.
+
+    Mỗi tháng được dựng một lần từ source (storage hoặc MonthCache) ở lần đọc đầu tiên, sau đó
+    chỉ được sửa bằng apply_save / apply_update / apply_delete / apply_changes sau khi ghi;
+    dữ liệu đổi ngoài ứng dụng (nhập file, tính lại, sửa trực tiếp trên sheet) cần gọi reindex().
+    """
+
+    def __init__(self, source, key='Tên NV'):
+        self.source = source
+        self.key = key  # cột phân biệt nhân viên (đếm số nhân viên)
+        self._lock = threading.RLock()
+        self._months = {}  # tháng -> _MonthTotals
+
+    def _entry(self, record):
+        hours = _number(record.get('Tổng giờ'))
+        return (
+            str(record.get(self.key, '')).strip(),
+            str(record.get('Tên NV', '')).strip(),
+            str(record.get('Ngày', '')).strip()[:10],
+            hours,
+            _number(record.get('OT')) or 0.0,
+        )
+
+    def _build(self, df):
+        # Cả tháng bằng pandas: phần đóng góp từng bản ghi, một lần groupby theo nhân viên và theo ngày
+        totals = _MonthTotals()
+        if len(df) == 0:
+            return totals
+
+        def text(column):
+            return df[column].fillna('').astype(str).str.strip() if column in df.columns else pd.Series('', index=df.index)
+
+        hours = pd.to_numeric(df['Tổng giờ'], errors='coerce')
+        ot = pd.to_numeric(df['OT'], errors='coerce').fillna(0.0) if 'OT' in df.columns else pd.Series(0.0, index=df.index)
+        keys, names, days = text(self.key), text('Tên NV'), text('Ngày').str[:10]
+        ids = df['ID'].astype(str).tolist() if 'ID' in df.columns else [str(i) for i in range(len(df))]
+        totals.entries = dict(zip(ids, zip(
+            keys.tolist(), names.tolist(), days.tolist(),
+            hours.astype(object).where(hours.notna(), None).tolist(), ot.astype(float).tolist()
+        )))
+
+        grouped = pd.DataFrame({
+            'key': keys, 'name': names, 'hours': hours.fillna(0.0), 'ot': ot, 'count': 1, 'timed': hours.notna().astype(int),
+        }).groupby(['key', 'name'], sort=False).sum()
+        totals.employees = {index: [float(h), float(o), int(c), int(t)]
+                            for index, h, o, c, t in grouped.itertuples(name=None)}
+        totals.days = days.value_counts(sort=False).to_dict()
+        return totals
+
+    def _totals(self, month_years):
+        # Dựng các tháng chưa có (một lần đọc cho tất cả nếu source hỗ trợ)
+        with self._lock:
+            missing = [m for m in month_years if m not in self._months]
+            if missing:
+                for month_year, df in self.source.load_attendance_months(missing).items():
+                    self._months[month_year] = self._build(df)
+            return [self._months[m] for m in month_years if m in self._months]
+
+    def _select(self, month_years):
+        if month_years is None:
+            month_years = self.source.get_available_months()
+        elif isinstance(month_years, str):
+            month_years = [month_years]
+        return self._totals(list(month_years))
+
+    # ---- Đọc ----
+
+    def employee_totals(self, month_years=None):
+        """Theo Tên NV: Tổng giờ, OT, Số bản ghi và Số bản ghi có giờ (Tổng giờ không trống, như count
+        của pandas); month_years = None là tất cả các tháng"""
+        with self._lock:
+            rows = [(name, *values) for totals in self._select(month_years)
+                    for (_, name), values in totals.employees.items()]
+        summary = pd.DataFrame(rows, columns=['Tên NV', 'Tổng giờ', 'OT', 'Số bản ghi', 'Số bản ghi có giờ'])
+        summary = summary.groupby('Tên NV', as_index=False).sum()
+        for col in ('Số bản ghi', 'Số bản ghi có giờ'):
+            summary[col] = summary[col].astype(int)
+        return summary
+
+    def daily_counts(self, month_years=None):
+        """Số lần chấm công theo ngày (Series, index là ngày)"""
+        counts = {}
+        with self._lock:
+            for totals in self._select(month_years):
+                for day, count in totals.days.items():
+                    counts[day] = counts.get(day, 0) + count
+        series = pd.Series(counts, dtype=int).sort_index()
+        series.index = pd.to_datetime(series.index, errors='coerce').date
+        return series
+
+    def totals(self, month_years=None):
+        """Tổng số bản ghi, số nhân viên, tổng giờ, OT và giờ trung bình mỗi bản ghi"""
+        records = timed = 0
+        hours = ot = 0.0
+        keys = set()
+        with self._lock:
+            for totals in self._select(month_years):
+                for (key, _), values in totals.employees.items():
+                    hours += values[0]
+                    ot += values[1]
+                    records += values[2]
+                    timed += values[3]
+                    keys.add(key)
+        return {
+            'records': records,
+            'employees': len(keys),
+            'hours': hours,
+            'ot': ot,
+            'average_hours': hours / timed if timed else 0.0,
+        }
+
+    # ---- Cập nhật sau khi ghi ----
+
+    def apply_save(self, record):
+        """Sau save_attendance (record đã được gán ID); tháng chưa dựng thì bỏ qua"""
+        with self._lock:
+            totals = self._months.get(month_of(record['Ngày']))
+            if totals is not None:
+                totals.add(str(record.get('ID')), self._entry(record))
+
+    def apply_update(self, month_year, record_id, record):
+        with self._lock:
+            totals = self._months.get(month_year)
+            if totals is None:
+                return
+            if not totals.remove(str(record_id)):
+                # Không biết phần đóng góp cũ: dựng lại tháng ở lần đọc tới
+                self._months.pop(month_year, None)
+                return
+            totals.add(str(record_id), self._entry(record))
+
+    def apply_delete(self, month_year, record_id):
+        with self._lock:
+            totals = self._months.get(month_year)
+            if totals is not None and not totals.remove(str(record_id)):
+                self._months.pop(month_year, None)
+
+    def apply_changes(self, month_year, updates=(), deletes=()):
+        """Sau apply_attendance_changes: updates [(ID, record, _)], deletes [(ID, _)]"""
+        with self._lock:
+            for record_id, record, _ in updates:
+                self.apply_update(month_year, record_id, record)
+            for record_id, _ in deletes:
+                self.apply_delete(month_year, record_id)
+
+    def reindex(self, month_years=None):
+        """Dựng lại từ source các tháng month_years (None là tất cả); trả về số tháng đã dựng"""
+        with self._lock:
+            if month_years is None:
+                self._months.clear()
+                month_years = self.source.get_available_months()
+            elif isinstance(month_years, str):
+                month_years = [month_years]
+            month_years = list(month_years)
+            for month_year in month_years:
+                self._months.pop(month_year, None)
+            return len(self._totals(month_years))
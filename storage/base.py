@@ -0,0 +1,294 @@
+import os
+import uuid
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+# Cột định danh bản ghi chấm công (đặt cuối mỗi dòng): ID cố định và phiên bản tăng mỗi lần sửa
+RECORD_COLUMNS = ['ID', 'Phiên bản']
+
+# Cột dữ liệu của app.py (Excel/CSV/SQLite)
+ATTENDANCE_COLUMNS = ['Mã NV', 'Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'Ghi chú'] + RECORD_COLUMNS
+EMPLOYEE_COLUMNS = ['Mã NV', 'Tên NV', 'Bộ phận', 'Chức vụ']
+
+# Cột dữ liệu của app_gsheet.py (Google Sheets)
+GSHEET_ATTENDANCE_COLUMNS = ['Tên NV', 'Ngày', 'Giờ vào', 'Giờ ra', 'Tổng giờ', 'OT', 'Ghi chú'] + RECORD_COLUMNS
+GSHEET_EMPLOYEE_COLUMNS = ['Tên NV', 'Tiền công/ngày']
+
+# Các cột lưu dạng số
+NUMERIC_COLUMNS = {'Tổng giờ', 'OT', 'Tiền công/ngày', 'Phiên bản'}
+
+
+class RecordConflictError(Exception):
+    """Bản ghi đã bị sửa (khác phiên bản) hoặc đã bị xóa kể từ lúc đọc"""
+
+
+def new_record_id():
+    return uuid.uuid4().hex[:12]
+
+
+def assign_record_ids(df):
+    """Gán ID mới và phiên bản 1 cho các dòng chưa có (dữ liệu cũ, dòng nhập từ file);
+    trả về (bản sao DataFrame, số dòng được gán)"""
+    df = df.copy()
+    ids = df['ID'].astype(object) if 'ID' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    missing_id = ids.isna() | (ids.astype(str).str.strip() == '')
+    versions = pd.to_numeric(df['Phiên bản'], errors='coerce') if 'Phiên bản' in df.columns \
+        else pd.Series(float('nan'), index=df.index)
+    missing_version = versions.isna()
+    if missing_id.any():
+        ids = ids.copy()
+        ids[missing_id] = [new_record_id() for _ in range(int(missing_id.sum()))]
+    df['ID'] = ids.astype(str).values
+    df['Phiên bản'] = versions.fillna(1).astype(int).values
+    return df, int((missing_id | missing_version).sum())
+
+
+def check_versions(df, month_year, expected):
+    """Kiểm tra phiên bản của nhiều bản ghi trong dữ liệu một tháng.
+
+    expected: [(ID, phiên bản)]. Trả về {ID: vị trí dòng}; có bản ghi không còn hoặc khác phiên
+    bản thì raise RecordConflictError liệt kê tất cả các bản ghi đó.
+    """
+    ids = df['ID'].astype(str).tolist() if 'ID' in df.columns else []
+    positions = {record_id: i for i, record_id in enumerate(ids)}
+    versions = pd.to_numeric(df['Phiên bản'], errors='coerce').fillna(1).astype(int).tolist() if ids else []
+    missing = [str(record_id) for record_id, _ in expected if str(record_id) not in positions]
+    changed = [str(record_id) for record_id, version in expected
+               if str(record_id) in positions and versions[positions[str(record_id)]] != int(version)]
+    if missing or changed:
+        details = []
+        if changed:
+            details.append(f"đã được sửa: {', '.join(changed)}")
+        if missing:
+            details.append(f"không còn trong tháng {month_year}: {', '.join(missing)}")
+        raise RecordConflictError("Bản ghi " + "; ".join(details))
+    return {str(record_id): positions[str(record_id)] for record_id, _ in expected}
+
+
+def stamp_record(record, record_id=None, version=1):
+    """Gán ID (mới nếu chưa có) và phiên bản cho record (sửa trực tiếp dict)"""
+    record['ID'] = record_id or record.get('ID') or new_record_id()
+    record['Phiên bản'] = int(version)
+    return record
+
+
+# Tên sheet/partition theo tháng (YYYY-MM) của một ngày "YYYY-MM-DD"
+def month_of(date_str):
+    return str(date_str)[:7]
+
+
+# Ghi DataFrame vào sheet write-only (từng dòng, không giữ mô hình ô trong bộ nhớ)
+def append_dataframe(ws, df):
+    df = df.astype(object).where(pd.notna(df), None)
+    for row in dataframe_to_rows(df, index=False, header=True):
+        ws.append(row)
+
+
+# Xuất DataFrame ra file Excel (write-only); filename có thể là file-like (BytesIO)
+def write_excel_file(df, filename, sheet_name='Sheet1'):
+    out = Workbook(write_only=True)
+    append_dataframe(out.create_sheet(sheet_name), df)
+    out.save(filename)
+
+
+class AttendanceStorage:
+    """Giao diện chung cho các backend lưu trữ nhân viên và chấm công.
+
+    Bản ghi (record) là dict theo tên cột. Tháng có dạng "YYYY-MM". Mỗi bản ghi chấm công có
+    ID cố định và phiên bản (RECORD_COLUMNS): sửa/xóa theo ID và chỉ thành công khi phiên bản
+    khớp, nếu không raise RecordConflictError. Lỗi được raise để giao diện tự hiển thị.
+    """
+
+    name = 'base'
+
+    def __init__(self, attendance_columns=ATTENDANCE_COLUMNS, employee_columns=EMPLOYEE_COLUMNS):
+        self.attendance_columns = list(attendance_columns)
+        self.employee_columns = list(employee_columns)
+        # Cột định danh nhân viên: Mã NV nếu có, nếu không thì Tên NV
+        self.employee_key = 'Mã NV' if 'Mã NV' in self.employee_columns else 'Tên NV'
+        self.attendance_key = 'Mã NV' if 'Mã NV' in self.attendance_columns else 'Tên NV'
+
+    def empty_attendance(self):
+        return pd.DataFrame(columns=self.attendance_columns)
+
+    def empty_employees(self):
+        return pd.DataFrame(columns=self.employee_columns)
+
+    # ---- Các thao tác bắt buộc ----
+
+    def load_employees(self):
+        raise NotImplementedError
+
+    def add_employee(self, record):
+        """Thêm một nhân viên, trả về False nếu trùng mã"""
+        raise NotImplementedError
+
+    def append_employees(self, df):
+        """Thêm nhiều nhân viên mới (đã lọc trùng) bằng một lần ghi, trả về số nhân viên đã thêm"""
+        return sum(bool(self.add_employee(record)) for record in df.to_dict('records'))
+
+    def delete_employee(self, index):
+        raise NotImplementedError
+
+    def employees_version(self):
+        """Dấu hiệu thay đổi của danh sách nhân viên (so sánh bằng ==); None nếu không kiểm tra rẻ được"""
+        return None
+
+    def load_attendance(self):
+        raise NotImplementedError
+
+    def load_attendance_by_month(self, month_year):
+        raise NotImplementedError
+
+    def get_available_months(self):
+        raise NotImplementedError
+
+    def save_attendance(self, record):
+        """Thêm một bản ghi; record được gán ID và phiên bản 1"""
+        raise NotImplementedError
+
+    def update_attendance_record(self, month_year, record_id, record, version):
+        """Sửa bản ghi record_id nếu phiên bản hiện tại bằng version; record được gán ID và phiên bản mới"""
+        raise NotImplementedError
+
+    def delete_attendance_record(self, month_year, record_id, version):
+        raise NotImplementedError
+
+    def replace_attendance_month(self, month_year, df):
+        """Ghi lại toàn bộ dữ liệu một tháng bằng một lần ghi (ví dụ sau khi tính lại tổng giờ)"""
+        raise NotImplementedError
+
+    def apply_attendance_changes(self, month_year, updates=(), deletes=()):
+        """Sửa và xóa nhiều bản ghi của một tháng bằng một lần ghi.
+
+        updates: [(ID, record, phiên bản)], deletes: [(ID, phiên bản)]. Phiên bản của tất cả được
+        kiểm tra trước: có bản ghi không khớp thì không ghi gì và raise RecordConflictError.
+        """
+        df = self.load_attendance_by_month(month_year).reindex(columns=self.attendance_columns)
+        positions = check_versions(df, month_year, [(i, v) for i, _, v in updates] + list(deletes))
+        df = df.astype(object)
+        for record_id, record, version in updates:
+            stamp_record(record, record_id, int(version) + 1)
+            df.iloc[positions[str(record_id)]] = [record.get(c) for c in self.attendance_columns]
+        df = df.drop(df.index[[positions[str(record_id)] for record_id, _ in deletes]])
+        self.replace_attendance_month(month_year, df.reset_index(drop=True))
+
+    def append_attendance_months(self, frames):
+        """Thêm nhiều dòng vào cuối các tháng ({tháng: DataFrame}), mỗi tháng một lần ghi"""
+        for month_year, df in frames.items():
+            existing = self.load_attendance_by_month(month_year)
+            self.replace_attendance_month(
+                month_year, pd.concat([existing, df], ignore_index=True) if len(existing) > 0 else df
+            )
+
+    # ---- Các truy vấn dẫn xuất (backend có index nên ghi đè) ----
+
+    def load_attendance_months(self, month_years):
+        """Đọc nhiều tháng, trả về {tháng: DataFrame} (backend có thể đọc gộp một lần)"""
+        return {m: self.load_attendance_by_month(m) for m in month_years}
+
+    def load_attendance_tail(self, month_year, start):
+        """Các dòng của tháng từ vị trí start (bắt đầu từ 0) trở đi, theo thứ tự ghi"""
+        return self.load_attendance_by_month(month_year).iloc[start:].reset_index(drop=True)
+
+    def load_attendance_by_date(self, date_str):
+        df = self.load_attendance_by_month(month_of(date_str))
+        return df[df['Ngày'].astype(str) == date_str]
+
+    def load_attendance_filtered(self, month_year=None, employee_name=None):
+        """Lọc theo tháng và/hoặc tên nhân viên (None = tất cả)"""
+        df = self.load_attendance() if month_year is None else self.load_attendance_by_month(month_year)
+        if employee_name is not None:
+            df = df[df['Tên NV'] == employee_name]
+        return df
+
+    def get_employee_names(self, month_year=None):
+        df = self.load_attendance() if month_year is None else self.load_attendance_by_month(month_year)
+        return sorted(df['Tên NV'].dropna().unique().tolist())
+
+    def count_by_month(self):
+        return {m: len(self.load_attendance_by_month(m)) for m in sorted(self.get_available_months())}
+
+    # ---- Ghi trễ / thông tin lưu trữ ----
+
+    def pending_writes(self):
+        """Số thao tác ghi chưa được đẩy xuống nơi lưu trữ chính"""
+        return 0
+
+    def flush(self):
+        """Đẩy các thao tác ghi đang chờ, trả về số thao tác đã đẩy"""
+        return 0
+
+    def location(self):
+        return self.name
+
+    def size_bytes(self):
+        return None
+
+    def export_excel(self):
+        """Xuất toàn bộ chấm công ra Excel (mỗi tháng một sheet), trả về bytes"""
+        out = Workbook(write_only=True)
+        for month_year in sorted(self.get_available_months()):
+            append_dataframe(out.create_sheet(month_year), self.load_attendance_by_month(month_year))
+        if not out.worksheets:
+            out.create_sheet('Template').append(self.attendance_columns)
+        buffer = BytesIO()
+        out.save(buffer)
+        return buffer.getvalue()
+
+
+class CSVEmployeesMixin:
+    """Danh sách nhân viên lưu trong một file CSV (dùng cho backend Excel và CSV)"""
+
+    employee_file = None
+    _employee_key_cache = (None, frozenset())  # (employees_version, tập mã nhân viên)
+
+    def load_employees(self):
+        if os.path.exists(self.employee_file):
+            return pd.read_csv(self.employee_file, encoding='utf-8')
+        return self.empty_employees()
+
+    def employees_version(self):
+        # Thời điểm sửa và kích thước file: đổi khi thêm/xóa nhân viên hoặc sửa file bằng tay
+        try:
+            stat = os.stat(self.employee_file)
+        except FileNotFoundError:
+            return 0
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _employee_keys(self):
+        # Tập mã nhân viên trong bộ nhớ, chỉ đọc lại file khi file đổi
+        version = self.employees_version()
+        cached_version, keys = self._employee_key_cache
+        if cached_version != version:
+            employees_df = self.load_employees()
+            keys = frozenset(employees_df[self.employee_key].astype(str).str.strip())
+            self._employee_key_cache = (version, keys)
+        return keys
+
+    def _write_employees(self, df):
+        keys = self._employee_keys()
+        write_header = not os.path.exists(self.employee_file)
+        df = df.reindex(columns=self.employee_columns)
+        df.to_csv(self.employee_file, mode='a', header=write_header, index=False, encoding='utf-8')
+        # File vừa đổi do chính lần ghi này: thêm mã mới vào tập thay vì đọc lại file
+        self._employee_key_cache = (self.employees_version(), keys | set(df[self.employee_key].astype(str).str.strip()))
+
+    def add_employee(self, record):
+        if str(record.get(self.employee_key)).strip() in self._employee_keys():
+            return False
+        self._write_employees(pd.DataFrame([record]))
+        return True
+
+    def append_employees(self, df):
+        df = df[~df[self.employee_key].astype(str).str.strip().isin(self._employee_keys())]
+        if len(df) > 0:
+            self._write_employees(df)
+        return len(df)
+
+    def delete_employee(self, index):
+        employees_df = self.load_employees().drop(index)
+        employees_df.to_csv(self.employee_file, index=False, encoding='utf-8')
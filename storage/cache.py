@@ -0,0 +1,278 @@
+import threading
+import time
+
+import pandas as pd
+
+from storage.base import month_of
+
+
+def _positions_of(df, record_id):
+    # Vị trí các dòng có ID = record_id
+    if 'ID' not in df.columns:
+        return []
+    return (df['ID'].astype(str) == str(record_id)).to_numpy().nonzero()[0]
+
+
+class MonthCache:
+    """Bộ đệm DataFrame chấm công theo tháng, dùng chung giữa các phiên trong process.
+
+    Mỗi tháng hết hạn riêng sau ttl giây. Sau khi ghi thành công, DataFrame của tháng bị
+    ảnh hưởng được sửa trực tiếp (write-through) thay vì xóa bộ đệm, nên một lần chấm công
+    chỉ tốn một lần ghi và không phải đọc lại. Giá trị trả về luôn là bản sao.
+    """
+
+    def __init__(self, storage, ttl=300):
+        self.storage = storage
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._months = {}  # tháng -> (thời điểm tải, DataFrame)
+        self._month_list = (None, [])
+        self._versions = {}  # tháng -> số lần tải lại (bản vá không đổi phiên bản)
+        self._revisions = {}  # tháng -> số lần dữ liệu đổi (tải lại hoặc vá)
+
+    def _is_fresh(self, loaded_at):
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    # ---- Đọc ----
+
+    def get_available_months(self):
+        with self._lock:
+            loaded_at, months = self._month_list
+            if not self._is_fresh(loaded_at):
+                months = list(self.storage.get_available_months())
+                self._month_list = (time.monotonic(), months)
+            return list(months)
+
+    def _month(self, month_year):
+        loaded_at, df = self._months.get(month_year, (None, None))
+        if not self._is_fresh(loaded_at):
+            df = self.storage.load_attendance_by_month(month_year)
+            self._months[month_year] = (time.monotonic(), df)
+            self._versions[month_year] = self._versions.get(month_year, 0) + 1
+            self._revisions[month_year] = self._revisions.get(month_year, 0) + 1
+        return df
+
+    def load_month(self, month_year):
+        with self._lock:
+            return self._month(month_year).copy()
+
+    def load_attendance_tail(self, month_year, start):
+        """Các dòng từ vị trí start trở đi (chỉ sao chép phần đuôi)"""
+        with self._lock:
+            return self._month(month_year).iloc[start:].reset_index(drop=True)
+
+    def month_length(self, month_year):
+        """Số dòng hiện có của tháng (tải tháng nếu cần, không sao chép)"""
+        with self._lock:
+            return len(self._month(month_year))
+
+    def month_version(self, month_year):
+        with self._lock:
+            return self._versions.get(month_year, 0)
+
+    def revision(self, month_year):
+        """Số lần dữ liệu tháng đã đổi (tải lại hoặc vá sau khi ghi); tải tháng nếu cần, không sao chép"""
+        with self._lock:
+            self._month(month_year)
+            return self._revisions.get(month_year, 0)
+
+    def _load_missing(self, month_years):
+        # Các tháng chưa có trong bộ đệm được tải bằng một lần gọi
+        missing = [m for m in month_years if not self._is_fresh(self._months.get(m, (None, None))[0])]
+        if missing:
+            loaded_at = time.monotonic()
+            for month_year, df in self.storage.load_attendance_months(missing).items():
+                self._months[month_year] = (loaded_at, df)
+                self._versions[month_year] = self._versions.get(month_year, 0) + 1
+                self._revisions[month_year] = self._revisions.get(month_year, 0) + 1
+
+    def load_attendance_months(self, month_years):
+        """{tháng: DataFrame} như storage.load_attendance_months, đọc qua bộ đệm"""
+        with self._lock:
+            self._load_missing(month_years)
+            return {m: self._months[m][1].copy() for m in month_years if m in self._months}
+
+    def load_all(self):
+        """Tất cả các tháng; các tháng chưa có trong bộ đệm được tải bằng một lần gọi"""
+        months = self.get_available_months()
+        with self._lock:
+            self._load_missing(months)
+            frames = [self._months[m][1] for m in months if m in self._months and len(self._months[m][1]) > 0]
+        if frames:
+            return pd.concat(frames, ignore_index=True)
+        return self.storage.empty_attendance()
+
+    # ---- Cập nhật sau khi ghi ----
+
+    def _patch(self, month_year, change):
+        # change trả về None khi không áp dụng được: tháng được tải lại ở lần đọc tới
+        with self._lock:
+            loaded_at, df = self._months.get(month_year, (None, None))
+            if df is not None:
+                self._revisions[month_year] = self._revisions.get(month_year, 0) + 1
+                df = change(df.copy())
+                if df is None:
+                    self._months.pop(month_year, None)
+                else:
+                    self._months[month_year] = (loaded_at, df)
+
+    def apply_save(self, record):
+        month_year = month_of(record['Ngày'])
+
+        def append(df):
+            row = pd.DataFrame([[record.get(c, '') for c in df.columns]], columns=df.columns)
+            return pd.concat([df, row], ignore_index=True) if len(df) > 0 else row
+
+        with self._lock:
+            loaded_at, months = self._month_list
+            if loaded_at is not None and month_year not in months:
+                self._month_list = (loaded_at, months + [month_year])
+            self._patch(month_year, append)
+
+    def apply_update(self, month_year, record_id, record):
+        def update(df):
+            positions = _positions_of(df, record_id)
+            if len(positions) == 0:
+                return None
+            df.iloc[positions[0]] = [record.get(c, '') for c in df.columns]
+            return df
+        self._patch(month_year, update)
+
+    def apply_delete(self, month_year, record_id):
+        def delete(df):
+            positions = _positions_of(df, record_id)
+            if len(positions) == 0:
+                return None
+            return df.drop(df.index[positions[0]]).reset_index(drop=True)
+        self._patch(month_year, delete)
+
+    def apply_changes(self, month_year, updates=(), deletes=()):
+        """Bản vá sau apply_attendance_changes: updates [(ID, record, _)], deletes [(ID, _)]"""
+        def change(df):
+            if 'ID' not in df.columns:
+                return None
+            ids = df['ID'].astype(str)
+            records = {str(record_id): record for record_id, record, _ in updates}
+            updated = ids.isin(records).to_numpy().nonzero()[0]
+            deleted = ids.isin({str(record_id) for record_id, _ in deletes}).to_numpy()
+            if len(updated) != len(records) or deleted.sum() != len(deletes):
+                return None
+            for k in updated:
+                df.iloc[k] = [records[ids.iloc[k]].get(c, '') for c in df.columns]
+            return df[~deleted].reset_index(drop=True)
+        self._patch(month_year, change)
+
+    def invalidate(self, month_year=None):
+        with self._lock:
+            if month_year is None:
+                self._months.clear()
+                self._month_list = (None, [])
+            else:
+                self._months.pop(month_year, None)
+                # Tháng chưa có trong danh sách (vừa được tạo): đọc lại danh sách tháng
+                if month_year not in self._month_list[1]:
+                    self._month_list = (None, [])
+
+
+class DayIndex:
+    """Chấm công của một ngày (thường là hôm nay), dùng chung giữa các phiên.
+
+    Mỗi lần đọc chỉ lấy các dòng của tháng sau watermark (số dòng tháng đã đọc) qua
+    source.load_attendance_tail(); sửa/xóa từ ứng dụng được áp dụng theo ID bằng
+    apply_update / apply_delete. Đọc lại từ đầu khi sang ngày khác, khi nguồn tải lại tháng
+    (source.month_version đổi), khi tháng có ít dòng hơn watermark (source.month_length) hoặc
+    sau rebuild_seconds. Nguồn nên là MonthCache (có cả hai hàm trên).
+    """
+
+    def __init__(self, source, columns, rebuild_seconds=300):
+        self.source = source
+        self.columns = list(columns)
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, date_str, version=None):
+        self._date = date_str
+        self._version = version
+        self._built_at = time.monotonic()
+        self._watermark = 0
+        self._positions = []  # vị trí trong tháng của từng dòng trong _rows
+        self._rows = pd.DataFrame(columns=self.columns)
+
+    def _source_version(self, month_year):
+        month_version = getattr(self.source, 'month_version', None)
+        return month_version(month_year) if month_version is not None else None
+
+    def _source_length(self, month_year):
+        month_length = getattr(self.source, 'month_length', None)
+        return month_length(month_year) if month_length is not None else None
+
+    def load(self, date_str):
+        month_year = month_of(date_str)
+        with self._lock:
+            version = self._source_version(month_year)
+            if (date_str != self._date or version != self._version
+                    or time.monotonic() - self._built_at >= self.rebuild_seconds):
+                self._reset(date_str, version)
+            length = self._source_length(month_year)
+            if length is not None and length < self._watermark:
+                # Tháng ít dòng hơn số dòng đã đọc (bị ghi lại / rút gọn): vị trí cũ không còn đúng
+                self._reset(date_str, self._source_version(month_year))
+            tail = self.source.load_attendance_tail(month_year, self._watermark)
+            if self._watermark > 0 and self._source_version(month_year) != self._version:
+                # Nguồn vừa tải lại tháng: watermark cũ không còn đúng, đọc lại từ đầu
+                self._reset(date_str, self._source_version(month_year))
+                tail = self.source.load_attendance_tail(month_year, 0)
+            if len(tail) > 0:
+                matches = (tail['Ngày'].astype(str) == date_str).to_numpy().nonzero()[0]
+                if len(matches) > 0:
+                    new_rows = tail.iloc[matches].reindex(columns=self.columns)
+                    self._rows = pd.concat([self._rows, new_rows], ignore_index=True) if len(self._rows) > 0 else new_rows.reset_index(drop=True)
+                    self._positions += [self._watermark + int(i) for i in matches]
+                self._watermark += len(tail)
+            self._version = self._source_version(month_year)
+            return self._rows.copy()
+
+    def invalidate(self):
+        """Đọc lại từ đầu ở lần load() tới (sau khi ghi lại cả tháng)"""
+        with self._lock:
+            self._reset(None)
+
+    def apply_update(self, month_year, record_id, record):
+        with self._lock:
+            if self._date is None or month_year != month_of(self._date):
+                return
+            matches = _positions_of(self._rows, record_id)
+            if len(matches) == 0:
+                # Bản ghi ngày khác được đổi sang hôm nay: chưa biết vị trí trong tháng, đọc lại từ đầu
+                if str(record.get('Ngày')) == self._date:
+                    self._reset(None)
+                return
+            k = int(matches[0])
+            if str(record.get('Ngày')) == self._date:
+                self._rows.iloc[k] = [record.get(c, '') for c in self.columns]
+            else:
+                self._rows = self._rows.drop(self._rows.index[k]).reset_index(drop=True)
+                del self._positions[k]
+
+    def apply_delete(self, month_year, record_id):
+        with self._lock:
+            if self._date is None or month_year != month_of(self._date):
+                return
+            matches = _positions_of(self._rows, record_id)
+            if len(matches) == 0:
+                # Không biết dòng bị xóa nằm trước hay sau watermark: đọc lại từ đầu
+                self._reset(None)
+                return
+            k = int(matches[0])
+            index = self._positions[k]
+            self._rows = self._rows.drop(self._rows.index[k]).reset_index(drop=True)
+            self._positions = [p - 1 if p > index else p for p in self._positions[:k] + self._positions[k + 1:]]
+            self._watermark -= 1
+
+    def apply_changes(self, month_year, updates=(), deletes=()):
+        """Bản vá sau apply_attendance_changes: updates [(ID, record, _)], deletes [(ID, _)]"""
+        for record_id, record, _ in updates:
+            self.apply_update(month_year, record_id, record)
+        for record_id, _ in deletes:
+            self.apply_delete(month_year, record_id)
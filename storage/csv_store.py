@@ -0,0 +1,124 @@
+import csv
+import glob
+import os
+import threading
+
+import pandas as pd
+
+from storage.base import (
+    ATTENDANCE_COLUMNS,
+    EMPLOYEE_COLUMNS,
+    NUMERIC_COLUMNS,
+    AttendanceStorage,
+    CSVEmployeesMixin,
+    assign_record_ids,
+    check_versions,
+    month_of,
+    stamp_record,
+)
+
+
+class CSVStorage(CSVEmployeesMixin, AttendanceStorage):
+    """Chấm công trong các file CSV theo tháng (attendance_YYYY-MM.csv), nhân viên trong CSV.
+
+    Chấm công mới chỉ ghi thêm một dòng vào file của tháng; sửa/xóa (theo ID, kiểm tra
+    phiên bản) ghi lại đúng file đó.
+    """
+
+    name = 'csv'
+
+    def __init__(self, directory, employee_file,
+                 attendance_columns=ATTENDANCE_COLUMNS, employee_columns=EMPLOYEE_COLUMNS):
+        super().__init__(attendance_columns, employee_columns)
+        self.directory = directory
+        self.employee_file = employee_file
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._migrate_record_ids()
+
+    def _migrate_record_ids(self):
+        # File tháng cũ chưa có cột ID (chỉ đọc dòng tiêu đề để kiểm tra): gán ID một lần
+        for month_year in self.get_available_months():
+            with open(self._month_file(month_year), encoding='utf-8') as f:
+                header = next(csv.reader(f), [])
+            if 'ID' not in header:
+                df, _ = assign_record_ids(self._read_month(month_year))
+                self._write_month(month_year, df.reindex(columns=self.attendance_columns))
+
+    def _month_file(self, month_year):
+        return os.path.join(self.directory, f"attendance_{month_year}.csv")
+
+    def _read_month(self, month_year):
+        path = self._month_file(month_year)
+        if not os.path.exists(path):
+            return self.empty_attendance()
+        text_columns = {c: str for c in self.attendance_columns if c not in NUMERIC_COLUMNS}
+        return pd.read_csv(path, encoding='utf-8', dtype=text_columns)
+
+    def _write_month(self, month_year, df):
+        path = self._month_file(month_year)
+        tmp_file = path + ".tmp"
+        df.to_csv(tmp_file, index=False, encoding='utf-8')
+        os.replace(tmp_file, path)
+
+    def load_attendance(self):
+        frames = [self._read_month(m) for m in sorted(self.get_available_months())]
+        frames = [df for df in frames if len(df) > 0]
+        if frames:
+            return pd.concat(frames, ignore_index=True)
+        return self.empty_attendance()
+
+    def load_attendance_by_month(self, month_year):
+        return self._read_month(month_year)
+
+    def get_available_months(self):
+        pattern = os.path.join(self.directory, "attendance_*.csv")
+        return [os.path.basename(path)[len("attendance_"):-len(".csv")] for path in glob.glob(pattern)]
+
+    def save_attendance(self, record):
+        stamp_record(record)
+        path = self._month_file(month_of(record['Ngày']))
+        with self._lock:
+            write_header = not os.path.exists(path)
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(self.attendance_columns)
+                writer.writerow([record.get(c) for c in self.attendance_columns])
+
+    def update_attendance_record(self, month_year, record_id, record, version):
+        self.apply_attendance_changes(month_year, updates=[(record_id, record, version)])
+
+    def delete_attendance_record(self, month_year, record_id, version):
+        self.apply_attendance_changes(month_year, deletes=[(record_id, version)])
+
+    def apply_attendance_changes(self, month_year, updates=(), deletes=()):
+        """Sửa/xóa nhiều bản ghi: đọc, kiểm tra phiên bản và ghi lại file của tháng một lần"""
+        with self._lock:
+            df = self._read_month(month_year)
+            positions = check_versions(df, month_year, [(i, v) for i, _, v in updates] + list(deletes))
+            df = df.astype(object)
+            for record_id, record, version in updates:
+                stamp_record(record, record_id, int(version) + 1)
+                df.iloc[positions[str(record_id)]] = [record.get(c) for c in df.columns]
+            df = df.drop(df.index[[positions[str(record_id)] for record_id, _ in deletes]])
+            self._write_month(month_year, df.reset_index(drop=True))
+
+    def replace_attendance_month(self, month_year, df):
+        with self._lock:
+            df, _ = assign_record_ids(df.reindex(columns=self.attendance_columns))
+            self._write_month(month_year, df)
+
+    def append_attendance_months(self, frames):
+        with self._lock:
+            for month_year, df in frames.items():
+                path = self._month_file(month_year)
+                assign_record_ids(df.reindex(columns=self.attendance_columns))[0].to_csv(
+                    path, mode='a', header=not os.path.exists(path), index=False, encoding='utf-8'
+                )
+
+    def location(self):
+        return self.directory
+
+    def size_bytes(self):
+        return sum(os.path.getsize(self._month_file(m)) for m in self.get_available_months())
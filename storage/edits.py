@@ -0,0 +1,79 @@
+"""So sánh bảng chấm công một tháng trước / sau khi sửa trên st.data_editor
+
+Chỉ các dòng có ô thay đổi (hoặc được đánh dấu xóa) được đưa vào kết quả, để giao diện
+ghi tất cả bằng một lần storage.apply_attendance_changes().
+"""
+import numpy as np
+import pandas as pd
+
+from storage.base import RECORD_COLUMNS
+from storage.hours import LUNCH_BREAK_HOURS, STANDARD_HOURS, calculate_hours_column, calculate_ot_column
+from storage.importer import ERROR_COLUMN, normalize_dates, normalize_times
+
+# Cột được sửa trên bảng (nhân viên giữ nguyên; Tổng giờ / OT được tính lại)
+EDITABLE_COLUMNS = ['Ngày', 'Giờ vào', 'Giờ ra', 'Ghi chú']
+# Cột checkbox đánh dấu dòng cần xóa
+DELETE_COLUMN = 'Xóa'
+
+
+def _text(values):
+    return pd.Series(values, dtype=object).fillna('').astype(str).str.strip().reset_index(drop=True)
+
+
+def diff_month_edits(original, edited, attendance_columns,
+                     lunch_break_hours=LUNCH_BREAK_HOURS, standard_hours=STANDARD_HOURS):
+    """So sánh từng ô của các cột EDITABLE_COLUMNS (edited cùng thứ tự dòng với original).
+
+    Trả về (updates [(ID, record, phiên bản)], deletes [(ID, phiên bản)], dòng lỗi kèm cột Lỗi).
+    """
+    original = original.reset_index(drop=True)
+    edited = edited.reset_index(drop=True)
+    versions = pd.to_numeric(original['Phiên bản'], errors='coerce').fillna(1).astype(int)
+
+    deleted = edited[DELETE_COLUMN].fillna(False).astype(bool).to_numpy() if DELETE_COLUMN in edited.columns \
+        else np.zeros(len(edited), dtype=bool)
+    changed = np.zeros(len(edited), dtype=bool)
+    for col in EDITABLE_COLUMNS:
+        if col in edited.columns:
+            changed |= (_text(original[col]) != _text(edited[col])).to_numpy()
+    changed &= ~deleted
+
+    deletes = [(original['ID'].iloc[i], int(versions.iloc[i])) for i in np.flatnonzero(deleted)]
+    rows = edited.iloc[np.flatnonzero(changed)]
+    if len(rows) == 0:
+        return [], deletes, pd.DataFrame(columns=[ERROR_COLUMN])
+
+    # Chuẩn hóa và kiểm tra các dòng bị sửa
+    dates = normalize_dates(rows['Ngày'])
+    time_in = normalize_times(rows['Giờ vào'])
+    time_out = normalize_times(rows['Giờ ra'])
+    # Bản ghi nằm trong dữ liệu của tháng cũ: không cho đổi ngày sang tháng khác
+    other_month = dates.notna().to_numpy() & (
+        dates.astype(str).str[:7].to_numpy() != _text(original['Ngày'].iloc[np.flatnonzero(changed)]).str[:7].to_numpy()
+    )
+    reasons = np.select(
+        [dates.isna().to_numpy(), other_month, (time_in.isna() | (time_in == '')).to_numpy(),
+         time_out.isna().to_numpy()],
+        ["Ngày không hợp lệ", "Ngày khác tháng", "Giờ vào không hợp lệ", "Giờ ra không hợp lệ"],
+        default=''
+    )
+    if (reasons != '').any():
+        errors = rows[reasons != ''].copy()
+        errors[ERROR_COLUMN] = reasons[reasons != '']
+        return [], [], errors
+
+    total_hours = calculate_hours_column(time_in, time_out, lunch_break_hours)
+    ot_hours = calculate_ot_column(total_hours, standard_hours)
+    notes = _text(rows['Ghi chú'])
+    data_columns = [c for c in attendance_columns if c not in RECORD_COLUMNS]
+    updates = []
+    for k, i in enumerate(np.flatnonzero(changed)):
+        record = {c: original[c].iloc[i] for c in data_columns if c in original.columns}
+        record.update({
+            'Ngày': dates.iloc[k], 'Giờ vào': time_in.iloc[k], 'Giờ ra': time_out.iloc[k],
+            'Tổng giờ': float(total_hours[k]), 'Ghi chú': notes.iloc[k],
+        })
+        if 'OT' in data_columns:
+            record['OT'] = float(ot_hours[k])
+        updates.append((original['ID'].iloc[i], record, int(versions.iloc[i])))
+    return updates, deletes, pd.DataFrame(columns=[ERROR_COLUMN])
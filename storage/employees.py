@@ -0,0 +1,156 @@
+import bisect
+import difflib
+import threading
+import time
+import unicodedata
+
+
+def normalize_text(value):
+    """Chữ thường, bỏ dấu tiếng Việt ("Nguyễn Văn Đức" -> "nguyen van duc") để tìm kiếm"""
+    text = unicodedata.normalize('NFD', str(value).strip().lower()).replace('đ', 'd')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+class _Snapshot:
+    """Các index của một lần đọc danh sách nhân viên (không sửa sau khi dựng)"""
+
+    def __init__(self, df, key_column, department_column):
+        self.frame = df = df.reset_index(drop=True)
+        self.keys = df[key_column].astype(str).str.strip().tolist() if key_column in df.columns else []
+        names = df['Tên NV'].astype(str).str.strip().tolist() if 'Tên NV' in df.columns else list(self.keys)
+        self.records = df.to_dict('records')
+        self.by_key = {k: i for i, k in enumerate(self.keys)}
+        self.by_name = {}
+        for i, name in enumerate(names):
+            self.by_name.setdefault(name, i)
+        self.labels = [k if k == n else f"{k} - {n}" for k, n in zip(self.keys, names)]
+
+        self.by_department = {}
+        if department_column in df.columns:
+            for i, department in enumerate(df[department_column].fillna('').astype(str).str.strip()):
+                if department:
+                    self.by_department.setdefault(department, []).append(i)
+
+        # Khóa tìm kiếm theo tiền tố: mã, tên đầy đủ và phần tên bắt đầu từ mỗi từ ("van an", "an")
+        tokens = []
+        for i, (k, n) in enumerate(zip(self.keys, names)):
+            tokens.append((normalize_text(k), i))
+            words = normalize_text(n).split()
+            tokens += [(' '.join(words[j:]), i) for j in range(len(words))]
+        tokens.sort()
+        self.tokens = [t for t, _ in tokens]
+        self.token_positions = [i for _, i in tokens]
+        self.normalized_names = {}
+        for i, n in enumerate(names):
+            self.normalized_names.setdefault(normalize_text(n), []).append(i)
+
+
+class EmployeeRegistry:
+    """Danh sách nhân viên dùng chung giữa các phiên, kèm index để tra cứu không phải quét bảng.
+
+    Index theo mã nhân viên (employee_key), theo tên và theo bộ phận; tìm kiếm theo tiền tố
+    (không dấu, bisect trên danh sách khóa đã sắp xếp), thiếu kết quả thì tìm gần đúng bằng difflib.
+    Chỉ dựng lại khi storage.employees_version() đổi; backend không có dấu hiệu thay đổi rẻ
+    (Google Sheets) thì dựng lại sau ttl giây hoặc khi gọi invalidate().
+    """
+
+    def __init__(self, storage, ttl=300, department_column='Bộ phận'):
+        self.storage = storage
+        self.ttl = ttl
+        self.department_column = department_column
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._built_at = None
+        self._revision = 0  # số lần dựng lại
+
+    def _current(self):
+        with self._lock:
+            version = self.storage.employees_version()
+            expired = version is None and (
+                self._built_at is None or time.monotonic() - self._built_at >= self.ttl
+            )
+            if self._snapshot is None or expired or version != self._version:
+                self._snapshot = _Snapshot(self.storage.load_employees(), self.storage.employee_key,
+                                           self.department_column)
+                self._version = version
+                self._built_at = time.monotonic()
+                self._revision += 1
+            return self._snapshot
+
+    def invalidate(self):
+        """Dựng lại ở lần đọc tới (sau khi thêm/xóa nhân viên)"""
+        with self._lock:
+            self._snapshot = None
+
+    def revision(self):
+        """Tăng mỗi lần danh sách được đọc lại (dùng làm khóa cho kết quả tính từ danh sách)"""
+        self._current()
+        return self._revision
+
+    def __len__(self):
+        return len(self._current().keys)
+
+    def employees(self):
+        return self._current().frame.copy()
+
+    def keys(self, department=None):
+        snapshot = self._current()
+        if department is None:
+            return list(snapshot.keys)
+        return [snapshot.keys[i] for i in snapshot.by_department.get(department, [])]
+
+    def departments(self):
+        return sorted(self._current().by_department)
+
+    def get(self, key):
+        """Nhân viên theo mã (dict theo tên cột), None nếu không có"""
+        snapshot = self._current()
+        i = snapshot.by_key.get(str(key).strip())
+        return None if i is None else dict(snapshot.records[i])
+
+    def get_by_name(self, name):
+        snapshot = self._current()
+        i = snapshot.by_name.get(str(name).strip())
+        return None if i is None else dict(snapshot.records[i])
+
+    def label(self, key):
+        snapshot = self._current()
+        i = snapshot.by_key.get(str(key))
+        return str(key) if i is None else snapshot.labels[i]
+
+    def search(self, query='', department=None, limit=50):
+        """Mã nhân viên khớp query (tiền tố của mã hoặc của một từ trong tên, không dấu), theo bộ phận.
+
+        Không có kết quả theo tiền tố thì trả về các tên gần giống nhất.
+        """
+        snapshot = self._current()
+        allowed = None if department is None else set(snapshot.by_department.get(department, []))
+        q = normalize_text(query)
+        if not q:
+            positions = range(len(snapshot.keys)) if allowed is None else sorted(allowed)
+            return [snapshot.keys[i] for i in positions[:limit]]
+
+        found = []
+        seen = set()
+
+        def add(i):
+            if i not in seen and (allowed is None or i in allowed):
+                seen.add(i)
+                found.append(snapshot.keys[i])
+
+        start = bisect.bisect_left(snapshot.tokens, q)
+        for k in range(start, len(snapshot.tokens)):
+            if not snapshot.tokens[k].startswith(q) or len(found) >= limit:
+                break
+            add(snapshot.token_positions[k])
+        # Không có tên nào bắt đầu như vậy (gõ sai chính tả): tìm gần đúng theo tên
+        if not found:
+            names = snapshot.normalized_names if allowed is None else {
+                normalize_text(snapshot.records[i].get('Tên NV', snapshot.keys[i])) for i in allowed
+            }
+            for name in difflib.get_close_matches(q, list(names), n=limit, cutoff=0.6):
+                for i in snapshot.normalized_names.get(name, []):
+                    if len(found) < limit:
+                        add(i)
+        return found
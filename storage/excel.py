@@ -0,0 +1,396 @@
+import csv
+import os
+import tempfile
+import threading
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from storage.base import (
+    ATTENDANCE_COLUMNS,
+    EMPLOYEE_COLUMNS,
+    NUMERIC_COLUMNS,
+    AttendanceStorage,
+    CSVEmployeesMixin,
+    append_dataframe,
+    assign_record_ids,
+    check_versions,
+    month_of,
+    stamp_record,
+)
+
+# Cột "Thao tác" của nhật ký: '' là thêm mới, còn lại là sửa / xóa bản ghi theo ID
+OP_UPDATE = 'sửa'
+OP_DELETE = 'xóa'
+
+
+class ExcelStorage(CSVEmployeesMixin, AttendanceStorage):
+    """Chấm công trong file Excel (mỗi tháng một sheet) + nhật ký ghi thêm, nhân viên trong CSV.
+
+    Mỗi lần chấm công, sửa hoặc xóa chỉ ghi thêm một dòng vào nhật ký (sửa/xóa theo ID,
+    kiểm tra phiên bản qua index ID -> phiên bản); nhật ký được gộp vào các sheet tháng khi
+    vượt quá journal_compact_bytes (ở luồng nền) hoặc khi gọi compact_journal().
+    Workbook được đọc một lần cho mỗi phiên bản file (mtime + kích thước) và dùng chung
+    giữa các phiên.
+    """
+
+    name = 'excel'
+
+    def __init__(self, data_file, employee_file, journal_file,
+                 attendance_columns=ATTENDANCE_COLUMNS, employee_columns=EMPLOYEE_COLUMNS,
+                 journal_compact_bytes=256 * 1024):
+        super().__init__(attendance_columns, employee_columns)
+        self.data_file = data_file
+        self.employee_file = employee_file
+        self.journal_file = journal_file
+        self.journal_compact_bytes = journal_compact_bytes
+        self.journal_columns = self.attendance_columns + ['Tháng', 'Thao tác']
+        # Ghi nhật ký / gộp nhật ký tuần tự giữa các phiên
+        self._journal_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        # Đã có luồng gộp nhật ký đang chờ / đang chạy
+        self._compacting = threading.Event()
+        self._workbook_cache = (None, {}, None)
+        self._journal_cache = (None, None)
+        if not os.path.exists(self.data_file):
+            # Tạo file Excel trống
+            self._write_workbook({'Template': self.empty_attendance()})
+        self._migrate_record_ids()
+
+    def _migrate_record_ids(self):
+        # Dữ liệu cũ chưa có ID: gộp nhật ký kiểu cũ rồi gán ID cho các sheet (một lần ghi workbook)
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, encoding='utf-8') as f:
+                header = next(csv.reader(f), [])
+            if header != self.journal_columns:
+                self.compact_journal()
+        migrated = {}
+        for title, df in self._workbook_sheets().items():
+            assigned, count = assign_record_ids(df)
+            if count > 0 or 'ID' not in df.columns:
+                migrated[title] = assigned
+        if migrated:
+            self._write_workbook(migrated)
+
+    # ---- Đọc / ghi file Excel ----
+
+    def _read_workbook(self):
+        """Đọc tất cả các sheet tháng (openpyxl read_only, duyệt từng dòng), trả về dict {tên sheet: DataFrame}"""
+        wb = load_workbook(self.data_file, read_only=True, data_only=True)
+        sheets = {}
+        try:
+            for ws in wb.worksheets:
+                if ws.title == 'Template':
+                    continue
+                rows = ws.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    sheets[ws.title] = self.empty_attendance()
+                    continue
+                width = len(header)
+                data = [tuple(row[:width]) + (None,) * (width - len(row)) for row in rows]
+                df = pd.DataFrame(data, columns=list(header))
+                # Bỏ cột không có tên và dòng trống
+                df = df.loc[:, [col is not None for col in df.columns]]
+                sheets[ws.title] = df.dropna(how='all').reset_index(drop=True)
+        finally:
+            wb.close()
+        return sheets
+
+    def _write_workbook(self, replacements):
+        """Ghi lại workbook: sheet có trong replacements lấy từ DataFrame, các sheet khác chép nguyên từng dòng"""
+        source = load_workbook(self.data_file, read_only=True) if os.path.exists(self.data_file) else None
+        out = Workbook(write_only=True)
+        try:
+            if source is not None:
+                for ws in source.worksheets:
+                    target = out.create_sheet(ws.title)
+                    if ws.title in replacements:
+                        append_dataframe(target, replacements[ws.title])
+                    else:
+                        for row in ws.iter_rows(values_only=True):
+                            target.append(row)
+                existing = set(source.sheetnames)
+            else:
+                existing = set()
+            for sheet_name, df in replacements.items():
+                if sheet_name not in existing:
+                    append_dataframe(out.create_sheet(sheet_name), df)
+            # Ghi ra file tạm (tên riêng cho mỗi lần ghi) rồi thay thế để không làm hỏng file khi lỗi giữa chừng
+            fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(self.data_file) + '.',
+                                            suffix='.tmp', dir=os.path.dirname(os.path.abspath(self.data_file)))
+            os.close(fd)
+            try:
+                out.save(tmp_file)
+                os.replace(tmp_file, self.data_file)
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+        finally:
+            if source is not None:
+                source.close()
+        self._invalidate_cache()
+
+    @staticmethod
+    def _file_key(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _workbook_sheets(self):
+        # Chỉ đọc lại file Excel khi file thay đổi
+        if not os.path.exists(self.data_file):
+            return {}
+        key = self._file_key(self.data_file)
+        with self._cache_lock:
+            cached_key, sheets, _ = self._workbook_cache
+            if cached_key != key:
+                sheets = self._read_workbook()
+                self._workbook_cache = (key, sheets, None)
+        return sheets
+
+    def _sheet_index(self):
+        """Index {ID: (tháng, phiên bản)} của các bản ghi trong file Excel, dựng một lần cho mỗi phiên bản file"""
+        self._workbook_sheets()
+        with self._cache_lock:
+            key, sheets, index = self._workbook_cache
+            if index is None:
+                index = {}
+                for title, df in sheets.items():
+                    if 'ID' in df.columns and len(df) > 0:
+                        versions = pd.to_numeric(df['Phiên bản'], errors='coerce').fillna(1).astype(int)
+                        index.update(zip(df['ID'].astype(str), zip([title] * len(df), versions.tolist())))
+                self._workbook_cache = (key, sheets, index)
+        return index
+
+    def _load_journal(self):
+        """Đọc nhật ký (thêm / sửa / xóa chưa gộp vào file Excel) theo thứ tự ghi"""
+        if not os.path.exists(self.journal_file):
+            return pd.DataFrame(columns=self.journal_columns)
+        key = self._file_key(self.journal_file)
+        with self._cache_lock:
+            cached_key, journal_df = self._journal_cache
+            if cached_key != key:
+                text_columns = {c: str for c in self.journal_columns if c not in NUMERIC_COLUMNS}
+                journal_df = pd.read_csv(self.journal_file, encoding='utf-8', dtype=text_columns)
+                # Nhật ký kiểu cũ chỉ có các dòng thêm mới
+                if 'Tháng' not in journal_df.columns:
+                    journal_df['Tháng'] = journal_df['Ngày'].str[:7]
+                journal_df = journal_df.reindex(columns=self.journal_columns)
+                journal_df['Thao tác'] = journal_df['Thao tác'].fillna('')
+                self._journal_cache = (key, journal_df)
+        return journal_df.copy()
+
+    def _append_journal(self, rows):
+        """Ghi thêm các dòng vào nhật ký trong một lần ghi (gọi khi đang giữ _journal_lock), trả về kích thước nhật ký"""
+        write_header = not os.path.exists(self.journal_file)
+        with open(self.journal_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(self.journal_columns)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        return os.path.getsize(self.journal_file)
+
+    def _compact_if_large(self, journal_size):
+        # Nhật ký quá lớn thì gộp vào Excel ở luồng nền (mỗi lúc chỉ một luồng)
+        if journal_size > self.journal_compact_bytes:
+            with self._cache_lock:
+                if self._compacting.is_set():
+                    return
+                self._compacting.set()
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact_journal()
+        finally:
+            self._compacting.clear()
+
+    def _apply_journal(self, df, rows):
+        """Áp dụng các thao tác nhật ký của một tháng (theo thứ tự ghi) lên dữ liệu sheet, trả về bản mới"""
+        ops = rows['Thao tác']
+        inserts = rows.loc[ops == '', self.attendance_columns]
+        df = pd.concat([df, inserts], ignore_index=True) if len(inserts) > 0 else df.copy()
+        # Mỗi ID chỉ lấy lần sửa cuối cùng
+        updates = rows[ops == OP_UPDATE].drop_duplicates('ID', keep='last').set_index('ID', drop=False)
+        if len(updates) > 0:
+            hit = df['ID'].isin(updates.index).to_numpy()
+            values = updates.loc[df.loc[hit, 'ID'], self.attendance_columns]
+            for col in self.attendance_columns:
+                df[col] = df[col].astype(object)
+                df.loc[hit, col] = values[col].to_numpy()
+        deleted = rows.loc[ops == OP_DELETE, 'ID']
+        if len(deleted) > 0:
+            df = df[~df['ID'].isin(deleted)].reset_index(drop=True)
+        return df
+
+    def _current_versions(self, month_year, record_ids):
+        """{ID: phiên bản hiện tại} của các bản ghi còn trong tháng: index của file Excel, rồi áp nhật ký lên trên"""
+        record_ids = {str(record_id) for record_id in record_ids}
+        index = self._sheet_index()
+        versions = {}
+        for record_id in record_ids:
+            month, version = index.get(record_id, (None, None))
+            if month == month_year:
+                versions[record_id] = version
+        journal_df = self._load_journal()
+        ops = journal_df[(journal_df['Tháng'] == month_year) & journal_df['ID'].isin(record_ids)]
+        for record_id, op, version in zip(ops['ID'], ops['Thao tác'], ops['Phiên bản']):
+            if op == OP_DELETE:
+                versions.pop(record_id, None)
+            else:
+                versions[record_id] = int(version)
+        return versions
+
+    def _check_versions(self, month_year, expected):
+        current = self._current_versions(month_year, [record_id for record_id, _ in expected])
+        check_versions(pd.DataFrame({'ID': list(current), 'Phiên bản': list(current.values())}), month_year, expected)
+
+    def _invalidate_cache(self):
+        with self._cache_lock:
+            self._workbook_cache = (None, {}, None)
+            self._journal_cache = (None, None)
+
+    def _snapshot(self):
+        """(các sheet trong file Excel, nhật ký) đọc trong cùng một lần giữ _journal_lock.
+
+        Lần gộp nhật ký giữ khóa từ lúc thay file Excel đến lúc xóa nhật ký, nên không đọc được
+        file Excel mới cùng với nhật ký cũ (mỗi bản ghi trong nhật ký sẽ xuất hiện hai lần).
+        """
+        with self._journal_lock:
+            try:
+                sheets = self._workbook_sheets()
+            except Exception:
+                sheets = {}
+            return sheets, self._load_journal()
+
+    def _load_sheet(self, month_year, sheets=None):
+        """Đọc một sheet tháng trong file Excel (không gồm nhật ký)"""
+        if sheets is None:
+            try:
+                sheets = self._workbook_sheets()
+            except Exception:
+                sheets = {}
+        if month_year in sheets:
+            return sheets[month_year].copy()
+        # Sheet chưa tồn tại
+        return self.empty_attendance()
+
+    # ---- Chấm công ----
+
+    def load_attendance(self):
+        # Áp dụng nhật ký chưa gộp vào Excel lên từng tháng
+        sheets, journal_df = self._snapshot()
+        pending = dict(tuple(journal_df.groupby('Tháng', sort=False))) if len(journal_df) > 0 else {}
+        all_sheets = [
+            self._apply_journal(df, pending.pop(month)) if month in pending else df
+            for month, df in sheets.items()
+        ]
+        all_sheets += [self._apply_journal(self.empty_attendance(), rows) for rows in pending.values()]
+        all_sheets = [df for df in all_sheets if len(df) > 0]
+        if all_sheets:
+            return pd.concat(all_sheets, ignore_index=True)
+        return self.empty_attendance()
+
+    def load_attendance_by_month(self, month_year):
+        sheets, journal_df = self._snapshot()
+        df = self._load_sheet(month_year, sheets)
+        journal_df = journal_df[journal_df['Tháng'] == month_year]
+        if len(journal_df) > 0:
+            df = self._apply_journal(df, journal_df)
+        return df
+
+    def get_available_months(self):
+        sheets, journal_df = self._snapshot()
+        months = set(sheets)
+        months.update(journal_df['Tháng'].dropna())
+        return list(months)
+
+    def save_attendance(self, record):
+        """Ghi thêm bản ghi vào nhật ký; sheet tháng được cập nhật khi gộp nhật ký"""
+        stamp_record(record)
+        with self._journal_lock:
+            journal_size = self._append_journal(
+                [[record.get(c) for c in self.attendance_columns] + [month_of(record['Ngày']), '']]
+            )
+        self._compact_if_large(journal_size)
+
+    def compact_journal(self):
+        """Gộp toàn bộ nhật ký vào file Excel (mỗi tháng ghi lại một lần), trả về số bản ghi đã gộp"""
+        with self._journal_lock:
+            return self._compact_locked()
+
+    def _compact_locked(self):
+        # Gọi khi đang giữ _journal_lock
+        journal_df = self._load_journal()
+        if len(journal_df) == 0:
+            return 0
+
+        updated_sheets = {
+            month: self._apply_journal(self._load_sheet(month), rows)
+            for month, rows in journal_df.groupby('Tháng', sort=False)
+        }
+        # Ghi lại file Excel một lần cho tất cả các tháng bị ảnh hưởng
+        self._write_workbook(updated_sheets)
+
+        os.remove(self.journal_file)
+        self._invalidate_cache()
+        return len(journal_df)
+
+    def update_attendance_record(self, month_year, record_id, record, version):
+        self.apply_attendance_changes(month_year, updates=[(record_id, record, version)])
+
+    def delete_attendance_record(self, month_year, record_id, version):
+        self.apply_attendance_changes(month_year, deletes=[(record_id, version)])
+
+    def apply_attendance_changes(self, month_year, updates=(), deletes=()):
+        """Sửa/xóa nhiều bản ghi: kiểm tra phiên bản rồi ghi thêm các dòng "sửa"/"xóa" (xóa chỉ có ID)
+        vào nhật ký trong một lần ghi, không ghi lại file Excel"""
+        with self._journal_lock:
+            self._check_versions(month_year, [(i, v) for i, _, v in updates] + list(deletes))
+            rows = []
+            for record_id, record, version in updates:
+                stamp_record(record, record_id, int(version) + 1)
+                rows.append([record.get(c) for c in self.attendance_columns] + [month_year, OP_UPDATE])
+            for record_id, _ in deletes:
+                rows.append([record_id if c == 'ID' else None for c in self.attendance_columns] + [month_year, OP_DELETE])
+            journal_size = self._append_journal(rows)
+        self._compact_if_large(journal_size)
+
+    def replace_attendance_month(self, month_year, df):
+        # Gộp nhật ký trước để các bản ghi của tháng không bị ghi hai lần; giữ khóa đến khi ghi xong
+        # để lần gộp nhật ký ở luồng nền không ghi đè file Excel giữa chừng
+        with self._journal_lock:
+            self._compact_locked()
+            self._write_workbook({month_year: assign_record_ids(df.reset_index(drop=True))[0]})
+
+    def append_attendance_months(self, frames):
+        # Gộp nhật ký rồi ghi lại file Excel một lần cho tất cả các tháng (giữ khóa đến khi ghi xong)
+        with self._journal_lock:
+            self._compact_locked()
+            self._write_workbook({
+                month_year: pd.concat([self._load_sheet(month_year), assign_record_ids(df)[0]], ignore_index=True)
+                for month_year, df in frames.items()
+            })
+
+    # ---- Ghi trễ / thông tin lưu trữ ----
+
+    def pending_writes(self):
+        return len(self._load_journal())
+
+    def flush(self):
+        return self.compact_journal()
+
+    def location(self):
+        return self.data_file
+
+    def size_bytes(self):
+        return os.path.getsize(self.data_file) if os.path.exists(self.data_file) else None
+
+    def export_excel(self):
+        # File Excel chính là bản xuất sau khi gộp nhật ký
+        self.compact_journal()
+        with open(self.data_file, 'rb') as f:
+            return f.read()
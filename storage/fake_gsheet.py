@@ -0,0 +1,360 @@
+"""Giả lập Google Sheets chạy trong process (không cần mạng)
+
+Thay thế client gspread khi chạy thử / đo hiệu năng app_gsheet.py: có độ trễ mỗi lệnh gọi,
+quota đọc/ghi mỗi phút, lỗi chèn vào theo ý muốn và đếm số lệnh gọi theo từng hàm.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+
+import gspread
+
+# Các hàm ghi dữ liệu (tính vào quota ghi)
+WRITE_CALLS = {'add_worksheet', 'append_row', 'append_rows', 'update', 'batch_update', 'delete_rows', 'clear'}
+
+
+class FakeAPIError(Exception):
+    """Lỗi API giả, có response.status_code và code giống gspread.exceptions.APIError"""
+
+    class _Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    def __init__(self, status_code, message=''):
+        super().__init__(f"{status_code}: {message}" if message else str(status_code))
+        self.code = status_code
+        self.response = self._Response(status_code)
+
+
+# Giá trị khi ghi lên sheet -> chuỗi hiển thị (get_all_values trả về chuỗi đã định dạng)
+def _cell_to_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ''
+        return str(int(value)) if value.is_integer() else str(value)
+    return str(value)
+
+
+# Chuỗi -> số như get_all_records của gspread
+def _numericise(text):
+    if text == '':
+        return ''
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch.upper()) - ord('A') + 1
+    return index
+
+
+# "A5:G" / "A:G" / "A1:G1" -> (dòng đầu, dòng cuối hoặc None, cột đầu, cột cuối), bắt đầu từ 1
+def _parse_a1(a1):
+    match = re.fullmatch(r'([A-Za-z]+)(\d*)(?::([A-Za-z]+)(\d*))?', a1)
+    if match is None:
+        raise FakeAPIError(400, f"Unable to parse range: {a1}")
+    start_col, start_row, end_col, end_row = match.groups()
+    start_row = int(start_row) if start_row else 1
+    if end_col is None:
+        return start_row, start_row, _column_index(start_col), _column_index(start_col)
+    end_row = int(end_row) if end_row else None
+    return start_row, end_row, _column_index(start_col), _column_index(end_col)
+
+
+def _split_sheet_range(full_range):
+    # "'2025-12'!A5:G" -> ("2025-12", "A5:G")
+    title, _, a1 = full_range.rpartition('!')
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, a1
+
+
+def _trim(rows):
+    # API bỏ ô trống cuối mỗi dòng và dòng trống cuối vùng
+    trimmed = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] == '':
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class FakeClient:
+    """Thay cho gspread.Client: open_by_key() tự tạo file trống (có Sheet1) nếu chưa có.
+
+    latency: số giây chờ mỗi lệnh gọi; read_quota / write_quota: số lệnh gọi tối đa mỗi
+    60 giây (vượt quá thì lỗi 429); error_rate: xác suất lỗi 503 ngẫu nhiên;
+    data_file: file JSON (tạo bằng dump()) để nạp sẵn dữ liệu.
+    """
+
+    def __init__(self, latency=0.0, read_quota=None, write_quota=None, error_rate=0.0, seed=None,
+                 data_file=None):
+        self.latency = latency
+        self.read_quota = read_quota
+        self.write_quota = write_quota
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._spreadsheets = {}
+        self._recent = {'read': deque(), 'write': deque()}
+        self._injected = deque()
+        if data_file and os.path.exists(data_file):
+            self.load(data_file)
+
+    # ---- Độ trễ / quota / lỗi ----
+
+    def inject_error(self, status_code=503, count=1):
+        """Các lệnh gọi tiếp theo (count lần) lỗi với mã status_code"""
+        with self._lock:
+            self._injected.extend([status_code] * count)
+
+    def _api_call(self, name):
+        kind = 'write' if name in WRITE_CALLS else 'read'
+        with self._lock:
+            self.calls[name] += 1
+            self.calls[kind + 's'] += 1
+            if self._injected:
+                raise FakeAPIError(self._injected.popleft(), f"Injected error in {name}")
+            quota = self.write_quota if kind == 'write' else self.read_quota
+            recent = self._recent[kind]
+            now = time.monotonic()
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            if quota is not None and len(recent) >= quota:
+                raise FakeAPIError(429, f"Quota exceeded for {kind} requests per minute")
+            recent.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                raise FakeAPIError(503, "The service is currently unavailable")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    # ---- gspread.Client ----
+
+    def create_spreadsheet(self, key, title=None, worksheets=None):
+        """Tạo sẵn một file: worksheets = {tên: danh sách dòng} (không tính vào số lệnh gọi)"""
+        with self._lock:
+            spreadsheet = FakeSpreadsheet(self, key, title or key)
+            for ws_title, rows in (worksheets or {'Sheet1': []}).items():
+                spreadsheet._add(ws_title, rows=max(1000, len(rows)), cols=26).load_rows(rows)
+            self._spreadsheets[key] = spreadsheet
+            return spreadsheet
+
+    def dump(self, path):
+        """Lưu toàn bộ dữ liệu ra file JSON"""
+        with self._lock:
+            data = {
+                key: {'title': spreadsheet.title,
+                      'worksheets': {ws.title: ws._rows for ws in spreadsheet._worksheets}}
+                for key, spreadsheet in self._spreadsheets.items()
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        for key, spreadsheet in data.items():
+            self.create_spreadsheet(key, spreadsheet['title'], spreadsheet['worksheets'])
+
+    def open_by_key(self, key):
+        self._api_call('open_by_key')
+        with self._lock:
+            if key not in self._spreadsheets:
+                self.create_spreadsheet(key)
+            return self._spreadsheets[key]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, key, title):
+        self.client = client
+        self.id = key
+        self.title = title
+        self._worksheets = []
+
+    def _add(self, title, rows, cols):
+        worksheet = FakeWorksheet(self, title, int(rows), int(cols))
+        worksheet.id = max((ws.id for ws in self._worksheets), default=-1) + 1
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def worksheets(self):
+        self.client._api_call('worksheets')
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        self.client._api_call('worksheet')
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    @property
+    def sheet1(self):
+        self.client._api_call('sheet1')
+        return self._worksheets[0]
+
+    def add_worksheet(self, title, rows, cols, index=None):
+        self.client._api_call('add_worksheet')
+        with self.client._lock:
+            if any(ws.title == title for ws in self._worksheets):
+                raise FakeAPIError(400, f'A sheet with the name "{title}" already exists')
+            return self._add(title, rows, cols)
+
+    def values_batch_get(self, ranges, params=None):
+        self.client._api_call('values_batch_get')
+        value_ranges = []
+        with self.client._lock:
+            for full_range in ranges:
+                title, a1 = _split_sheet_range(full_range)
+                worksheet = next((ws for ws in self._worksheets if ws.title == title), None)
+                if worksheet is None:
+                    raise FakeAPIError(400, f"Unable to parse range: {full_range}")
+                values = worksheet._read(a1)
+                value_range = {'range': full_range, 'majorDimension': 'ROWS'}
+                if values:
+                    value_range['values'] = values
+                value_ranges.append(value_range)
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+
+    def batch_update(self, body):
+        """Chỉ hỗ trợ request deleteDimension theo dòng (xóa nhiều khoảng dòng trong một lệnh gọi)"""
+        self.client._api_call('batch_update')
+        with self.client._lock:
+            for request in body.get('requests', []):
+                if 'deleteDimension' not in request:
+                    raise FakeAPIError(400, f"Unsupported request: {list(request)}")
+                target = request['deleteDimension']['range']
+                worksheet = next((ws for ws in self._worksheets if ws.id == target['sheetId']), None)
+                if worksheet is None or target.get('dimension') != 'ROWS':
+                    raise FakeAPIError(400, f"Invalid range: {target}")
+                worksheet._delete(target['startIndex'] + 1, target['endIndex'])
+        return {'spreadsheetId': self.id, 'replies': [{} for _ in body.get('requests', [])]}
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, rows, cols):
+        self.spreadsheet = spreadsheet
+        self.client = spreadsheet.client
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._rows = []  # danh sách dòng (chuỗi)
+
+    def load_rows(self, rows):
+        self._rows = [[_cell_to_text(v) for v in row] for row in rows]
+        self.row_count = max(self.row_count, len(self._rows))
+
+    def _read(self, a1):
+        start_row, end_row, start_col, end_col = _parse_a1(a1)
+        if start_row > self.row_count:
+            raise FakeAPIError(400, f"Range ({self.title}!{a1}) exceeds grid limits")
+        end_row = len(self._rows) if end_row is None else min(end_row, len(self._rows))
+        rows = [row[start_col - 1:end_col] for row in self._rows[start_row - 1:end_row]]
+        return _trim(rows)
+
+    # ---- Đọc ----
+
+    def get_all_values(self):
+        self.client._api_call('get_all_values')
+        with self.client._lock:
+            return _trim(self._rows)
+
+    def get_all_records(self):
+        self.client._api_call('get_all_records')
+        with self.client._lock:
+            if not self._rows:
+                return []
+            header = self._rows[0]
+            return [
+                {col: _numericise(row[i]) if i < len(row) else '' for i, col in enumerate(header)}
+                for row in self._rows[1:] if any(cell != '' for cell in row)
+            ]
+
+    def row_values(self, row):
+        self.client._api_call('row_values')
+        with self.client._lock:
+            return _trim([self._rows[row - 1]])[0] if row <= len(self._rows) else []
+
+    # ---- Ghi ----
+
+    def _append(self, rows):
+        # Ghi vào sau dòng cuối có dữ liệu
+        last = len(_trim(self._rows))
+        del self._rows[last:]
+        self._rows.extend([_cell_to_text(v) for v in row] for row in rows)
+        self.row_count = max(self.row_count, len(self._rows))
+
+    def append_row(self, values, value_input_option='RAW', **kwargs):
+        self.client._api_call('append_row')
+        with self.client._lock:
+            self._append([values])
+
+    def append_rows(self, values, value_input_option='RAW', **kwargs):
+        self.client._api_call('append_rows')
+        with self.client._lock:
+            self._append(values)
+
+    def update(self, range_name=None, values=None, **kwargs):
+        self.client._api_call('update')
+        # Chấp nhận cả thứ tự tham số cũ (range, values) và mới của gspread 6 (values, range)
+        if not isinstance(range_name, str):
+            range_name, values = values, range_name
+        with self.client._lock:
+            self._write(range_name or 'A1', values)
+
+    def batch_update(self, data, **kwargs):
+        """Ghi nhiều vùng [{'range': ..., 'values': ...}] trong một lệnh gọi"""
+        self.client._api_call('batch_update')
+        with self.client._lock:
+            for item in data:
+                self._write(item['range'], item['values'])
+
+    def _write(self, range_name, values):
+        start_row, _, start_col, _ = _parse_a1(range_name)
+        for r, row in enumerate(values or []):
+            target = start_row - 1 + r
+            while len(self._rows) <= target:
+                self._rows.append([])
+            current = self._rows[target]
+            for c, value in enumerate(row):
+                col = start_col - 1 + c
+                while len(current) <= col:
+                    current.append('')
+                current[col] = _cell_to_text(value)
+        self.row_count = max(self.row_count, len(self._rows))
+
+    def delete_rows(self, start_index, end_index=None):
+        self.client._api_call('delete_rows')
+        with self.client._lock:
+            self._delete(start_index, end_index or start_index)
+
+    def _delete(self, start_index, end_index):
+        del self._rows[start_index - 1:end_index]
+        self.row_count -= end_index - start_index + 1
+
+    def clear(self):
+        self.client._api_call('clear')
+        with self.client._lock:
+            self._rows = []
@@ -0,0 +1,609 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+
+import gspread
+import pandas as pd
+
+from storage.base import (
+    GSHEET_ATTENDANCE_COLUMNS,
+    GSHEET_EMPLOYEE_COLUMNS,
+    NUMERIC_COLUMNS,
+    RECORD_COLUMNS,
+    AttendanceStorage,
+    RecordConflictError,
+    assign_record_ids,
+    check_versions,
+    month_of,
+    new_record_id,
+    stamp_record,
+)
+from storage.hours import calculate_ot_column
+
+# Các sheet không phải dữ liệu tháng
+SKIPPED_SHEETS = ['Sheet1', 'Template']
+
+
+# Vùng A1 của sheet, ví dụ "'2025-12'!A:G" (cả sheet), "'2025-12'!A5:G" (từ dòng 5), "'2025-12'!A1:G1"
+def sheet_range(title, columns, start_row=None, end_row=None, first_col='A'):
+    last_col = chr(ord(first_col) + len(columns) - 1)
+    quoted = "'" + title.replace("'", "''") + "'"
+    if start_row is None:
+        return f"{quoted}!{first_col}:{last_col}"
+    return f"{quoted}!{first_col}{start_row}:{last_col}{end_row or ''}"
+
+
+def column_letter(columns, name):
+    return chr(ord('A') + columns.index(name))
+
+
+def _version_of(value):
+    # Ô phiên bản đọc từ sheet (chuỗi đã định dạng); ô trống coi như phiên bản 1
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+class WriteBuffer:
+    """Hàng đợi ghi dùng chung trong process: gom các dòng theo sheet tháng rồi ghi một lần.
+
+    Luồng nền ghi khi đủ batch_size dòng hoặc sau flush_interval giây. Dòng ghi lỗi được
+    giữ lại để thử lại ở lần sau; các dòng đang chờ vẫn đọc được qua pending().
+    """
+
+    def __init__(self, write_rows, batch_size=50, flush_interval=5.0):
+        self._write_rows = write_rows  # write_rows(tháng, danh sách dòng)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = {}      # tháng -> dòng chưa ghi
+        self._inflight = {}  # tháng -> dòng đang ghi
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.last_error = None
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self.count():
+                self.flush()
+
+    def add(self, month_year, row):
+        with self._lock:
+            self._rows.setdefault(month_year, []).append(row)
+            queued = sum(len(rows) for rows in self._rows.values())
+        if queued >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self, month_year=None):
+        """Các dòng chưa ghi xong (của một tháng, hoặc tất cả)"""
+        with self._lock:
+            if month_year is not None:
+                return self._inflight.get(month_year, []) + self._rows.get(month_year, [])
+            months = list(self._inflight) + [m for m in self._rows if m not in self._inflight]
+            return [row for m in months for row in self._inflight.get(m, []) + self._rows.get(m, [])]
+
+    def count(self):
+        with self._lock:
+            return sum(len(rows) for rows in self._inflight.values()) + sum(len(rows) for rows in self._rows.values())
+
+    def flush(self):
+        """Ghi tất cả các dòng đang chờ (mỗi tháng một lần append_rows), trả về số dòng đã ghi"""
+        with self._flush_lock:
+            with self._lock:
+                self._inflight, self._rows = self._rows, {}
+            written = 0
+            for month_year in list(self._inflight):
+                rows = self._inflight[month_year]
+                try:
+                    self._write_rows(month_year, rows)
+                    written += len(rows)
+                    with self._lock:
+                        del self._inflight[month_year]
+                except Exception as e:
+                    self.last_error = e
+                    # Giữ lại để thử lại, đặt trước các dòng mới để đúng thứ tự
+                    with self._lock:
+                        self._rows[month_year] = self._inflight.pop(month_year) + self._rows.get(month_year, [])
+            return written
+
+
+class SheetRegistry:
+    """Handle Spreadsheet/Worksheet dùng chung trong process, tránh gọi open_by_key/worksheet(s)
+    (mỗi lần là một request metadata) ở mỗi lần chạy lại.
+
+    Handle được tạo khi dùng lần đầu; danh sách worksheet được tải lại sau refresh_seconds
+    hoặc khi không tìm thấy worksheet theo tên.
+    """
+
+    def __init__(self, client, refresh_seconds=600):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._spreadsheets = {}  # id -> Spreadsheet
+        self._worksheets = {}    # id -> (thời điểm tải, {tên: Worksheet} theo thứ tự trên file)
+
+    def spreadsheet(self, key):
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = self.client.open_by_key(key)
+            return self._spreadsheets[key]
+
+    def worksheets(self, key, refresh=False):
+        """Tất cả worksheet của một file theo thứ tự trên file"""
+        with self._lock:
+            loaded_at, by_title = self._worksheets.get(key, (None, None))
+            if refresh or loaded_at is None or time.monotonic() - loaded_at >= self.refresh_seconds:
+                by_title = {ws.title: ws for ws in self.spreadsheet(key).worksheets()}
+                self._worksheets[key] = (time.monotonic(), by_title)
+            return list(by_title.values())
+
+    def worksheet(self, key, title):
+        with self._lock:
+            worksheet = {ws.title: ws for ws in self.worksheets(key)}.get(title)
+            if worksheet is None:
+                # Có thể sheet vừa được tạo ở nơi khác: tải lại danh sách một lần
+                worksheet = {ws.title: ws for ws in self.worksheets(key, refresh=True)}.get(title)
+            if worksheet is None:
+                raise gspread.exceptions.WorksheetNotFound(title)
+            return worksheet
+
+    def first_worksheet(self, key):
+        """Tương đương spreadsheet.sheet1"""
+        worksheets = self.worksheets(key)
+        if not worksheets:
+            raise gspread.exceptions.WorksheetNotFound('sheet1')
+        return worksheets[0]
+
+    def ensure_worksheet(self, key, title, rows, cols, setup=None):
+        """Lấy worksheet theo tên, tạo mới (và gọi setup(worksheet)) nếu chưa có"""
+        with self._lock:
+            try:
+                return self.worksheet(key, title)
+            except gspread.exceptions.WorksheetNotFound:
+                worksheet = self.spreadsheet(key).add_worksheet(title=title, rows=rows, cols=cols)
+                if setup is not None:
+                    setup(worksheet)
+                self._worksheets[key][1][title] = worksheet
+                return worksheet
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+            else:
+                self._spreadsheets.pop(key, None)
+                self._worksheets.pop(key, None)
+
+
+class GSheetStorage(AttendanceStorage):
+    """Chấm công trên Google Sheets (mỗi tháng một worksheet), nhân viên ở sheet1 của file riêng.
+
+    Khi buffer_writes=True, chấm công mới được đưa vào WriteBuffer và trả về ngay với
+    trạng thái 'pending'; các dòng đang chờ vẫn xuất hiện khi đọc dữ liệu.
+
+    Sửa/xóa theo ID: vị trí dòng của mỗi ID được ghi nhớ khi đọc sheet, nên chỉ cần đọc
+    lại một dòng để kiểm tra phiên bản rồi ghi đúng dòng đó. Đọc dữ liệu không ghi gì lên sheet:
+    dòng chưa có ID (sheet cũ, dòng nhập trực tiếp trên sheet) chỉ nhận ID tạm khi đọc; ID thật
+    được ghi bởi _migrate_record_ids khi khởi tạo, sau fix_sheet_headers, hoặc trước lần sửa/xóa
+    tiếp theo (dưới khóa ghi, cùng với các thao tác làm dịch chuyển dòng).
+    """
+
+    name = 'gsheet'
+
+    def __init__(self, client, attendance_sheet_id, employees_sheet_id,
+                 attendance_columns=GSHEET_ATTENDANCE_COLUMNS, employee_columns=GSHEET_EMPLOYEE_COLUMNS,
+                 buffer_writes=True, batch_size=50, flush_interval=5.0):
+        super().__init__(attendance_columns, employee_columns)
+        self.client = client
+        self.sheets = SheetRegistry(client)
+        self.attendance_sheet_id = attendance_sheet_id
+        self.employees_sheet_id = employees_sheet_id
+        self.write_buffer = WriteBuffer(self._append_rows, batch_size, flush_interval) if buffer_writes else None
+        self.data_columns = [c for c in self.attendance_columns if c not in RECORD_COLUMNS]
+        self._row_index = {}  # tháng -> {ID: dòng trên sheet}
+        self._employee_header = False  # sheet nhân viên đã có dòng tiêu đề
+        self._index_lock = threading.Lock()
+        # Sửa / xóa / ghi đè / gán ID: không chạy đồng thời để vị trí dòng không bị dịch giữa chừng
+        self._write_lock = threading.RLock()
+        self._unmigrated = set()  # tháng có dòng chưa có ID (thấy khi đọc)
+        try:
+            self._migrate_record_ids()
+        except gspread.exceptions.APIError:
+            # Không ghi được (ví dụ hết quota): lần đọc sau ghi nhớ tháng, gán ID trước lần sửa/xóa tiếp theo
+            pass
+
+    def _migrate_record_ids(self, month_years=None):
+        """Gán ID + phiên bản 1 cho các dòng chưa có và ghi lên sheet (một lần đọc cho tất cả các tháng,
+        mỗi tháng một batch_update chỉ ghi các ô còn trống); trả về số dòng đã gán"""
+        with self._write_lock:
+            self.flush()
+            existing = self.attendance_months()
+            months = existing if month_years is None else [m for m in month_years if m in existing]
+            if not months:
+                return 0
+            response = self.sheets.spreadsheet(self.attendance_sheet_id).values_batch_get(
+                [sheet_range(m, self.attendance_columns) for m in months]
+            )
+            id_position = self.attendance_columns.index('ID')
+            id_col = column_letter(self.attendance_columns, 'ID')
+            version_col = column_letter(self.attendance_columns, 'Phiên bản')
+            assigned = 0
+            for m, value_range in zip(months, response.get('valueRanges', [])):
+                values = value_range.get('values', [])
+                self._unmigrated.discard(m)
+                # Chỉ ghi khi header đúng thứ tự cột dữ liệu (sheet cũ 6 cột cần fix_sheet_headers trước)
+                if len(values) < 2 or values[0][:len(self.data_columns)] != self.data_columns:
+                    continue
+                data = []
+                if values[0][len(self.data_columns):] != RECORD_COLUMNS:
+                    data.append({'range': f'{id_col}1:{version_col}1', 'values': [RECORD_COLUMNS]})
+                for row, cells in enumerate(values[1:], start=2):
+                    cells = [str(c).strip() for c in cells[id_position:id_position + 2]] + ['', '']
+                    if not cells[0] or not cells[1]:
+                        data.append({'range': f'{id_col}{row}:{version_col}{row}',
+                                     'values': [[cells[0] or new_record_id(), _version_of(cells[1])]]})
+                        assigned += 1
+                if data:
+                    self._month_worksheet(m).batch_update(data)
+                    with self._index_lock:
+                        self._row_index.pop(m, None)
+            return assigned
+
+    def _with_ot(self, df):
+        # Đảm bảo có cột OT, nếu không thì thêm = 0
+        if 'OT' in self.attendance_columns and 'OT' not in df.columns:
+            df['OT'] = 0
+        return df
+
+    # ---- Nhân viên ----
+
+    def load_employees(self):
+        sheet = self.sheets.first_worksheet(self.employees_sheet_id)
+        data = sheet.get_all_records()
+        if data:
+            return pd.DataFrame(data)
+        return self.empty_employees()
+
+    def _employee_rows(self, sheet, rows):
+        # Sheet trống thì thêm dòng tiêu đề (chỉ đọc dòng 1, một lần cho mỗi process)
+        if not self._employee_header:
+            self._employee_header = sheet.row_count > 0 and len(sheet.row_values(1)) > 0
+        if not self._employee_header:
+            rows = [self.employee_columns] + rows
+            self._employee_header = True
+        return rows
+
+    def add_employee(self, record):
+        sheet = self.sheets.first_worksheet(self.employees_sheet_id)
+        sheet.append_rows(self._employee_rows(sheet, [[record.get(c) for c in self.employee_columns]]))
+        return True
+
+    def append_employees(self, df):
+        if len(df) == 0:
+            return 0
+        sheet = self.sheets.first_worksheet(self.employees_sheet_id)
+        rows = df.reindex(columns=self.employee_columns)
+        sheet.append_rows(self._employee_rows(sheet, rows.astype(object).where(pd.notna(rows), '').values.tolist()))
+        return len(df)
+
+    def delete_employee(self, index):
+        sheet = self.sheets.first_worksheet(self.employees_sheet_id)
+        # index + 1 vì row 1 là header, +1 nữa vì row bắt đầu từ 1
+        sheet.delete_rows(index + 2)
+
+    # ---- Chấm công ----
+
+    def _with_pending(self, df, month_year=None):
+        # Gộp các dòng chưa ghi lên Google Sheets
+        if self.write_buffer is None:
+            return df
+        pending = self.write_buffer.pending(month_year)
+        if not pending:
+            return df
+        pending_df = pd.DataFrame(pending, columns=self.attendance_columns)
+        if len(df) == 0:
+            return pending_df
+        return pd.concat([df, pending_df], ignore_index=True)
+
+    def _values_to_frame(self, values):
+        """Chuyển giá trị thô của một sheet (dòng đầu là header) thành DataFrame"""
+        if len(values) < 2:
+            return self.empty_attendance()
+        header = values[0]
+        # API bỏ các ô trống ở cuối dòng: DataFrame tự điền, sau đó cắt theo số cột header
+        df = pd.DataFrame(values[1:]).reindex(columns=range(len(header)))
+        df.columns = header
+        df = df.fillna('')
+        for col in NUMERIC_COLUMNS.intersection(df.columns):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        return self._with_ot(df)
+
+    def _month_frame(self, month_year, values, first_row=2):
+        """DataFrame của sheet tháng từ header + các dòng bắt đầu ở dòng first_row trên sheet (chỉ đọc).
+
+        Dòng chưa có ID nhận ID tạm (không ghi lên sheet, ghi nhớ tháng để gán ID thật trước lần
+        sửa/xóa tiếp theo); vị trí dòng theo ID được ghi nhớ.
+        """
+        df = self._values_to_frame(values)
+        if len(df) == 0:
+            return df
+        df, assigned = assign_record_ids(df)
+        if assigned > 0:
+            self._unmigrated.add(month_year)
+        with self._index_lock:
+            rows = dict(zip(df['ID'], range(first_row, first_row + len(df))))
+            if first_row == 2:
+                self._row_index[month_year] = rows
+            else:
+                self._row_index.setdefault(month_year, {}).update(rows)
+        return df
+
+    def load_attendance_by_month(self, month_year):
+        df = self.empty_attendance()
+        try:
+            worksheet = self.sheets.worksheet(self.attendance_sheet_id, month_year)
+            df = self._month_frame(month_year, worksheet.get_all_values())
+        except gspread.exceptions.WorksheetNotFound:
+            pass
+        return self._with_pending(df, month_year)
+
+    def load_attendance(self):
+        """Đọc tất cả các sheet tháng bằng một request values_batch_get"""
+        months = self.attendance_months()
+        frames = []
+        if months:
+            response = self.sheets.spreadsheet(self.attendance_sheet_id).values_batch_get(
+                [sheet_range(m, self.attendance_columns) for m in months]
+            )
+            for m, value_range in zip(months, response.get('valueRanges', [])):
+                frame = self._month_frame(m, value_range.get('values', []))
+                if len(frame) > 0:
+                    frames.append(frame)
+        df = pd.concat(frames, ignore_index=True) if frames else self.empty_attendance()
+        return self._with_pending(df)
+
+    def attendance_months(self):
+        """Các sheet tháng hiện có trên Google Sheets (không tính dòng đang chờ ghi)"""
+        return [ws.title for ws in self.sheets.worksheets(self.attendance_sheet_id) if ws.title not in SKIPPED_SHEETS]
+
+    def fetch_month_rows(self, start_rows):
+        """Đọc header và các dòng từ dòng start_rows[tháng] trở đi (dòng trên sheet, dữ liệu bắt đầu
+        từ dòng 2) của nhiều sheet tháng bằng một request values_batch_get; trả về {tháng: DataFrame}"""
+        if not start_rows:
+            return {}
+        months = list(start_rows)
+        ranges = []
+        for m in months:
+            ranges.append(sheet_range(m, self.attendance_columns, 1, 1))
+            ranges.append(sheet_range(m, self.attendance_columns, start_rows[m]))
+        spreadsheet = self.sheets.spreadsheet(self.attendance_sheet_id)
+        value_ranges = spreadsheet.values_batch_get(ranges).get('valueRanges', [])
+        frames = {}
+        for i, m in enumerate(months):
+            header = value_ranges[2 * i].get('values', []) if 2 * i < len(value_ranges) else []
+            rows = value_ranges[2 * i + 1].get('values', []) if 2 * i + 1 < len(value_ranges) else []
+            frames[m] = self._month_frame(m, header[:1] + rows, start_rows[m]) if header else self.empty_attendance()
+        return frames
+
+    def load_attendance_months(self, month_years):
+        """Đọc nhiều sheet tháng bằng một request values_batch_get"""
+        existing = set(self.attendance_months())
+        frames = self.fetch_month_rows({m: 2 for m in month_years if m in existing})
+        return {m: self._with_pending(frames.get(m, self.empty_attendance()), m) for m in month_years}
+
+    def get_available_months(self):
+        months = self.attendance_months()
+        if self.write_buffer is not None:
+            months += [m for m in {month_of(row[self.attendance_columns.index('Ngày')])
+                                   for row in self.write_buffer.pending()} if m not in months]
+        return months
+
+    def _month_worksheet(self, month_year, create=False):
+        if not create:
+            return self.sheets.worksheet(self.attendance_sheet_id, month_year)
+        # Tạo sheet mới + header nếu chưa có
+        return self.sheets.ensure_worksheet(
+            self.attendance_sheet_id, month_year, rows="1000", cols=str(len(self.attendance_columns)),
+            setup=lambda worksheet: worksheet.append_row(self.attendance_columns)
+        )
+
+    def _append_rows(self, month_year, rows):
+        worksheet = self._month_worksheet(month_year, create=True)
+        worksheet.append_rows(rows)
+
+    def save_attendance(self, record):
+        """Lưu một bản ghi; trả về 'pending' nếu bản ghi đang chờ ghi theo lô"""
+        datetime.strptime(record['Ngày'], "%Y-%m-%d")
+        stamp_record(record)
+        row = [record.get(c) for c in self.attendance_columns]
+        if self.write_buffer is not None:
+            self.write_buffer.add(month_of(record['Ngày']), row)
+            return 'pending'
+        worksheet = self._month_worksheet(month_of(record['Ngày']), create=True)
+        worksheet.append_row(row)
+
+    def pending_writes(self):
+        return self.write_buffer.count() if self.write_buffer is not None else 0
+
+    def flush(self):
+        return self.write_buffer.flush() if self.write_buffer is not None else 0
+
+    def _locate(self, month_year, record_id, version):
+        """Dòng trên sheet của bản ghi record_id nếu phiên bản khớp: (worksheet, dòng, phiên bản)"""
+        worksheet = self._month_worksheet(month_year)
+        id_position = self.attendance_columns.index('ID')
+        row = self._row_index.get(month_year, {}).get(record_id)
+        current = None
+        if row is not None:
+            # Kiểm tra lại đúng dòng đã ghi nhớ (một request đọc)
+            values = worksheet.row_values(row)
+            if len(values) > id_position and values[id_position] == record_id:
+                current = _version_of(values[id_position + 1] if len(values) > id_position + 1 else '')
+        if current is None:
+            # Vị trí đã cũ (dòng được thêm/xóa ở nơi khác): đọc lại cột ID + phiên bản của sheet
+            rows = self._read_record_rows(month_year)
+            if record_id not in rows:
+                raise RecordConflictError(f"Bản ghi {record_id} không còn trong tháng {month_year}")
+            row, current = rows[record_id]
+        if current != int(version):
+            raise RecordConflictError(f"Bản ghi {record_id} đã được sửa (phiên bản hiện tại {current})")
+        return worksheet, row, current
+
+    def _read_record_rows(self, month_year):
+        """Đọc cột ID + phiên bản của sheet tháng (một request), trả về {ID: (dòng trên sheet, phiên bản)}"""
+        response = self.sheets.spreadsheet(self.attendance_sheet_id).values_batch_get(
+            [sheet_range(month_year, RECORD_COLUMNS, 2, first_col=column_letter(self.attendance_columns, 'ID'))]
+        )
+        values = response.get('valueRanges', [{}])[0].get('values', [])
+        rows = {cells[0]: (i + 2, _version_of(cells[1] if len(cells) > 1 else '')) for i, cells in enumerate(values) if cells}
+        with self._index_lock:
+            self._row_index[month_year] = {record_id: row for record_id, (row, _) in rows.items()}
+        return rows
+
+    def _prepare_write(self, month_year):
+        # Gọi khi đang giữ khóa ghi: gán ID thật cho tháng có dòng chưa có ID, rồi ghi các dòng đang chờ
+        # để bản ghi vừa chấm công đã có dòng trên sheet
+        if month_year in self._unmigrated:
+            self._migrate_record_ids([month_year])
+        self.flush()
+
+    def update_attendance_record(self, month_year, record_id, record, version):
+        with self._write_lock:
+            self._prepare_write(month_year)
+            worksheet, row, current = self._locate(month_year, record_id, version)
+            stamp_record(record, record_id, current + 1)
+            last_col = chr(ord('A') + len(self.attendance_columns) - 1)
+            worksheet.update(f'A{row}:{last_col}{row}', [[record.get(c) for c in self.attendance_columns]])
+
+    def delete_attendance_record(self, month_year, record_id, version):
+        with self._write_lock:
+            self._prepare_write(month_year)
+            worksheet, row, _ = self._locate(month_year, record_id, version)
+            worksheet.delete_rows(row)
+            # Các dòng phía sau dịch lên một dòng
+            with self._index_lock:
+                rows = self._row_index.get(month_year, {})
+                rows.pop(record_id, None)
+                for key, r in rows.items():
+                    if r > row:
+                        rows[key] = r - 1
+
+    def apply_attendance_changes(self, month_year, updates=(), deletes=()):
+        """Sửa/xóa nhiều bản ghi: đọc cột ID + phiên bản một lần, ghi các dòng sửa bằng một batch_update
+        và xóa tất cả các dòng bị xóa bằng một request"""
+        with self._write_lock:
+            self._prepare_write(month_year)
+            worksheet = self._month_worksheet(month_year)
+            rows = self._read_record_rows(month_year)
+            check_versions(
+                pd.DataFrame({'ID': list(rows), 'Phiên bản': [version for _, version in rows.values()]}),
+                month_year, [(i, v) for i, _, v in updates] + list(deletes)
+            )
+            if updates:
+                last_col = chr(ord('A') + len(self.attendance_columns) - 1)
+                data = []
+                for record_id, record, version in updates:
+                    stamp_record(record, record_id, int(version) + 1)
+                    row = rows[str(record_id)][0]
+                    data.append({'range': f'A{row}:{last_col}{row}',
+                                 'values': [[record.get(c) for c in self.attendance_columns]]})
+                worksheet.batch_update(data)
+            if deletes:
+                deleted = sorted(rows[str(record_id)][0] for record_id, _ in deletes)
+                # Xóa từ dưới lên (các dòng liền nhau gộp thành một khoảng) để vị trí các dòng phía trên không đổi
+                requests = []
+                for row in reversed(deleted):
+                    if requests and requests[-1]['deleteDimension']['range']['startIndex'] == row:
+                        requests[-1]['deleteDimension']['range']['startIndex'] = row - 1
+                    else:
+                        requests.append({'deleteDimension': {'range': {
+                            'sheetId': worksheet.id, 'dimension': 'ROWS', 'startIndex': row - 1, 'endIndex': row,
+                        }}})
+                self.sheets.spreadsheet(self.attendance_sheet_id).batch_update({'requests': requests})
+                removed = {str(record_id) for record_id, _ in deletes}
+                with self._index_lock:
+                    self._row_index[month_year] = {
+                        record_id: row - bisect.bisect_left(deleted, row)
+                        for record_id, (row, _) in rows.items() if record_id not in removed
+                    }
+
+    def replace_attendance_month(self, month_year, df):
+        # Ghi các dòng đang chờ trước, sau đó cả sheet được ghi đè (các dòng đó đã có trong df)
+        with self._write_lock:
+            self.flush()
+            worksheet = self._month_worksheet(month_year, create=True)
+            rows, _ = assign_record_ids(df.reindex(columns=self.attendance_columns))
+            values = [self.attendance_columns] + rows.astype(object).where(pd.notna(rows), '').values.tolist()
+            last_col = chr(ord('A') + len(self.attendance_columns) - 1)
+            worksheet.clear()
+            worksheet.update(f'A1:{last_col}{len(values)}', values)
+            self._unmigrated.discard(month_year)
+            with self._index_lock:
+                self._row_index[month_year] = dict(zip(rows['ID'], range(2, len(rows) + 2)))
+
+    def append_attendance_months(self, frames):
+        # Ghi các dòng đang chờ trước để giữ đúng thứ tự, sau đó mỗi tháng một lần append_rows
+        with self._write_lock:
+            self.flush()
+            for month_year, df in frames.items():
+                rows, _ = assign_record_ids(df.reindex(columns=self.attendance_columns))
+                self._append_rows(month_year, rows.astype(object).where(pd.notna(rows), '').values.tolist())
+
+    # ---- Bảo trì / thông tin ----
+
+    def fix_sheet_headers(self):
+        """Sửa header cho tất cả các sheet cũ, trả về danh sách sheet đã sửa"""
+        expected_header = self.attendance_columns
+        legacy_header = [c for c in self.data_columns if c != 'OT']
+        last_col = chr(ord('A') + len(expected_header) - 1)
+
+        # Ghi đè cả sheet: giữ khóa ghi như replace_attendance_month
+        with self._write_lock:
+            fixed_sheets = []
+            for ws in self.sheets.worksheets(self.attendance_sheet_id, refresh=True):
+                if ws.title in SKIPPED_SHEETS:
+                    continue
+                header = ws.row_values(1)
+                if header == expected_header:
+                    continue
+                # Sheet cũ chỉ có 6 cột: thêm cột OT
+                if header == legacy_header:
+                    all_data = ws.get_all_values()
+                    if len(all_data) > 1:  # Có dữ liệu
+                        rows = [row for row in all_data[1:] if len(row) >= 6]  # Bỏ qua header cũ
+                        # Tính OT cho cả cột Tổng giờ (ô trống / không phải số: OT = 0)
+                        ots = calculate_ot_column([row[4] for row in rows]).tolist()
+                        new_data = [expected_header] + [
+                            row[:5] + [ot, row[5], new_record_id(), 1] for row, ot in zip(rows, ots)
+                        ]
+                        # Xóa tất cả dữ liệu cũ và ghi dữ liệu mới (nhanh hơn update từng dòng)
+                        ws.clear()
+                        ws.update(f'A1:{last_col}{len(new_data)}', new_data)
+                        fixed_sheets.append(ws.title)
+                else:
+                    # Chỉ cập nhật header (ID của các dòng được gán ngay sau đây)
+                    ws.update(f'A1:{last_col}1', [expected_header])
+                    fixed_sheets.append(ws.title)
+            if fixed_sheets:
+                self._migrate_record_ids(fixed_sheets)
+        return fixed_sheets
+
+    def attendance_title(self):
+        return self.sheets.spreadsheet(self.attendance_sheet_id).title
+
+    def employees_title(self):
+        return self.sheets.spreadsheet(self.employees_sheet_id).title
+
+    def month_row_counts(self):
+        """Số dòng (theo kích thước worksheet lúc tải danh sách sheet) của từng sheet tháng"""
+        return {ws.title: ws.row_count - 1 for ws in self.sheets.worksheets(self.attendance_sheet_id)
+                if ws.title not in SKIPPED_SHEETS}
+
+    def location(self):
+        return f"https://docs.google.com/spreadsheets/d/{self.attendance_sheet_id}"
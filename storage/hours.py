@@ -0,0 +1,134 @@
+"""Tính tổng giờ / OT cho cả cột (NumPy), dùng khi tính lại hàng loạt
+
+Kết quả giống hệt calculate_hours / calculate_ot trong app.py và app_gsheet.py (vẫn dùng
+cho từng lần chấm công): giờ "HH:MM" được đổi sang số phút nguyên, mỗi giá trị khác nhau
+chỉ phân tích một lần.
+"""
+import re
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+# Giờ nghỉ trưa được trừ và số giờ chuẩn mỗi ngày (vượt quá tính OT)
+LUNCH_BREAK_HOURS = 1.0
+STANDARD_HOURS = 8
+
+# Cùng quy tắc với datetime.strptime(value, "%H:%M")
+_TIME_PATTERN = re.compile(r'(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)')
+
+
+def _minutes_of(value):
+    if isinstance(value, str):
+        match = _TIME_PATTERN.fullmatch(value)
+        return int(match.group(1)) * 60 + int(match.group(2)) if match else np.nan
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    return np.nan
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip()) or (
+        not isinstance(value, (str, time)) and pd.isna(value))
+
+
+def _parse_times(values):
+    """Cột giờ -> (số phút dạng float, ô trống); ô sai định dạng có số phút NaN"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).reset_index(drop=True))
+    # Mã -1 (NaN/None) lấy phần tử cuối
+    minutes = np.array([_minutes_of(v) for v in uniques] + [np.nan], dtype=float)
+    blank = np.array([_is_blank(v) for v in uniques] + [True], dtype=bool)
+    return minutes[codes], blank[codes]
+
+
+def time_to_minutes(values):
+    """Cột giờ "HH:MM" -> số phút từ 0:00 (NaN nếu trống hoặc sai định dạng)"""
+    return _parse_times(values)[0]
+
+
+def round2(values):
+    """Làm tròn 2 chữ số thập phân giống hệt round(x, 2) của Python"""
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, 2)
+    # np.round nhân 100 rồi làm tròn nên có thể khác round() ở các giá trị sát nửa đơn vị
+    scaled = values * 100
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        positions = np.flatnonzero(near_half)
+        rounded[positions] = [round(float(v), 2) for v in values[positions]]
+    return rounded
+
+
+def calculate_hours_column(time_in, time_out, lunch_break_hours=LUNCH_BREAK_HOURS):
+    """Tổng giờ của cả cột (trừ giờ nghỉ trưa, không âm, 2 chữ số thập phân).
+
+    Thiếu giờ vào hoặc giờ ra (ca chưa ra) cho 0 như calculate_hours; giờ sai định dạng cho NaN.
+    """
+    start, start_blank = _parse_times(time_in)
+    end, end_blank = _parse_times(time_out)
+    minutes = end - start
+    # Giờ ra trước giờ vào: ca qua đêm, giờ ra thuộc ngày hôm sau
+    with np.errstate(invalid='ignore'):
+        minutes = np.where(minutes < 0, minutes + 24 * 60, minutes)
+    # (phút / 60) bằng đúng (giây / 3600) của timedelta.total_seconds() trong calculate_hours
+    hours = round2(np.maximum(minutes / 60 - lunch_break_hours, 0))
+    return np.where(start_blank | end_blank, 0.0, hours)
+
+
+def calculate_ot_column(total_hours, standard_hours=STANDARD_HOURS):
+    """Giờ OT của cả cột: phần vượt quá standard_hours, ô không phải số cho 0 như calculate_ot"""
+    total = pd.to_numeric(pd.Series(total_hours, dtype=object), errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        return np.where(total > standard_hours, round2(total - standard_hours), 0.0)
+
+
+def recompute_hours(df, lunch_break_hours=LUNCH_BREAK_HOURS, standard_hours=STANDARD_HOURS):
+    """Tính lại Tổng giờ (và OT nếu có cột OT) từ Giờ vào / Giờ ra, trả về bản sao.
+
+    Dòng có giờ sai định dạng giữ nguyên Tổng giờ cũ.
+    """
+    df = df.copy()
+    if len(df) == 0:
+        return df
+    hours = calculate_hours_column(df['Giờ vào'], df['Giờ ra'], lunch_break_hours)
+    old_hours = pd.to_numeric(df['Tổng giờ'], errors='coerce').to_numpy(dtype=float)
+    hours = np.where(np.isnan(hours), old_hours, hours)
+    df['Tổng giờ'] = hours
+    if 'OT' in df.columns:
+        df['OT'] = calculate_ot_column(hours, standard_hours)
+    return df
+
+
+def changed_mask(before, after, columns=('Tổng giờ', 'OT')):
+    """Mảng bool: dòng có giá trị số khác nhau ở các cột columns"""
+    changed = np.zeros(len(before), dtype=bool)
+    for col in columns:
+        if col not in before.columns or col not in after.columns:
+            continue
+        a = pd.to_numeric(before[col], errors='coerce').to_numpy(dtype=float)
+        b = pd.to_numeric(after[col], errors='coerce').to_numpy(dtype=float)
+        changed |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return changed
+
+
+def changed_rows(before, after, columns=('Tổng giờ', 'OT')):
+    """Số dòng có giá trị số khác nhau ở các cột columns"""
+    return int(changed_mask(before, after, columns).sum())
+
+
+def recompute_months(storage, month_years, lunch_break_hours=LUNCH_BREAK_HOURS, standard_hours=STANDARD_HOURS):
+    """Tính lại các tháng (đọc gộp một lần), chỉ ghi lại tháng có thay đổi; trả về {tháng: số dòng đổi}.
+
+    Dòng bị đổi được tăng phiên bản để các thao tác sửa/xóa dựa trên bản đọc cũ bị từ chối.
+    """
+    results = {}
+    for month_year, df in storage.load_attendance_months(list(month_years)).items():
+        updated = recompute_hours(df, lunch_break_hours, standard_hours)
+        changed = changed_mask(df, updated)
+        results[month_year] = int(changed.sum())
+        if results[month_year] > 0:
+            if 'Phiên bản' in updated.columns:
+                versions = pd.to_numeric(updated['Phiên bản'], errors='coerce').fillna(1).astype(int)
+                updated['Phiên bản'] = np.where(changed, versions + 1, versions)
+            storage.replace_attendance_month(month_year, updated)
+    return results
@@ -0,0 +1,255 @@
+"""Nhập chấm công hàng loạt từ file CSV/XLSX (ví dụ file xuất từ máy chấm công)
+
+File được đọc theo từng khối (chunk), mỗi khối được kiểm tra, ghép nhân viên theo Mã NV
+hoặc Tên NV và tính Tổng giờ/OT cho cả cột; các dòng hợp lệ được gom theo tháng rồi ghi
+một lần cho mỗi tháng bằng storage.append_attendance_months().
+
+Danh sách nhân viên cũng được nhập theo cách đó: kiểm tra trùng mã bằng một tập mã trong
+bộ nhớ, tất cả nhân viên mới được ghi bằng một lần storage.append_employees().
+"""
+import os
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from storage.base import NUMERIC_COLUMNS
+from storage.hours import LUNCH_BREAK_HOURS, STANDARD_HOURS, calculate_hours_column, calculate_ot_column
+
+# Cột lỗi thêm vào các dòng không hợp lệ
+ERROR_COLUMN = 'Lỗi'
+
+
+def _cell_to_text(value):
+    # Ô Excel -> chuỗi giống khi đọc từ CSV
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.time() == time(0):
+            return value.strftime('%Y-%m-%d')
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _read_csv_chunks(file, chunksize):
+    size = _file_size(file)
+    for chunk in pd.read_csv(file, dtype=str, chunksize=chunksize, encoding='utf-8-sig',
+                             skipinitialspace=True, keep_default_na=False):
+        yield chunk, (file.tell() / size if size else None)
+
+
+def _read_xlsx_chunks(file, chunksize):
+    # read_only: duyệt từng dòng, không nạp cả workbook vào bộ nhớ
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = ws.max_row
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else '' for h in header]
+        width = len(header)
+        batch, read = [], 1
+        for row in rows:
+            read += 1
+            batch.append([_cell_to_text(v) for v in row[:width]] + [None] * (width - len(row)))
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=header), (read / total if total else None)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header), 1.0
+    finally:
+        wb.close()
+
+
+def _file_size(file):
+    try:
+        position = file.tell()
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def read_chunks(file, filename, chunksize=5000):
+    """Đọc file CSV/XLSX theo khối: sinh ra (DataFrame chuỗi, tỉ lệ đã đọc 0..1 hoặc None)"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return _read_csv_chunks(file, chunksize)
+    if extension in ('.xlsx', '.xlsm'):
+        return _read_xlsx_chunks(file, chunksize)
+    raise ValueError(f"Định dạng file không hỗ trợ: {extension or filename} (chỉ nhận .csv, .xlsx)")
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].fillna('').astype(str).str.strip()
+
+
+def normalize_dates(values):
+    """Ngày "YYYY-MM-DD" hoặc "DD/MM/YYYY" -> "YYYY-MM-DD" (None nếu không hợp lệ)"""
+    values = pd.Series(values, dtype=object).fillna('').astype(str).str.strip().str[:10]
+    parsed = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+    missing = parsed.isna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], format='%d/%m/%Y', errors='coerce')
+    return parsed.dt.strftime('%Y-%m-%d').where(parsed.notna(), None)
+
+
+def normalize_times(values):
+    """Giờ "H:MM" hoặc "HH:MM:SS" -> "HH:MM"; ô trống -> "", sai định dạng -> None"""
+    values = pd.Series(values, dtype=object).fillna('').astype(str).str.strip()
+    parts = values.str.extract(r'^(\d{1,2}):(\d{2})(?::\d{2})?$')
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce')
+    valid = (hours < 24) & (minutes < 60)
+    text = hours.fillna(0).astype(int).map('{:02d}'.format) + ':' + minutes.fillna(0).astype(int).map('{:02d}'.format)
+    return text.where(valid, np.where(values == '', '', None))
+
+
+def prepare_chunk(chunk, employees, attendance_columns,
+                  lunch_break_hours=LUNCH_BREAK_HOURS, standard_hours=STANDARD_HOURS):
+    """Kiểm tra và chuẩn hóa một khối dữ liệu, trả về (dòng hợp lệ theo attendance_columns, dòng lỗi)"""
+    chunk = chunk.rename(columns=lambda c: str(c).strip())
+    keys = [c for c in ('Mã NV', 'Tên NV') if c in employees.columns and c in attendance_columns]
+    if not any(c in chunk.columns for c in keys):
+        raise ValueError(f"File thiếu cột nhân viên ({' hoặc '.join(keys)})")
+    for col in ('Ngày', 'Giờ vào'):
+        if col not in chunk.columns:
+            raise ValueError(f"File thiếu cột {col}")
+
+    # Ghép nhân viên: theo Mã NV nếu có, nếu không thì theo Tên NV
+    employees = employees.dropna(subset=keys).astype({c: str for c in keys})
+    out = pd.DataFrame({col: pd.Series(None, index=chunk.index, dtype=object) for col in keys})
+    matched = pd.Series(False, index=chunk.index)
+    for key in keys:
+        values = _text(chunk, key)
+        lookup = employees.assign(_key=employees[key].str.strip()).drop_duplicates('_key').set_index('_key')
+        hit = ~matched & (values != '') & values.isin(lookup.index)
+        for col in keys:
+            out.loc[hit, col] = values[hit].map(lookup[col])
+        matched |= hit
+
+    out['Ngày'] = normalize_dates(chunk['Ngày']).values
+    out['Giờ vào'] = normalize_times(chunk['Giờ vào']).values
+    out['Giờ ra'] = normalize_times(chunk['Giờ ra']).values if 'Giờ ra' in chunk.columns else ''
+    out['Ghi chú'] = _text(chunk, 'Ghi chú').values
+
+    reasons = np.select(
+        [~matched, out['Ngày'].isna(), out['Giờ vào'].isna() | (out['Giờ vào'] == ''), out['Giờ ra'].isna()],
+        ["Không tìm thấy nhân viên", "Ngày không hợp lệ", "Giờ vào không hợp lệ", "Giờ ra không hợp lệ"],
+        default=''
+    )
+    valid = reasons == ''
+    errors = chunk[~valid].copy()
+    errors[ERROR_COLUMN] = reasons[~valid]
+
+    out = out[valid].copy()
+    out['Tổng giờ'] = calculate_hours_column(out['Giờ vào'], out['Giờ ra'], lunch_break_hours)
+    if 'OT' in attendance_columns:
+        out['OT'] = calculate_ot_column(out['Tổng giờ'], standard_hours)
+    return out.reindex(columns=attendance_columns).reset_index(drop=True), errors
+
+
+def import_attendance(storage, file, filename, employees, chunksize=5000, progress=None,
+                      lunch_break_hours=LUNCH_BREAK_HOURS, standard_hours=STANDARD_HOURS):
+    """Nhập file chấm công vào storage (mỗi tháng một lần ghi).
+
+    progress(tỉ lệ 0..1 hoặc None, số dòng đã đọc) được gọi sau mỗi khối. Trả về dict:
+    imported (số dòng đã ghi), months ({tháng: số dòng}), invalid (DataFrame dòng lỗi kèm cột Lỗi).
+    """
+    valid_frames, error_frames, rows_read = [], [], 0
+    for chunk, fraction in read_chunks(file, filename, chunksize):
+        valid, errors = prepare_chunk(chunk, employees, storage.attendance_columns,
+                                      lunch_break_hours, standard_hours)
+        valid_frames.append(valid)
+        if len(errors) > 0:
+            error_frames.append(errors)
+        rows_read += len(chunk)
+        if progress is not None:
+            progress(fraction, rows_read)
+
+    valid = pd.concat(valid_frames, ignore_index=True) if valid_frames else storage.empty_attendance()
+    frames = {month: rows.reset_index(drop=True) for month, rows in valid.groupby(valid['Ngày'].str[:7], sort=True)}
+    if frames:
+        storage.append_attendance_months(frames)
+    return {
+        'imported': len(valid),
+        'months': {month: len(rows) for month, rows in frames.items()},
+        'invalid': pd.concat(error_frames) if error_frames else pd.DataFrame(columns=[ERROR_COLUMN]),
+    }
+
+
+def prepare_employees(chunk, employee_columns, employee_key, seen):
+    """Kiểm tra một khối danh sách nhân viên.
+
+    seen: tập mã đã có (được thêm mã của các dòng mới). Trả về (nhân viên mới theo
+    employee_columns, dòng bị bỏ qua kèm cột Lỗi, số dòng trùng mã).
+    """
+    chunk = chunk.rename(columns=lambda c: str(c).strip())
+    required = list(dict.fromkeys([employee_key, 'Tên NV']))
+    for col in required:
+        if col not in chunk.columns:
+            raise ValueError(f"File thiếu cột {col}")
+
+    out = pd.DataFrame({col: _text(chunk, col) for col in employee_columns})
+    conditions = [out[col] == '' for col in required]
+    messages = [f"Thiếu {col}" for col in required]
+    for col in employee_columns:
+        if col in NUMERIC_COLUMNS:
+            out[col] = pd.to_numeric(out[col].str.replace(',', '', regex=False), errors='coerce')
+            conditions.append(out[col].isna() | (out[col] < 0))
+            messages.append(f"{col} không hợp lệ")
+    reasons = np.select(conditions, messages, default='')
+
+    # Trùng mã nhân viên đã có hoặc trùng với dòng trước trong file
+    valid = pd.Series(reasons == '', index=chunk.index)
+    keys = out[employee_key]
+    duplicate = valid & (keys.isin(seen) | keys.where(valid).duplicated())
+    reasons = np.where(duplicate, f"Trùng {employee_key}", reasons)
+    seen.update(keys[valid & ~duplicate])
+
+    rejected = chunk[reasons != ''].copy()
+    rejected[ERROR_COLUMN] = reasons[reasons != '']
+    return out[reasons == ''].reset_index(drop=True), rejected, int(duplicate.sum())
+
+
+def import_employees(storage, file, filename, existing_keys=None, chunksize=5000):
+    """Nhập danh sách nhân viên từ file CSV/XLSX (một lần ghi cho tất cả nhân viên mới).
+
+    existing_keys: các mã nhân viên đã có (mặc định đọc từ storage). Trả về dict: inserted,
+    duplicates, invalid (số dòng), rejected (DataFrame dòng bị bỏ qua kèm cột Lỗi).
+    """
+    if existing_keys is None:
+        existing_keys = storage.load_employees()[storage.employee_key].astype(str).str.strip()
+    seen = set(existing_keys)
+    new_frames, rejected_frames, duplicates = [], [], 0
+    for chunk, _ in read_chunks(file, filename, chunksize):
+        new, rejected, duplicate_count = prepare_employees(chunk, storage.employee_columns,
+                                                           storage.employee_key, seen)
+        new_frames.append(new)
+        if len(rejected) > 0:
+            rejected_frames.append(rejected)
+        duplicates += duplicate_count
+
+    new = pd.concat(new_frames, ignore_index=True) if new_frames else storage.empty_employees()
+    inserted = storage.append_employees(new) if len(new) > 0 else 0
+    rejected = pd.concat(rejected_frames) if rejected_frames else pd.DataFrame(columns=[ERROR_COLUMN])
+    return {
+        'inserted': inserted,
+        # Mã được thêm ở nơi khác trong lúc nhập: backend bỏ qua, tính là trùng
+        'duplicates': duplicates + len(new) - inserted,
+        'invalid': len(rejected) - duplicates,
+        'rejected': rejected,
+    }
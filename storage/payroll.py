@@ -0,0 +1,104 @@
+"""Bảng lương tháng từ chấm công và Tiền công/ngày (tính cho cả bảng bằng pandas/NumPy)
+
+Mỗi nhân viên: giờ thường = Tổng giờ - OT, số ngày công = giờ thường / số giờ chuẩn
+(8 giờ = 1 ngày công như phần tổng hợp ở tab Báo cáo), tiền ngày công = số ngày công ×
+Tiền công/ngày, tiền OT = giờ OT × (Tiền công/ngày / số giờ chuẩn) × hệ số OT của loại ngày
+(ngày thường, ngày nghỉ hằng tuần, ngày lễ).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from storage.hours import STANDARD_HOURS, calculate_ot_column, round2
+
+# Hệ số OT mặc định theo loại ngày
+OT_MULTIPLIERS = {'weekday': 1.5, 'weekend': 2.0, 'holiday': 3.0}
+# Ngày nghỉ hằng tuần (0 = thứ Hai ... 6 = Chủ nhật)
+WEEKEND_DAYS = (6,)
+
+PAYROLL_COLUMNS = ['Tên NV', 'Số bản ghi', 'Tổng giờ', 'Giờ thường', 'Số ngày công', 'OT',
+                   'Tiền công/ngày', 'Tiền ngày công', 'Tiền OT', 'Tổng lương', 'Ghi chú']
+
+
+def compute_payroll(attendance, employees, key='Tên NV', wage_column='Tiền công/ngày',
+                    standard_hours=STANDARD_HOURS, ot_multipliers=None, weekend_days=WEEKEND_DAYS, holidays=()):
+    """Tính lương của tất cả nhân viên từ chấm công (thường là một tháng).
+
+    Chấm công được gộp theo nhân viên bằng một lần groupby rồi ghép với bảng nhân viên một
+    lần; nhân viên không có chấm công vẫn có dòng (lương 0). Trả về DataFrame theo
+    PAYROLL_COLUMNS (cột đầu là key), sắp xếp theo key.
+    """
+    multipliers = dict(OT_MULTIPLIERS, **(ot_multipliers or {}))
+    hours = pd.to_numeric(attendance['Tổng giờ'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    if 'OT' in attendance.columns:
+        ot = pd.to_numeric(attendance['OT'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    else:
+        ot = calculate_ot_column(hours, standard_hours)
+
+    # Hệ số OT theo loại ngày của từng dòng
+    dates = pd.to_datetime(attendance['Ngày'], errors='coerce', format='%Y-%m-%d')
+    multiplier = np.select(
+        [dates.dt.strftime('%Y-%m-%d').isin(set(holidays)).to_numpy(), dates.dt.dayofweek.isin(weekend_days).to_numpy()],
+        [multipliers['holiday'], multipliers['weekend']],
+        default=multipliers['weekday']
+    )
+
+    totals = pd.DataFrame({
+        key: attendance[key].astype(str).str.strip().to_numpy(),
+        'Số bản ghi': 1,
+        'Tổng giờ': hours,
+        'Giờ thường': hours - ot,
+        'OT': ot,
+        '_weighted_ot': ot * multiplier,
+    }).groupby(key, sort=False).sum()
+
+    wages = employees[[key, wage_column]].copy() if len(employees) > 0 else pd.DataFrame(columns=[key, wage_column])
+    wages[key] = wages[key].astype(str).str.strip()
+    wages[wage_column] = pd.to_numeric(wages[wage_column], errors='coerce')
+    payroll = wages.drop_duplicates(key).set_index(key).join(totals, how='outer')
+
+    missing = ~payroll.index.isin(wages[key])
+    no_wage = payroll[wage_column].isna().to_numpy() & (payroll['Số bản ghi'].fillna(0).to_numpy() > 0)
+    for col in ('Số bản ghi', 'Tổng giờ', 'Giờ thường', 'OT', '_weighted_ot'):
+        payroll[col] = payroll[col].fillna(0)
+    wage = payroll[wage_column].fillna(0).to_numpy(dtype=float)
+    payroll['Số bản ghi'] = payroll['Số bản ghi'].astype(int)
+    payroll['Số ngày công'] = payroll['Giờ thường'].to_numpy() / standard_hours
+    payroll['Tiền ngày công'] = payroll['Số ngày công'].to_numpy() * wage
+    payroll['Tiền OT'] = payroll['_weighted_ot'].to_numpy() * wage / standard_hours
+    payroll['Tổng lương'] = payroll['Tiền ngày công'] + payroll['Tiền OT']
+    payroll['Ghi chú'] = np.select([missing, no_wage],
+                                   ["Không có trong danh sách nhân viên", f"Thiếu {wage_column}"], default='')
+
+    for col in ('Tổng giờ', 'Giờ thường', 'Số ngày công', 'OT'):
+        payroll[col] = round2(payroll[col])
+    for col in ('Tiền ngày công', 'Tiền OT', 'Tổng lương'):
+        payroll[col] = np.round(payroll[col].to_numpy(dtype=float)).astype(np.int64)
+    columns = [key] + [wage_column if c == 'Tiền công/ngày' else c for c in PAYROLL_COLUMNS[1:]]
+    return payroll.rename_axis(key).reset_index().sort_values(key, ignore_index=True).reindex(columns=columns)
+
+
+class PayrollCache:
+    """Bảng lương theo tháng, dùng chung giữa các phiên.
+
+    Mỗi tháng chỉ tính lại khi dữ liệu tháng trong MonthCache đổi (month_cache.revision) hoặc
+    danh sách nhân viên được đọc lại (employee_registry.revision). Giá trị trả về là bản sao.
+    """
+
+    def __init__(self, month_cache, employee_registry, **settings):
+        self.month_cache = month_cache
+        self.employee_registry = employee_registry
+        self.settings = settings  # tham số của compute_payroll
+        self._lock = threading.Lock()
+        self._results = {}  # tháng -> (khóa, DataFrame)
+
+    def get(self, month_year):
+        with self._lock:
+            key = (self.month_cache.revision(month_year), self.employee_registry.revision())
+            cached_key, payroll = self._results.get(month_year, (None, None))
+            if cached_key != key:
+                payroll = compute_payroll(self.month_cache.load_month(month_year),
+                                          self.employee_registry.employees(), **self.settings)
+                self._results[month_year] = (key, payroll)
+            return payroll.copy()
@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+
+# Lỗi tạm thời của Google Sheets API nên thử lại
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Các hàm gspread ghi dữ liệu (tính vào quota ghi), các hàm khác tính vào quota đọc
+WRITE_METHODS = {
+    'add_worksheet', 'append_row', 'append_rows', 'batch_clear', 'batch_update', 'clear',
+    'del_worksheet', 'delete_rows', 'delete_columns', 'insert_row', 'insert_rows', 'resize',
+    'update', 'update_acell', 'update_cell', 'update_cells', 'update_title',
+    'values_append', 'values_batch_update', 'values_clear', 'values_update',
+}
+# Thuộc tính gspread nhưng thực chất gọi API
+NETWORK_PROPERTIES = {'sheet1'}
+
+
+# Mã HTTP của lỗi gspread (APIError.response hoặc APIError.code)
+def error_status(error):
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    return status if isinstance(status, int) else None
+
+
+class TokenBucket:
+    """Token bucket: rate_per_minute token mỗi phút, tối đa capacity token tích lũy"""
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1, rate_per_minute // 6)
+        self._tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Chờ (xếp hàng) đến khi có token, trả về số giây đã chờ"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """Giới hạn tốc độ dùng chung trong process cho mọi lệnh gọi Google Sheets.
+
+    Mỗi lệnh gọi lấy một token (đọc hoặc ghi) trước khi chạy; lỗi 429/5xx được thử lại
+    với backoff mũ có jitter. metrics ghi lại số lần bị chờ, thử lại và thất bại.
+    """
+
+    def __init__(self, read_per_minute=60, write_per_minute=60, max_retries=5,
+                 base_delay=1.0, max_delay=32.0, clock=time.monotonic, sleep=time.sleep):
+        self.read_bucket = TokenBucket(read_per_minute, clock=clock, sleep=sleep)
+        self.write_bucket = TokenBucket(write_per_minute, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.metrics = {
+            'calls': 0,
+            'reads': 0,
+            'writes': 0,
+            'throttled': 0,
+            'wait_seconds': 0.0,
+            'retried': 0,
+            'failed': 0,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self.metrics[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.metrics)
+
+    def call(self, kind, fn, *args, **kwargs):
+        """Gọi fn qua bucket đọc/ghi (kind = 'read' | 'write'), thử lại khi gặp lỗi tạm thời"""
+        bucket = self.write_bucket if kind == 'write' else self.read_bucket
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            self._count(calls=1, **{kind + 's': 1})
+            if waited > 0:
+                self._count(throttled=1, wait_seconds=waited)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if error_status(e) not in RETRYABLE_STATUS or attempt == self.max_retries:
+                    self._count(failed=1)
+                    raise
+                self._count(retried=1)
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                self._sleep(delay * random.uniform(0.5, 1.5))
+
+
+class RateLimitedProxy:
+    """Bọc client/Spreadsheet/Worksheet của gspread: mọi lệnh gọi API đi qua RateLimiter"""
+
+    def __init__(self, target, limiter):
+        self._target = target
+        self.limiter = limiter
+
+    def _wrap(self, value):
+        # Spreadsheet (có .worksheet) và Worksheet (có .row_values) cũng được bọc
+        if isinstance(value, list) and value and all(hasattr(v, 'row_values') for v in value):
+            return [RateLimitedProxy(v, self.limiter) for v in value]
+        if hasattr(value, 'worksheet') or hasattr(value, 'row_values'):
+            return RateLimitedProxy(value, self.limiter)
+        return value
+
+    def __getattr__(self, name):
+        if name in NETWORK_PROPERTIES:
+            return self._wrap(self.limiter.call('read', getattr, self._target, name))
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        kind = 'write' if name in WRITE_METHODS else 'read'
+
+        def call(*args, **kwargs):
+            return self._wrap(self.limiter.call(kind, attr, *args, **kwargs))
+        return call
+
+    def __repr__(self):
+        return f"RateLimitedProxy({self._target!r})"
@@ -0,0 +1,335 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from storage.base import (
+    ATTENDANCE_COLUMNS,
+    EMPLOYEE_COLUMNS,
+    NUMERIC_COLUMNS,
+    RECORD_COLUMNS,
+    AttendanceStorage,
+    RecordConflictError,
+    assign_record_ids,
+    month_of,
+    stamp_record,
+)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column(name):
+    # Tên cột SQL của cột chấm công: tên cột SQLite không phân biệt hoa thường nên "ID" trùng khóa id
+    return _quote('record_id' if name == 'ID' else name)
+
+
+class SQLiteStorage(AttendanceStorage):
+    """Lưu nhân viên và chấm công trong SQLite, mỗi thao tác ghi là một transaction một dòng"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_file, attendance_columns=ATTENDANCE_COLUMNS, employee_columns=EMPLOYEE_COLUMNS):
+        super().__init__(attendance_columns, employee_columns)
+        self.db_file = db_file
+        self._create_schema()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _column_defs(self, columns):
+        return ', '.join(
+            f"{_column(col)} {'REAL' if col in NUMERIC_COLUMNS else 'TEXT'}" for col in columns
+        )
+
+    def _create_schema(self):
+        key = _quote(self.attendance_key)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS attendance ("
+                f"id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                f"{self._column_defs(self.attendance_columns)}, "
+                f"\"Tháng\" TEXT NOT NULL)"
+            )
+            # File cũ chưa có cột ID / Phiên bản: thêm cột và gán ID cho các dòng đã có
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(attendance)')}
+            for col in self.attendance_columns:
+                if _column(col).strip('"') not in existing:
+                    conn.execute(f"ALTER TABLE attendance ADD COLUMN {self._column_defs([col])}")
+            conn.execute('UPDATE attendance SET record_id = lower(hex(randomblob(6))) WHERE record_id IS NULL OR record_id = \'\'')
+            conn.execute('UPDATE attendance SET "Phiên bản" = 1 WHERE "Phiên bản" IS NULL')
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS employees ("
+                f"{self._column_defs(self.employee_columns)}, "
+                f"UNIQUE ({_quote(self.employee_key)}))"
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_ngay ON attendance ("Ngày")')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_attendance_nv_ngay ON attendance ({key}, "Ngày")')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_thang ON attendance ("Tháng", id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_record ON attendance (record_id)')
+            # Trạng thái đồng bộ theo tháng khi làm bản sao cục bộ của backend khác
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                'month TEXT PRIMARY KEY, row_count INTEGER NOT NULL, '
+                'content_hash TEXT NOT NULL, last_row_hash TEXT NOT NULL)'
+            )
+            # Bộ đếm thay đổi của bảng nhân viên (trigger tăng mỗi lần thêm/sửa/xóa)
+            conn.execute('CREATE TABLE IF NOT EXISTS employees_version (version INTEGER NOT NULL)')
+            conn.execute('INSERT INTO employees_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM employees_version)')
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(
+                    f'CREATE TRIGGER IF NOT EXISTS employees_{event.lower()} AFTER {event} ON employees '
+                    f'BEGIN UPDATE employees_version SET version = version + 1; END'
+                )
+
+    def _query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def _select_columns(self):
+        return ', '.join(f"{_column(c)} AS {_quote(c)}" for c in self.attendance_columns)
+
+    def _select_attendance(self, where='', params=()):
+        cols = self._select_columns()
+        # attendance.id: "id" không kèm tên bảng sẽ trỏ tới cột đặt tên "ID" trong SELECT
+        return self._query(f"SELECT {cols} FROM attendance {where} ORDER BY attendance.id", params)
+
+    # ---- Nhân viên ----
+
+    def load_employees(self):
+        cols = ', '.join(_quote(c) for c in self.employee_columns)
+        return self._query(f"SELECT {cols} FROM employees ORDER BY rowid")
+
+    def employees_version(self):
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT version FROM employees_version').fetchone()[0]
+
+    def employee_exists(self, key_value):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM employees WHERE {_quote(self.employee_key)} = ?", (key_value,)
+            ).fetchone()
+        return row is not None
+
+    def add_employee(self, record):
+        """Thêm một nhân viên (record: dict theo tên cột), trả về False nếu trùng mã"""
+        cols = ', '.join(_quote(c) for c in self.employee_columns)
+        marks = ', '.join('?' for _ in self.employee_columns)
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    f"INSERT INTO employees ({cols}) VALUES ({marks})",
+                    [record.get(c) for c in self.employee_columns]
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def append_employees(self, df):
+        # Một transaction; mã đã có bị bỏ qua (INSERT OR IGNORE), rowcount không tính các dòng đó
+        with closing(self._connect()) as conn, conn:
+            return self._insert_employees(conn, df).rowcount
+
+    def delete_employee(self, index):
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                'SELECT rowid FROM employees ORDER BY rowid LIMIT 1 OFFSET ?', (int(index),)
+            ).fetchone()
+            if row is None:
+                raise IndexError(f"Không tìm thấy nhân viên {index + 1}")
+            conn.execute('DELETE FROM employees WHERE rowid = ?', (row[0],))
+
+    # ---- Chấm công ----
+
+    def load_attendance(self):
+        return self._select_attendance()
+
+    def load_attendance_by_month(self, month_year):
+        return self._select_attendance('WHERE "Tháng" = ?', (month_year,))
+
+    def load_attendance_tail(self, month_year, start):
+        """Các dòng của tháng từ vị trí start trở đi (dùng index theo tháng)"""
+        cols = self._select_columns()
+        return self._query(
+            f'SELECT {cols} FROM attendance WHERE "Tháng" = ? ORDER BY attendance.id LIMIT -1 OFFSET ?',
+            (month_year, int(start))
+        )
+
+    def load_attendance_by_date(self, date_str):
+        return self._select_attendance('WHERE "Ngày" = ?', (date_str,))
+
+    def load_attendance_filtered(self, month_year=None, employee_name=None):
+        """Lọc theo tháng và/hoặc tên nhân viên bằng truy vấn có index"""
+        clauses, params = [], []
+        if month_year is not None:
+            clauses.append('"Tháng" = ?')
+            params.append(month_year)
+        if employee_name is not None:
+            clauses.append('"Tên NV" = ?')
+            params.append(employee_name)
+        where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        return self._select_attendance(where, params)
+
+    def get_employee_names(self, month_year=None):
+        """Danh sách tên nhân viên có chấm công (trong tháng nếu có)"""
+        where, params = ('WHERE "Tháng" = ?', (month_year,)) if month_year is not None else ('', ())
+        df = self._query(f'SELECT DISTINCT "Tên NV" FROM attendance {where} ORDER BY "Tên NV"', params)
+        return df['Tên NV'].tolist()
+
+    def get_available_months(self):
+        df = self._query('SELECT DISTINCT "Tháng" FROM attendance ORDER BY "Tháng"')
+        return df['Tháng'].tolist()
+
+    def count_by_month(self):
+        df = self._query('SELECT "Tháng", COUNT(*) AS n FROM attendance GROUP BY "Tháng" ORDER BY "Tháng"')
+        return dict(zip(df['Tháng'], df['n']))
+
+    def save_attendance(self, record):
+        """Thêm một bản ghi chấm công (record: dict theo tên cột)"""
+        stamp_record(record)
+        cols = ', '.join(_column(c) for c in self.attendance_columns)
+        marks = ', '.join('?' for _ in self.attendance_columns)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f'INSERT INTO attendance ({cols}, "Tháng") VALUES ({marks}, ?)',
+                [record.get(c) for c in self.attendance_columns] + [month_of(record['Ngày'])]
+            )
+
+    def _raise_conflict(self, conn, month_year, record_id):
+        # Câu lệnh có điều kiện phiên bản không khớp dòng nào: phân biệt bị sửa hay bị xóa
+        row = conn.execute(
+            'SELECT "Phiên bản" FROM attendance WHERE record_id = ? AND "Tháng" = ?', (record_id, month_year)
+        ).fetchone()
+        if row is None:
+            raise RecordConflictError(f"Bản ghi {record_id} không còn trong tháng {month_year}")
+        raise RecordConflictError(f"Bản ghi {record_id} đã được sửa (phiên bản hiện tại {int(row[0])})")
+
+    def update_attendance_record(self, month_year, record_id, record, version):
+        self.apply_attendance_changes(month_year, updates=[(record_id, record, version)])
+
+    def delete_attendance_record(self, month_year, record_id, version):
+        self.apply_attendance_changes(month_year, deletes=[(record_id, version)])
+
+    def apply_attendance_changes(self, month_year, updates=(), deletes=()):
+        """Sửa/xóa nhiều bản ghi trong một transaction; mỗi câu lệnh kiểm tra phiên bản,
+        một bản ghi không khớp thì rollback toàn bộ"""
+        # Bản ghi giữ nguyên tháng (giống sheet Excel/Google Sheets)
+        data_columns = [c for c in self.attendance_columns if c not in RECORD_COLUMNS]
+        assignments = ', '.join(f"{_quote(c)} = ?" for c in data_columns)
+        with closing(self._connect()) as conn, conn:
+            for record_id, record, version in updates:
+                cursor = conn.execute(
+                    f'UPDATE attendance SET {assignments}, "Phiên bản" = "Phiên bản" + 1 '
+                    f'WHERE record_id = ? AND "Tháng" = ? AND "Phiên bản" = ?',
+                    [record.get(c) for c in data_columns] + [record_id, month_year, int(version)]
+                )
+                if cursor.rowcount == 0:
+                    self._raise_conflict(conn, month_year, record_id)
+            for record_id, version in deletes:
+                cursor = conn.execute(
+                    'DELETE FROM attendance WHERE record_id = ? AND "Tháng" = ? AND "Phiên bản" = ?',
+                    (record_id, month_year, int(version))
+                )
+                if cursor.rowcount == 0:
+                    self._raise_conflict(conn, month_year, record_id)
+        for record_id, record, version in updates:
+            stamp_record(record, record_id, int(version) + 1)
+
+    def replace_attendance_month(self, month_year, df):
+        self.replace_month(month_year, df)
+
+    def append_attendance_months(self, frames):
+        """Thêm các dòng của nhiều tháng trong một transaction"""
+        with closing(self._connect()) as conn, conn:
+            for month_year, df in frames.items():
+                self._insert_attendance(conn, df, month_year)
+
+    # ---- Nhập / xuất ----
+
+    def is_empty(self):
+        with closing(self._connect()) as conn:
+            employees = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
+            attendance = conn.execute('SELECT COUNT(*) FROM attendance').fetchone()[0]
+        return employees == 0 and attendance == 0
+
+    def _insert_employees(self, conn, employees_df):
+        cols = ', '.join(_quote(c) for c in self.employee_columns)
+        marks = ', '.join('?' for _ in self.employee_columns)
+        rows = employees_df.reindex(columns=self.employee_columns)
+        return conn.executemany(
+            f"INSERT OR IGNORE INTO employees ({cols}) VALUES ({marks})",
+            rows.astype(object).where(pd.notna(rows), None).values.tolist()
+        )
+
+    def _insert_attendance(self, conn, attendance_df, month_year=None):
+        cols = ', '.join(_column(c) for c in self.attendance_columns)
+        marks = ', '.join('?' for _ in self.attendance_columns)
+        rows, _ = assign_record_ids(attendance_df.reindex(columns=self.attendance_columns))
+        rows = rows.astype(object).where(pd.notna(rows), None)
+        if month_year is not None:
+            rows['Tháng'] = month_year
+        else:
+            rows['Tháng'] = attendance_df['Ngày'].astype(str).str[:7].values
+        conn.executemany(
+            f'INSERT INTO attendance ({cols}, "Tháng") VALUES ({marks}, ?)',
+            rows.values.tolist()
+        )
+
+    def import_dataframes(self, employees_df=None, attendance_df=None):
+        """Nhập dữ liệu có sẵn (ví dụ từ Excel/CSV) trong một transaction"""
+        with closing(self._connect()) as conn, conn:
+            if employees_df is not None and len(employees_df) > 0:
+                self._insert_employees(conn, employees_df)
+            if attendance_df is not None and len(attendance_df) > 0:
+                self._insert_attendance(conn, attendance_df)
+
+    def _set_sync_state(self, conn, month_year, sync_state):
+        if sync_state is None:
+            conn.execute('DELETE FROM sync_state WHERE month = ?', (month_year,))
+        else:
+            conn.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)', (month_year, *sync_state))
+
+    def replace_month(self, month_year, attendance_df, sync_state=None):
+        """Thay toàn bộ dữ liệu một tháng (dùng khi làm bộ đệm cho backend khác).
+
+        sync_state = (số dòng, hash nội dung, hash dòng cuối) được lưu cùng transaction.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM attendance WHERE "Tháng" = ?', (month_year,))
+            if len(attendance_df) > 0:
+                self._insert_attendance(conn, attendance_df, month_year)
+            self._set_sync_state(conn, month_year, sync_state)
+
+    def append_month(self, month_year, attendance_df, sync_state=None):
+        """Thêm các dòng vào cuối một tháng và cập nhật trạng thái đồng bộ trong một transaction"""
+        with closing(self._connect()) as conn, conn:
+            if len(attendance_df) > 0:
+                self._insert_attendance(conn, attendance_df, month_year)
+            self._set_sync_state(conn, month_year, sync_state)
+
+    def set_sync_state(self, month_year, sync_state):
+        with closing(self._connect()) as conn, conn:
+            self._set_sync_state(conn, month_year, sync_state)
+
+    def sync_state(self):
+        """Trạng thái đồng bộ đã lưu: {tháng: (số dòng, hash nội dung, hash dòng cuối)}"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT month, row_count, content_hash, last_row_hash FROM sync_state').fetchall()
+        return {month: (row_count, content_hash, last_row_hash) for month, row_count, content_hash, last_row_hash in rows}
+
+    def replace_employees(self, employees_df):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM employees')
+            if len(employees_df) > 0:
+                self._insert_employees(conn, employees_df)
+
+    def location(self):
+        return self.db_file
+
+    def size_bytes(self):
+        return os.path.getsize(self.db_file) if os.path.exists(self.db_file) else None
@@ -0,0 +1,288 @@
+import hashlib
+import numbers
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from storage.base import AttendanceStorage, assign_record_ids, month_of
+
+
+def _cell_text(value):
+    # Chuẩn hóa ô để dữ liệu từ Google Sheets và từ SQLite cho cùng một hash
+    if value is None or isinstance(value, str):
+        return value or ''
+    if pd.isna(value):
+        return ''
+    if isinstance(value, numbers.Number):
+        return repr(float(value))
+    return str(value)
+
+
+def row_hashes(df, columns):
+    """Hash của từng dòng (theo thứ tự cột columns)"""
+    rows = df.reindex(columns=columns).astype(object).values.tolist()
+    return [
+        hashlib.sha1('\x1f'.join(_cell_text(v) for v in row).encode('utf-8')).hexdigest()
+        for row in rows
+    ]
+
+
+def chain_hash(content_hash, hashes):
+    """Hash nội dung nối tiếp: thêm dòng vào cuối chỉ cần băm các dòng mới"""
+    for h in hashes:
+        content_hash = hashlib.sha1((content_hash + h).encode('ascii')).hexdigest()
+    return content_hash
+
+
+class TieredStorage(AttendanceStorage):
+    """Backend cục bộ nhanh (SQLite) đặt trước một backend chậm (Google Sheets).
+
+    - Đọc: luôn đọc từ bản sao local. Sau refresh_seconds (khi không còn thao tác ghi
+      đang chờ), bản sao được đồng bộ tăng dần: với mỗi sheet tháng, local lưu số dòng
+      đã đồng bộ, hash nội dung và hash dòng cuối; một request values_batch_get chỉ đọc
+      từ dòng cuối đã biết trở đi. Dòng cuối khác hash (sửa/xóa trên sheet) thì tải lại
+      cả sheet đó. refresh() so hash nội dung của toàn bộ các sheet.
+    - Ghi: write-behind, ghi local ngay rồi đưa vào hàng đợi để một luồng nền
+      ghi lên remote theo đúng thứ tự. Phiên bản được kiểm tra trên local trước; remote
+      kiểm tra lại cùng phiên bản khi ghi (sửa ở nơi khác thì ghi nền báo lỗi và tháng
+      đó được tải lại ở lần đồng bộ tới).
+    """
+
+    name = 'tiered'
+
+    def __init__(self, local, remote, refresh_seconds=300):
+        super().__init__(remote.attendance_columns, remote.employee_columns)
+        self.local = local
+        self.remote = remote
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._synced_at = None  # thời điểm đồng bộ chấm công gần nhất
+        self._verify = False    # lần đồng bộ tới so sánh toàn bộ nội dung
+        self._employees_loaded = None
+        self.errors = []  # Lỗi ghi remote gần nhất (hiển thị trên giao diện)
+        self._queue = queue.Queue()
+        threading.Thread(target=self._write_behind, daemon=True).start()
+
+    # ---- Ghi nền lên remote ----
+
+    def _write_behind(self):
+        while True:
+            method, args = self._queue.get()
+            try:
+                getattr(self.remote, method)(*args)
+            except Exception as e:
+                self.errors = (self.errors + [f"{method}: {e}"])[-20:]
+                # Remote không còn khớp bản sao local: lần đồng bộ tới tải lại cả tháng
+                for month_year in self._affected_months(method, args):
+                    self.local.set_sync_state(month_year, None)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _affected_months(method, args):
+        if method == 'save_attendance':
+            return [month_of(args[0]['Ngày'])]
+        if method == 'append_attendance_months':
+            return list(args[0])
+        if 'attendance' in method:
+            return [args[0]]
+        return []
+
+    def _enqueue(self, method, *args):
+        self._queue.put((method, args))
+
+    def pending_writes(self):
+        return self._queue.unfinished_tasks + self.remote.pending_writes()
+
+    def flush(self):
+        pending = self.pending_writes()
+        self._queue.join()
+        self.remote.flush()
+        return pending
+
+    def _is_fresh(self, loaded_at):
+        if loaded_at is None:
+            return False
+        # Còn thao tác ghi chờ thì không tải lại để không mất bản ghi chưa đẩy lên remote
+        return self.pending_writes() > 0 or time.monotonic() - loaded_at < self.refresh_seconds
+
+    def refresh(self):
+        """Buộc đồng bộ lại ở lần đọc tiếp theo, so sánh toàn bộ nội dung các sheet"""
+        with self._lock:
+            self._synced_at = None
+            self._verify = True
+            self._employees_loaded = None
+
+    # ---- Đồng bộ tăng dần từ remote ----
+
+    def _sync_state_of(self, df):
+        hashes = row_hashes(df, self.attendance_columns)
+        return (len(hashes), chain_hash('', hashes), hashes[-1] if hashes else '')
+
+    def _record_sync_state(self, month_year):
+        # Sau khi ghi local: trạng thái = nội dung remote sau khi thao tác ghi được đẩy lên
+        self.local.set_sync_state(month_year, self._sync_state_of(self.local.load_attendance_by_month(month_year)))
+
+    def _sync(self):
+        with self._lock:
+            if self._is_fresh(self._synced_at):
+                return
+            months = self.remote.attendance_months()
+            state = {} if self._verify else self.local.sync_state()
+            # Đọc từ dòng cuối đã đồng bộ (dòng n + 1 trên sheet) để kiểm tra hash
+            start_rows = {m: state[m][0] + 1 if state.get(m, (0,))[0] > 0 else 2 for m in months}
+            try:
+                tails = self.remote.fetch_month_rows(start_rows)
+            except Exception:
+                # Ví dụ sheet bị xóa bớt dòng nên vùng đọc vượt quá kích thước sheet
+                state, tails = {}, self.remote.fetch_month_rows({m: 2 for m in months})
+
+            stored = self.local.sync_state()
+            refetch = []
+            for m in months:
+                tail = tails[m]
+                if state.get(m, (0,))[0] == 0:
+                    # Đọc cả sheet: chỉ ghi lại local khi nội dung khác
+                    sync_state = self._sync_state_of(tail)
+                    if stored.get(m) != sync_state:
+                        self.local.replace_month(m, tail, sync_state)
+                    continue
+                row_count, content_hash, last_row_hash = state[m]
+                hashes = row_hashes(tail, self.attendance_columns)
+                if not hashes or hashes[0] != last_row_hash:
+                    refetch.append(m)
+                    continue
+                if len(hashes) > 1:
+                    self.local.append_month(m, tail.iloc[1:], (
+                        row_count + len(hashes) - 1, chain_hash(content_hash, hashes[1:]), hashes[-1]
+                    ))
+
+            # Sheet bị sửa giữa chừng: tải lại cả sheet (một request cho tất cả)
+            for m, df in self.remote.fetch_month_rows({m: 2 for m in refetch}).items():
+                self.local.replace_month(m, df, self._sync_state_of(df))
+
+            # Sheet tháng đã bị xóa trên remote
+            for m in set(self.local.get_available_months()) | set(stored):
+                if m not in months:
+                    self.local.replace_month(m, self.local.empty_attendance())
+
+            self._synced_at = time.monotonic()
+            self._verify = False
+
+    def _sync_employees(self):
+        with self._lock:
+            if not self._is_fresh(self._employees_loaded):
+                self.local.replace_employees(self.remote.load_employees())
+                self._employees_loaded = time.monotonic()
+
+    def load_employees(self):
+        self._sync_employees()
+        return self.local.load_employees()
+
+    def employees_version(self):
+        self._sync_employees()
+        return self.local.employees_version()
+
+    def load_attendance(self):
+        self._sync()
+        return self.local.load_attendance()
+
+    def load_attendance_by_month(self, month_year):
+        self._sync()
+        return self.local.load_attendance_by_month(month_year)
+
+    def load_attendance_tail(self, month_year, start):
+        self._sync()
+        return self.local.load_attendance_tail(month_year, start)
+
+    def load_attendance_by_date(self, date_str):
+        self._sync()
+        return self.local.load_attendance_by_date(date_str)
+
+    def load_attendance_filtered(self, month_year=None, employee_name=None):
+        self._sync()
+        return self.local.load_attendance_filtered(month_year, employee_name)
+
+    def get_employee_names(self, month_year=None):
+        self._sync()
+        return self.local.get_employee_names(month_year)
+
+    def get_available_months(self):
+        self._sync()
+        return self.local.get_available_months()
+
+    def count_by_month(self):
+        self._sync()
+        return self.local.count_by_month()
+
+    # ---- Ghi: local trước, remote sau ----
+
+    def add_employee(self, record):
+        self.load_employees()
+        if not self.local.add_employee(record):
+            return False
+        self._enqueue('add_employee', record)
+        return True
+
+    def append_employees(self, df):
+        self._sync_employees()
+        inserted = self.local.append_employees(df)
+        self._enqueue('append_employees', df.copy())
+        return inserted
+
+    def delete_employee(self, index):
+        self.load_employees()
+        self.local.delete_employee(index)
+        self._enqueue('delete_employee', index)
+
+    def save_attendance(self, record):
+        self._sync()
+        self.local.save_attendance(record)
+        self._record_sync_state(month_of(record['Ngày']))
+        self._enqueue('save_attendance', record)
+        return 'pending'
+
+    def update_attendance_record(self, month_year, record_id, record, version):
+        self._sync()
+        self.local.update_attendance_record(month_year, record_id, record, version)
+        self._record_sync_state(month_year)
+        # Bản sao cho remote: record đã được local gán phiên bản mới
+        self._enqueue('update_attendance_record', month_year, record_id, dict(record), version)
+
+    def delete_attendance_record(self, month_year, record_id, version):
+        self._sync()
+        self.local.delete_attendance_record(month_year, record_id, version)
+        self._record_sync_state(month_year)
+        self._enqueue('delete_attendance_record', month_year, record_id, version)
+
+    def apply_attendance_changes(self, month_year, updates=(), deletes=()):
+        self._sync()
+        self.local.apply_attendance_changes(month_year, updates, deletes)
+        self._record_sync_state(month_year)
+        self._enqueue('apply_attendance_changes', month_year,
+                      [(record_id, dict(record), version) for record_id, record, version in updates],
+                      list(deletes))
+
+    def replace_attendance_month(self, month_year, df):
+        self._sync()
+        # Gán ID trước để local và remote giữ cùng ID
+        df, _ = assign_record_ids(df)
+        self.local.replace_month(month_year, df)
+        self._record_sync_state(month_year)
+        self._enqueue('replace_attendance_month', month_year, df)
+
+    def append_attendance_months(self, frames):
+        self._sync()
+        frames = {month_year: assign_record_ids(df)[0] for month_year, df in frames.items()}
+        self.local.append_attendance_months(frames)
+        for month_year in frames:
+            self._record_sync_state(month_year)
+        self._enqueue('append_attendance_months', frames)
+
+    def location(self):
+        return self.remote.location()
+
+    def size_bytes(self):
+        return self.local.size_bytes()
@@ -0,0 +1,114 @@
+import pytest
+
+from storage.fake_gsheet import FakeAPIError, FakeClient
+from storage.ratelimit import RateLimitedProxy, RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Đồng hồ giả: sleep() chỉ ghi lại thời gian chờ và tiến đồng hồ (không chờ thật)"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock):
+    return RateLimiter(read_per_minute=60, write_per_minute=60, max_retries=3, base_delay=1.0,
+                       clock=clock, sleep=clock.sleep)
+
+
+@pytest.fixture
+def worksheet(limiter):
+    client = FakeClient()
+    client.create_spreadsheet('A', worksheets={'Sheet1': [['Tên NV', 'Ngày'], ['An', '2024-05-01']]})
+    proxy = RateLimitedProxy(client, limiter)
+    return client, proxy.open_by_key('A').worksheet('Sheet1')
+
+
+def test_read_retries_429_then_succeeds():
+    # Đồng hồ đứng yên trong lúc chờ backoff: bucket không được nạp lại nên số token dùng là chính xác
+    sleeps = []
+    limiter = RateLimiter(read_per_minute=60, write_per_minute=60, max_retries=3, base_delay=1.0,
+                          clock=lambda: 0.0, sleep=sleeps.append)
+    client = FakeClient()
+    client.create_spreadsheet('A', worksheets={'Sheet1': [['Tên NV', 'Ngày'], ['An', '2024-05-01']]})
+    ws = RateLimitedProxy(client, limiter).open_by_key('A').worksheet('Sheet1')
+    before = limiter.snapshot()
+    tokens = limiter.read_bucket._tokens
+    client.inject_error(429, count=2)
+
+    assert ws.get_all_values() == [['Tên NV', 'Ngày'], ['An', '2024-05-01']]
+
+    after = limiter.snapshot()
+    assert after['retried'] - before['retried'] == 2
+    assert after['failed'] == 0
+    # Mỗi lần thử lấy một token đọc
+    assert after['reads'] - before['reads'] == 3
+    assert client.calls['get_all_values'] == 3
+    assert limiter.read_bucket._tokens == pytest.approx(tokens - 3)
+    # Backoff mũ có jitter: 1s rồi 2s (×0.5..1.5)
+    assert len(sleeps) == 2
+    assert 0.5 <= sleeps[0] <= 1.5
+    assert 1.0 <= sleeps[1] <= 3.0
+
+
+def test_write_retries_429_then_succeeds(limiter, worksheet):
+    client, ws = worksheet
+    client.inject_error(429, count=1)
+
+    ws.append_rows([['Bình', '2024-05-02']])
+
+    metrics = limiter.snapshot()
+    assert metrics['writes'] == 2
+    assert metrics['retried'] == 1
+    assert ws.get_all_values()[-1] == ['Bình', '2024-05-02']
+
+
+def test_gives_up_after_max_retries(clock, limiter, worksheet):
+    client, ws = worksheet
+    client.inject_error(429, count=limiter.max_retries + 1)
+
+    with pytest.raises(FakeAPIError) as error:
+        ws.get_all_values()
+
+    assert error.value.code == 429
+    metrics = limiter.snapshot()
+    assert metrics['retried'] == limiter.max_retries
+    assert metrics['failed'] == 1
+    assert len(clock.sleeps) == limiter.max_retries
+
+
+def test_non_retryable_error_is_not_retried(clock, limiter, worksheet):
+    client, ws = worksheet
+    client.inject_error(400)
+
+    with pytest.raises(FakeAPIError):
+        ws.get_all_values()
+
+    metrics = limiter.snapshot()
+    assert metrics['retried'] == 0
+    assert metrics['failed'] == 1
+    assert clock.sleeps == []
+
+
+def test_bucket_waits_when_empty(clock):
+    bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # 60 token/phút: token tiếp theo sau 1 giây
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert clock.sleeps == [pytest.approx(1.0)]